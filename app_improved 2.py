@@ -1,11 +1,44 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+import urllib3
+from urllib3.util.retry import Retry
 import re
+import codecs
+from html.parser import HTMLParser
+from xml.sax.saxutils import escape as escape_xml
+import math
 import time
 import urllib.parse
+import urllib.robotparser
+import xml.etree.ElementTree
+import zlib
+import gzip
+import io
+import uuid
+import types
+import zipfile
 import os
+import sys
+import json
+import hashlib
+import argparse
+import sqlite3
+import threading
+import tempfile
+import socket
+import concurrent.futures
+import multiprocessing
+import pickle
+import itertools
+import collections
+import functools
+import bisect
+import heapq
+import gc
+from streamlit import runtime
 
 # Set page configuration
 st.set_page_config(
@@ -80,6 +113,39 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Optional component that reports every keystroke for live search (streamlit-keyup)
+try:
+    from st_keyup import st_keyup
+except ImportError:
+    st_keyup = None
+
+# Parquet engine for the typed school data snapshot - without it the CSV is read directly every time
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# Optional C-backed HTML parser (lxml) for school websites - opt-in through WEBSITE_HTML_PARSER
+try:
+    import lxml
+except ImportError:
+    lxml = None
+
+# Optional PDF text extractor (pypdf) for development plans and Ofsted reports published as PDFs
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+# Memory limits for PDF worker processes (not available on Windows, where they run without one)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Milliseconds to wait after the last keystroke before searching
+SEARCH_DEBOUNCE_MS = 250
+
 # Initialize session states
 if 'initialized' not in st.session_state:
     st.session_state.initialized = True
@@ -91,12 +157,134 @@ if 'initialized' not in st.session_state:
     st.session_state.search_performed = False
     st.session_state.search_results = pd.DataFrame()
     st.session_state.search_query = ""
+    st.session_state.search_positions = None  # Row positions of the last results, for narrowing
+    st.session_state.search_mode_used = None
+    st.session_state.search_latency_ms = None
+    st.session_state.nearby_location = ""
     st.session_state.new_priority = ""
     st.session_state.new_strategy = ""
     st.session_state.new_ofsted_priority = ""
     st.session_state.website_data_fetched = False
+    st.session_state.website_future = None  # Background scrape of the selected school's website
+    st.session_state.website_fetch_started = None
+    st.session_state.website_fetch_warning = None  # Why the website gave no data, shown on the profile
     st.session_state.ofsted_url = None
 
+# Columns from the GIAS extract that the dashboard actually uses
+SCHOOL_DATA_COLUMNS = [
+    "URN", "EstablishmentName", "Street", "Town", "Postcode",
+    "TypeOfEstablishment (name)", "PhaseOfEducation (name)", "EstablishmentStatus (name)",
+    "NumberOfPupils", "PercentageFSM", "SchoolWebsite", "Easting", "Northing"
+]
+SCHOOL_DATA_CATEGORICAL_COLUMNS = ["TypeOfEstablishment (name)", "PhaseOfEducation (name)", "EstablishmentStatus (name)"]
+SCHOOL_DATA_NUMERIC_COLUMNS = ["NumberOfPupils", "PercentageFSM", "Easting", "Northing"]
+
+# Bump when the snapshot columns or dtypes change so old snapshots are rebuilt
+SCHOOL_SNAPSHOT_VERSION = 2
+
+# Function to get the snapshot and metadata paths that sit next to a source CSV
+def get_snapshot_paths(csv_path):
+    base_path = os.path.splitext(csv_path)[0]
+    return base_path + ".parquet", base_path + ".snapshot.json"
+
+# Function to hash a file without reading it into memory in one go
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Function to read the national CSV keeping only the columns we use, with compact dtypes
+def read_school_csv(csv_path):
+    df = pd.read_csv(csv_path, usecols=lambda col: col in SCHOOL_DATA_COLUMNS, low_memory=False)
+    
+    # Integer URNs (rows without a usable URN can't be selected anyway)
+    df["URN"] = pd.to_numeric(df["URN"], errors="coerce")
+    df = df.dropna(subset=["URN"]).reset_index(drop=True)
+    df["URN"] = df["URN"].astype("int64")
+    
+    for col in SCHOOL_DATA_NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    
+    # Phase and type only have a handful of distinct values
+    for col in SCHOOL_DATA_CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    
+    return df
+
+# Function to check whether the snapshot was built from the current version of the CSV
+def snapshot_is_current(csv_path, meta_path):
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    
+    if meta.get("version") != SCHOOL_SNAPSHOT_VERSION:
+        return False
+    
+    stat = os.stat(csv_path)
+    if meta.get("mtime") == stat.st_mtime and meta.get("size") == stat.st_size:
+        return True
+    
+    # The file was touched or copied - only rebuild if the content actually changed
+    if meta.get("sha256") != hash_file(csv_path):
+        return False
+    
+    meta["mtime"] = stat.st_mtime
+    meta["size"] = stat.st_size
+    try:
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+    except OSError:
+        pass
+    return True
+
+# Function to (re)build the typed snapshot for a source CSV
+def build_school_snapshot(csv_path):
+    df = read_school_csv(csv_path)
+    snapshot_path, meta_path = get_snapshot_paths(csv_path)
+    stat = os.stat(csv_path)
+    meta = {
+        "version": SCHOOL_SNAPSHOT_VERSION,
+        "source": os.path.basename(csv_path),
+        "mtime": stat.st_mtime,
+        "size": stat.st_size,
+        "sha256": hash_file(csv_path),
+        "rows": len(df)
+    }
+    
+    try:
+        # Write to temporary files first so a concurrent reader never sees half a snapshot
+        df.to_parquet(snapshot_path + ".tmp", index=False)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(snapshot_path + ".tmp", snapshot_path)
+        os.replace(meta_path + ".tmp", meta_path)
+    except Exception:
+        # Read-only location or no parquet engine - the typed frame is still usable
+        pass
+    
+    return df
+
+# Function to load school data for a CSV path, using the snapshot when it is up to date
+def read_school_data(csv_path):
+    if pyarrow is None:
+        return read_school_csv(csv_path)
+    
+    snapshot_path, meta_path = get_snapshot_paths(csv_path)
+    
+    if os.path.exists(snapshot_path) and snapshot_is_current(csv_path, meta_path):
+        try:
+            return pd.read_parquet(snapshot_path)
+        except Exception:
+            pass  # Unreadable snapshot, rebuild it below
+    
+    return build_school_snapshot(csv_path)
+
 # Load the dataset from CSV
 @st.cache_data
 def load_school_data():
@@ -115,137 +303,2138 @@ def load_school_data():
             "../schools.csv",
         ]
         
-        for path in csv_paths:
-            try:
-                if os.path.exists(path):
-                    df = pd.read_csv(path)
-                    st.success(f"Successfully loaded data from {path}")
-                    return df
-            except Exception as e:
-                continue
+        for path in csv_paths:
+            try:
+                if os.path.exists(path):
+                    df = read_school_data(path)
+                    st.success(f"Successfully loaded data from {path}")
+                    return df
+                
+                # A snapshot can also be deployed on its own without the CSV
+                snapshot_path = get_snapshot_paths(path)[0]
+                if pyarrow is not None and os.path.exists(snapshot_path):
+                    df = pd.read_parquet(snapshot_path)
+                    st.success(f"Successfully loaded data from {snapshot_path}")
+                    return df
+            except Exception as e:
+                continue
+        
+        # If CSV not found, show error
+        st.error("National datasheet CSV file not found. Please ensure the file is uploaded correctly.")
+        return pd.DataFrame()
+    except Exception as e:
+        st.error(f"Error loading CSV file: {e}")
+        return pd.DataFrame()
+
+# Characters that make a search query behave as a regular expression in str.contains
+REGEX_SPECIAL_CHARS = set(".^$*+?{}[]\\|()")
+
+# Longest n-gram kept in the search index (queries up to this length are answered exactly)
+SEARCH_NGRAM_SIZE = 3
+
+# Largest previous result set that is re-checked directly instead of going back to the index
+SEARCH_NARROWING_MAX_ROWS = 2000
+
+# Function to match schools the original way, by scanning the searchable columns
+def search_mask(df, query):
+    return (
+        df["EstablishmentName"].str.lower().str.contains(query, na=False) | 
+        df["URN"].astype(str).str.contains(query, na=False) |
+        df["Postcode"].str.lower().str.contains(query, na=False)
+    )
+
+# Function to get the lowercased searchable text of each row, in the same form search_mask sees it
+def get_search_fields(df):
+    fields = []
+    for values in [
+        df["EstablishmentName"].str.lower(),
+        df["URN"].astype(str),
+        df["Postcode"].str.lower()
+    ]:
+        fields.append([value if isinstance(value, str) else "" for value in values])
+    return fields
+
+# Function to build an n-gram inverted index over school name, URN and postcode
+def build_search_index(df):
+    if df.empty:
+        return {"fields": [[], [], []], "postings": {}}
+    
+    fields = get_search_fields(df)
+    postings = {}
+    
+    for position in range(len(df)):
+        grams = set()
+        # Grams never span two fields, so a gram of the full query length is an exact match
+        for field in fields:
+            text = field[position]
+            for size in range(1, SEARCH_NGRAM_SIZE + 1):
+                for start in range(len(text) - size + 1):
+                    grams.add(text[start:start + size])
+        for gram in grams:
+            postings.setdefault(gram, []).append(position)
+    
+    # Positions were added in row order, so each posting list is already sorted
+    postings = {gram: np.array(positions, dtype=np.int32) for gram, positions in postings.items()}
+    return {"fields": fields, "postings": postings}
+
+# Function to find the row positions matching a query by intersecting posting lists
+def lookup_search_index(index, query):
+    postings = index["postings"]
+    
+    if len(query) <= SEARCH_NGRAM_SIZE:
+        return postings.get(query, np.array([], dtype=np.int32))
+    
+    grams = {query[start:start + SEARCH_NGRAM_SIZE] for start in range(len(query) - SEARCH_NGRAM_SIZE + 1)}
+    lists = []
+    for gram in grams:
+        if gram not in postings:
+            return np.array([], dtype=np.int32)
+        lists.append(postings[gram])
+    
+    # Start from the rarest gram so the candidate set shrinks as fast as possible
+    lists.sort(key=len)
+    candidates = lists[0]
+    for positions in lists[1:]:
+        candidates = np.intersect1d(candidates, positions, assume_unique=True)
+        if len(candidates) == 0:
+            return candidates
+    
+    # All grams present doesn't guarantee the whole query is, so confirm each candidate
+    names, urns, postcodes = index["fields"]
+    return np.array([
+        position for position in candidates
+        if query in names[position] or query in urns[position] or query in postcodes[position]
+    ], dtype=np.int32)
+
+# Function to search the school data, using the index unless the query needs regex matching
+def search_school_data(df, index, query):
+    return df.iloc[search_school_positions(df, index, query)]
+
+# Function to check whether a query can be answered from the index rather than a regex scan
+def can_use_search_index(df, index, query):
+    return bool(query) and not REGEX_SPECIAL_CHARS.intersection(query) and len(index["fields"][0]) == len(df)
+
+# Function to find the row positions matching a query, narrowing the previous results when possible
+def search_school_positions(df, index, query, previous_query=None, previous_positions=None):
+    if not can_use_search_index(df, index, query):
+        return np.flatnonzero(search_mask(df, query).to_numpy())
+    
+    # Every school containing the longer query also contains the shorter one it extends,
+    # but a very broad previous result is slower to re-check than the posting lists
+    if (previous_positions is not None and len(previous_positions) <= SEARCH_NARROWING_MAX_ROWS and
+            previous_query and previous_query in query and can_use_search_index(df, index, previous_query)):
+        names, urns, postcodes = index["fields"]
+        return np.array([
+            position for position in previous_positions
+            if query in names[position] or query in urns[position] or query in postcodes[position]
+        ], dtype=np.int32)
+    
+    return lookup_search_index(index, query)
+
+# Function to map each URN to its row position (first occurrence wins, like iloc[0] on a mask)
+def build_urn_index(df):
+    urn_index = {"positions": {}, "names": []}
+    if df.empty:
+        return urn_index
+    for position, urn in enumerate(df["URN"].tolist()):
+        urn_index["positions"].setdefault(urn, position)
+    # Names are kept alongside so selectbox labels don't need a row lookup at all
+    urn_index["names"] = df["EstablishmentName"].tolist()
+    return urn_index
+
+# Number of schools returned by the ranked search
+RANKED_SEARCH_TOP_K = 20
+
+# How much a token match in each column counts towards a school's score
+RANKED_SEARCH_FIELD_WEIGHTS = {"name": 1.0, "town": 0.6, "postcode": 0.8, "urn": 1.0}
+
+# Common abbreviations in school names, matched both ways
+RANKED_SEARCH_ALIASES = {"st": "saint", "saint": "st"}
+
+# Function to split text into lowercase search tokens ("St. Mary's" -> ["st", "marys"])
+def tokenize_search_text(text):
+    if not isinstance(text, str):
+        return []
+    text = re.sub(r"['\u2019]", "", text.lower())
+    return re.findall(r"[a-z0-9]+", text)
+
+# Function to get the tokens of a postcode: outward code, inward code and the whole postcode
+def tokenize_postcode(postcode):
+    tokens = tokenize_search_text(postcode)
+    if len(tokens) > 1:
+        tokens.append("".join(tokens))
+    return tokens
+
+# Function to get the padded bigrams used to find vocabulary words within a small edit distance
+def get_padded_bigrams(token):
+    padded = f"^{token}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+# Function to allow more typos in longer words
+def get_max_edit_distance(token):
+    if len(token) <= 3:
+        return 0
+    if len(token) <= 6:
+        return 1
+    return 2
+
+# Function to compute Levenshtein distance, giving up once it must exceed max_distance
+def bounded_edit_distance(a, b, max_distance):
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+# Function to build the token index used by the ranked search
+def build_ranked_search_index(df):
+    index = {
+        "size": len(df),
+        "postings": {field: {} for field in RANKED_SEARCH_FIELD_WEIGHTS},
+        "vocabulary": [],
+        "bigrams": {},
+        "name_lengths": np.zeros(len(df), dtype=np.int32),
+        "names": []
+    }
+    if df.empty:
+        return index
+    
+    columns = {
+        "name": [tokenize_search_text(value) for value in df["EstablishmentName"]],
+        "town": [tokenize_search_text(value) for value in df["Town"]],
+        "postcode": [tokenize_postcode(value) for value in df["Postcode"]],
+        "urn": [[str(value)] for value in df["URN"]]
+    }
+    
+    for field, rows in columns.items():
+        postings = index["postings"][field]
+        for position, tokens in enumerate(rows):
+            for token in set(tokens):
+                postings.setdefault(token, []).append(position)
+        index["postings"][field] = {token: np.array(positions, dtype=np.int32) for token, positions in postings.items()}
+    
+    # Sorted vocabulary for prefix matches, bigram index over it for typo matches
+    vocabulary = sorted(set().union(*(postings.keys() for postings in index["postings"].values())))
+    index["vocabulary"] = vocabulary
+    for token_id, token in enumerate(vocabulary):
+        for bigram in get_padded_bigrams(token):
+            index["bigrams"].setdefault(bigram, []).append(token_id)
+    
+    # Shorter names win ties, so "St Mary's" ranks above "St Mary's Catholic Primary School"
+    index["name_lengths"] = np.array([len(tokens) for tokens in columns["name"]], dtype=np.int32)
+    index["names"] = [" ".join(tokens) for tokens in columns["name"]]
+    return index
+
+# Function to find vocabulary words matching a query token, with a weight for how closely they match
+def match_vocabulary(index, token, allow_prefix):
+    vocabulary = index["vocabulary"]
+    matches = {}
+    
+    # Exact matches and aliases
+    start = bisect.bisect_left(vocabulary, token)
+    if start < len(vocabulary) and vocabulary[start] == token:
+        matches[token] = 1.0
+    alias = RANKED_SEARCH_ALIASES.get(token)
+    if alias:
+        matches.setdefault(alias, 0.9)
+    
+    # Prefix matches, mainly for the word still being typed
+    if allow_prefix and len(token) >= 2:
+        position = start
+        while position < len(vocabulary) and vocabulary[position].startswith(token):
+            matches.setdefault(vocabulary[position], 0.7)
+            position += 1
+    
+    # Typo matches: only words sharing enough bigrams are checked with the edit distance
+    max_distance = get_max_edit_distance(token)
+    if max_distance:
+        bigrams = get_padded_bigrams(token)
+        shared_counts = {}
+        for bigram in bigrams:
+            for token_id in index["bigrams"].get(bigram, []):
+                shared_counts[token_id] = shared_counts.get(token_id, 0) + 1
+        
+        # Each edit can destroy at most two padded bigrams
+        min_shared = len(bigrams) - 2 * max_distance
+        for token_id, shared in shared_counts.items():
+            candidate = vocabulary[token_id]
+            if shared < min_shared or candidate in matches:
+                continue
+            distance = bounded_edit_distance(token, candidate, max_distance)
+            if distance <= max_distance:
+                matches[candidate] = 0.8 - 0.2 * distance
+    
+    return matches
+
+# Function to rank schools against a free-text query and return the best positions in order
+def ranked_search_positions(index, query, top_k=RANKED_SEARCH_TOP_K):
+    tokens = tokenize_search_text(query)
+    if not tokens or not index["size"]:
+        return np.array([], dtype=np.int32)
+    
+    scores = np.zeros(index["size"], dtype=np.float32)
+    for token_number, token in enumerate(tokens):
+        vocabulary_matches = match_vocabulary(index, token, allow_prefix=token_number == len(tokens) - 1)
+        
+        # Best match of this query token in each school, across all columns
+        token_scores = np.zeros(index["size"], dtype=np.float32)
+        document_count = 0
+        for field, field_weight in RANKED_SEARCH_FIELD_WEIGHTS.items():
+            postings = index["postings"][field]
+            for word, weight in vocabulary_matches.items():
+                positions = postings.get(word)
+                if positions is not None:
+                    token_scores[positions] = np.maximum(token_scores[positions], weight * field_weight)
+                    document_count += len(positions)
+        
+        # Rare words ("marys") say more about the school than common ones ("school")
+        idf = np.log(1 + index["size"] / (1 + document_count))
+        scores += token_scores * idf
+    
+    candidates = np.flatnonzero(scores)
+    if len(candidates) == 0:
+        return candidates.astype(np.int32)
+    
+    # Highest score first, then shorter names, then dataset order
+    order = np.lexsort((candidates, index["name_lengths"][candidates], -scores[candidates]))
+    shortlist = candidates[order[:top_k * 4]]
+    
+    # Rerank the shortlist so names keeping the query's word order come first
+    word_pairs = [f" {first} {second} " for first, second in zip(tokens, tokens[1:])]
+    shortlist_scores = scores[shortlist].copy()
+    for i, position in enumerate(shortlist):
+        name = f" {index['names'][position]} "
+        bonus = 0.1 if name.startswith(f" {tokens[0]} ") else 0
+        bonus += 0.1 * sum(pair in name for pair in word_pairs)
+        shortlist_scores[i] *= 1 + bonus
+    order = np.lexsort((shortlist, index["name_lengths"][shortlist], -shortlist_scores))
+    return shortlist[order[:top_k]].astype(np.int32)
+
+# Size of the grid cells used to find nearby schools (British National Grid metres)
+GEO_GRID_CELL_METRES = 5000
+
+# Function to get the postcode keys a location can be matched on: full postcode, sector and district
+def get_postcode_keys(postcode):
+    tokens = tokenize_search_text(postcode)
+    if not tokens:
+        return []
+    keys = [tokens[0]]
+    if len(tokens) > 1 and tokens[1]:
+        keys = ["".join(tokens), f"{tokens[0]} {tokens[1][0]}", tokens[0]]
+    return keys
+
+# Function to build the grid index of open schools with coordinates
+def build_geo_index(df):
+    index = {
+        "positions": np.array([], dtype=np.int32),
+        "eastings": np.array([], dtype=np.float64),
+        "northings": np.array([], dtype=np.float64),
+        "cells": {},
+        "bounds": (0, 0, 0, 0),
+        "postcodes": {}
+    }
+    if df.empty or "Easting" not in df.columns or "Northing" not in df.columns:
+        return index
+    
+    eastings = pd.to_numeric(df["Easting"], errors="coerce")
+    northings = pd.to_numeric(df["Northing"], errors="coerce")
+    has_coordinates = (eastings > 0) & (northings > 0)
+    
+    # Postcode centroids come from every school with coordinates, open or not
+    for position in np.flatnonzero(has_coordinates.to_numpy()):
+        for key in get_postcode_keys(df["Postcode"].iat[position]):
+            total = index["postcodes"].setdefault(key, [0.0, 0.0, 0])
+            total[0] += eastings.iat[position]
+            total[1] += northings.iat[position]
+            total[2] += 1
+    index["postcodes"] = {key: (e / count, n / count) for key, (e, n, count) in index["postcodes"].items()}
+    
+    # Only open schools are worth visiting
+    is_open = has_coordinates
+    if "EstablishmentStatus (name)" in df.columns:
+        is_open = is_open & df["EstablishmentStatus (name)"].astype(str).str.startswith("Open")
+    
+    positions = np.flatnonzero(is_open.to_numpy()).astype(np.int32)
+    index["positions"] = positions
+    index["eastings"] = eastings.to_numpy(dtype=np.float64)[positions]
+    index["northings"] = northings.to_numpy(dtype=np.float64)[positions]
+    
+    cells = {}
+    cell_x = (index["eastings"] // GEO_GRID_CELL_METRES).astype(np.int64)
+    cell_y = (index["northings"] // GEO_GRID_CELL_METRES).astype(np.int64)
+    for point, cell in enumerate(zip(cell_x.tolist(), cell_y.tolist())):
+        cells.setdefault(cell, []).append(point)
+    index["cells"] = {cell: np.array(points, dtype=np.int32) for cell, points in cells.items()}
+    if len(positions):
+        index["bounds"] = (int(cell_x.min()), int(cell_x.max()), int(cell_y.min()), int(cell_y.max()))
+    return index
+
+# Function to convert latitude/longitude to British National Grid easting/northing
+# (transverse Mercator on the Airy ellipsoid without the datum shift, so within ~120 m)
+def latlon_to_easting_northing(lat, lon):
+    a, b = 6377563.396, 6356256.909
+    f0 = 0.9996012717
+    lat0, lon0 = math.radians(49), math.radians(-2)
+    n0, e0 = -100000, 400000
+    e2 = 1 - (b * b) / (a * a)
+    n = (a - b) / (a + b)
+    
+    phi, lam = math.radians(lat), math.radians(lon)
+    sin_phi, cos_phi, tan_phi = math.sin(phi), math.cos(phi), math.tan(phi)
+    nu = a * f0 / math.sqrt(1 - e2 * sin_phi ** 2)
+    rho = a * f0 * (1 - e2) / (1 - e2 * sin_phi ** 2) ** 1.5
+    eta2 = nu / rho - 1
+    
+    d_phi, s_phi = phi - lat0, phi + lat0
+    m = b * f0 * (
+        (1 + n + 1.25 * n ** 2 + 1.25 * n ** 3) * d_phi
+        - (3 * n + 3 * n ** 2 + 2.625 * n ** 3) * math.sin(d_phi) * math.cos(s_phi)
+        + (1.875 * n ** 2 + 1.875 * n ** 3) * math.sin(2 * d_phi) * math.cos(2 * s_phi)
+        - (35 / 24) * n ** 3 * math.sin(3 * d_phi) * math.cos(3 * s_phi)
+    )
+    
+    i = m + n0
+    ii = nu / 2 * sin_phi * cos_phi
+    iii = nu / 24 * sin_phi * cos_phi ** 3 * (5 - tan_phi ** 2 + 9 * eta2)
+    iiia = nu / 720 * sin_phi * cos_phi ** 5 * (61 - 58 * tan_phi ** 2 + tan_phi ** 4)
+    iv = nu * cos_phi
+    v = nu / 6 * cos_phi ** 3 * (nu / rho - tan_phi ** 2)
+    vi = nu / 120 * cos_phi ** 5 * (5 - 18 * tan_phi ** 2 + tan_phi ** 4 + 14 * eta2 - 58 * tan_phi ** 2 * eta2)
+    
+    d_lam = lam - lon0
+    northing = i + ii * d_lam ** 2 + iii * d_lam ** 4 + iiia * d_lam ** 6
+    easting = e0 + iv * d_lam + v * d_lam ** 3 + vi * d_lam ** 5
+    return easting, northing
+
+# Function to turn a postcode, "easting, northing" or "latitude, longitude" into grid coordinates
+def resolve_location(index, text):
+    numbers = re.findall(r"-?\d+(?:\.\d+)?", text)
+    if len(numbers) == 2 and not re.search(r"[a-z]", text.lower()):
+        first, second = float(numbers[0]), float(numbers[1])
+        if abs(first) <= 90 and abs(second) <= 180:
+            easting, northing = latlon_to_easting_northing(first, second)
+            return easting, northing, f"{first}, {second}"
+        return first, second, f"grid reference {first:.0f}, {second:.0f}"
+    
+    # Fall back from the full postcode to its sector and then its district
+    for key in get_postcode_keys(text):
+        if key in index["postcodes"]:
+            easting, northing = index["postcodes"][key]
+            return easting, northing, key.upper()
+    return None
+
+# Function to get the schools in the grid cells on the square ring `ring` cells away from a cell
+def get_ring_points(index, cell_x, cell_y, ring):
+    if ring == 0:
+        offsets = [(0, 0)]
+    else:
+        offsets = [(dx, dy) for dx in range(-ring, ring + 1) for dy in (-ring, ring)]
+        offsets += [(dx, dy) for dx in (-ring, ring) for dy in range(-ring + 1, ring)]
+    points = [index["cells"][cell] for cell in ((cell_x + dx, cell_y + dy) for dx, dy in offsets) if cell in index["cells"]]
+    return np.concatenate(points) if points else np.array([], dtype=np.int32)
+
+# Function to find the k nearest open schools, returning row positions and distances in metres
+def nearest_school_positions(index, easting, northing, k):
+    if not len(index["positions"]) or k <= 0:
+        return np.array([], dtype=np.int32), np.array([])
+    
+    cell_x, cell_y = int(easting // GEO_GRID_CELL_METRES), int(northing // GEO_GRID_CELL_METRES)
+    min_x, max_x, min_y, max_y = index["bounds"]
+    max_ring = max(cell_x - min_x, max_x - cell_x, cell_y - min_y, max_y - cell_y, 0)
+    
+    found = []
+    ring = 0
+    while ring <= max_ring:
+        found.append(get_ring_points(index, cell_x, cell_y, ring))
+        points = np.concatenate(found)
+        # Once the ring has been searched, every school within ring cells' distance has been seen
+        if len(points) >= k:
+            distances = np.hypot(index["eastings"][points] - easting, index["northings"][points] - northing)
+            kth = np.partition(distances, k - 1)[k - 1]
+            if kth <= ring * GEO_GRID_CELL_METRES:
+                break
+        ring += 1
+    else:
+        points = np.concatenate(found)
+        distances = np.hypot(index["eastings"][points] - easting, index["northings"][points] - northing)
+    
+    order = np.argsort(distances, kind="stable")[:k]
+    return index["positions"][points[order]], distances[order]
+
+# Function to find every open school within a radius, nearest first
+def schools_within_radius(index, easting, northing, radius_metres):
+    if not len(index["positions"]) or radius_metres <= 0:
+        return np.array([], dtype=np.int32), np.array([])
+    
+    min_x, max_x = int((easting - radius_metres) // GEO_GRID_CELL_METRES), int((easting + radius_metres) // GEO_GRID_CELL_METRES)
+    min_y, max_y = int((northing - radius_metres) // GEO_GRID_CELL_METRES), int((northing + radius_metres) // GEO_GRID_CELL_METRES)
+    points = [
+        index["cells"][(x, y)]
+        for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)
+        if (x, y) in index["cells"]
+    ]
+    if not points:
+        return np.array([], dtype=np.int32), np.array([])
+    
+    points = np.concatenate(points)
+    distances = np.hypot(index["eastings"][points] - easting, index["northings"][points] - northing)
+    within = distances <= radius_metres
+    points, distances = points[within], distances[within]
+    order = np.argsort(distances, kind="stable")
+    return index["positions"][points[order]], distances[order]
+
+# Function to get default Ofsted report URL (fallback)
+def get_default_ofsted_report_url(urn):
+    return f"https://reports.ofsted.gov.uk/provider/21/{urn}"
+
+# Background website fetching for the profile page
+WEBSITE_FETCH_WORKERS = 8
+WEBSITE_FETCH_TIMEOUT_SECONDS = 30
+WEBSITE_FETCH_POLL_SECONDS = 0.5
+
+# Where scraped website data is kept between sessions and restarts
+WEBSITE_CACHE_PATH = os.environ.get("WEBSITE_CACHE_PATH", "website_cache.sqlite3")
+
+# How long cached website data is used before asking the site whether it changed
+WEBSITE_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# User agent sent with every request to school websites
+SCRAPER_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Outbound HTTP settings for school websites (pool sizes can be raised for bulk scraping)
+HTTP_POOL_CONNECTIONS = int(os.environ.get("HTTP_POOL_CONNECTIONS", 50))  # Number of hosts kept alive
+HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", 10))  # Connections kept per host
+HTTP_RETRIES = 2
+HTTP_BACKOFF_FACTOR = 0.3
+HTTP_BACKOFF_JITTER = 0.3
+HTTP_RETRY_STATUSES = [429, 500, 502, 503, 504]
+HTTP_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+
+# Function to create the shared HTTP session with keep-alive pooling and retries
+def create_http_session(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, retries=HTTP_RETRIES):
+    retry_options = {
+        "total": retries,
+        "connect": retries,
+        "read": retries,
+        "status": retries,
+        "backoff_factor": HTTP_BACKOFF_FACTOR,
+        "status_forcelist": HTTP_RETRY_STATUSES,
+        # Only idempotent requests are retried
+        "allowed_methods": frozenset(["GET", "HEAD"]),
+        # Hand back the final error response instead of raising
+        "raise_on_status": False
+    }
+    try:
+        retry = Retry(backoff_jitter=HTTP_BACKOFF_JITTER, **retry_options)
+    except TypeError:
+        # urllib3 1.x has no jitter option
+        retry = Retry(**retry_options)
+    
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({'User-Agent': SCRAPER_USER_AGENT})
+    return session
+
+# Per-host limits for school websites, shared by every session in the process
+HOST_RATE_PER_SECOND = 2.0  # Sustained requests per second to one school's server
+HOST_RATE_BURST = 6  # A homepage and its crawled pages can go out at once
+HOST_BREAKER_FAILURES = 2  # Consecutive failed attempts (timeouts or connection errors, retries included) before a host is skipped
+HOST_BREAKER_COOLDOWN_SECONDS = 300  # How long a failing host is skipped before one trial request
+HOST_NEGATIVE_CACHE_TTL_SECONDS = 3600  # How long a host name that doesn't resolve is remembered as dead
+
+# Errors that mean the host itself is unreachable or unresponsive
+HOST_FAILURE_ERRORS = (requests.exceptions.Timeout, requests.exceptions.ConnectionError, urllib3.exceptions.HTTPError)
+
+# Raised instead of contacting a host that is known to be down
+class HostUnavailableError(requests.exceptions.ConnectionError):
+    pass
+
+# Function to check whether an error (or one it wraps) is a failed DNS lookup
+def is_dns_error(error):
+    for _ in range(6):
+        if error is None:
+            return False
+        if isinstance(error, socket.gaierror) or type(error).__name__ == "NameResolutionError":
+            return True
+        # requests wraps urllib3's MaxRetryError, which keeps the underlying error as its reason
+        wrapped = error.args[0] if error.args and isinstance(error.args[0], BaseException) else None
+        error = getattr(error, "reason", None) or wrapped or error.__cause__ or error.__context__
+    return False
+
+# Function to get the tracked state of a host (call with the host_health lock held)
+def get_host_state(host):
+    hosts = host_health["hosts"]
+    if host not in hosts:
+        hosts[host] = {"tokens": HOST_RATE_BURST, "refilled_at": time.monotonic(), "rate": HOST_RATE_PER_SECOND,
+                       "burst": HOST_RATE_BURST, "failures": 0, "open_until": 0.0, "dead_until": 0.0, "trial": False}
+    return hosts[host]
+
+# Function to fail fast for hosts known to be down, then wait for the host's rate limit
+# With a deadline, a wait that would run past it fails instead of holding up the caller
+def acquire_host(host, deadline=None):
+    with host_health["lock"]:
+        state = get_host_state(host)
+        now = time.monotonic()
+        if now < state["dead_until"]:
+            host_health["stats"]["skipped"] += 1
+            raise HostUnavailableError(f"{host} could not be found (not retrying for {math.ceil((state['dead_until'] - now) / 60)} minutes)")
+        if now < state["open_until"] or (state["failures"] >= HOST_BREAKER_FAILURES and state["trial"]):
+            host_health["stats"]["skipped"] += 1
+            raise HostUnavailableError(f"{host} is not responding (not retrying for {math.ceil(max(0, state['open_until'] - now) / 60)} minutes)")
+        
+        # Token bucket - a request that finds it empty reserves the next token and waits for it
+        state["tokens"] = min(state["burst"], state["tokens"] + (now - state["refilled_at"]) * state["rate"])
+        state["refilled_at"] = now
+        wait = max(0.0, (1 - state["tokens"]) / state["rate"])
+        if deadline is not None and now + wait > deadline:
+            raise HostUnavailableError(f"{host} can't be requested again before the deadline (crawl rate {state['rate']:g}/s)")
+        state["tokens"] -= 1
+        
+        if state["failures"] >= HOST_BREAKER_FAILURES:
+            # Cooled down - let one trial request through while everyone else keeps failing fast
+            state["trial"] = True
+    time.sleep(wait)
+
+# Function to slow requests to a host down to the Crawl-delay its robots.txt asks for
+def set_host_crawl_delay(host, delay):
+    with host_health["lock"]:
+        state = get_host_state(host)
+        state["rate"] = min(HOST_RATE_PER_SECOND, 1 / delay)
+        state["burst"] = 1
+        state["tokens"] = min(state["tokens"], 1)
+
+# Function to record how a request to a host went, opening its circuit breaker after repeated failures
+def record_host_result(host, error=None, attempts=1):
+    with host_health["lock"]:
+        state = get_host_state(host)
+        state["trial"] = False
+        if error is None:
+            state["failures"] = 0
+            state["open_until"] = 0.0
+            return
+        
+        now = time.monotonic()
+        host_health["stats"]["failures"] += 1
+        if is_dns_error(error):
+            state["dead_until"] = now + HOST_NEGATIVE_CACHE_TTL_SECONDS
+        state["failures"] += attempts
+        if state["failures"] >= HOST_BREAKER_FAILURES:
+            state["open_until"] = now + HOST_BREAKER_COOLDOWN_SECONDS
+
+# Function to GET a page from a school website through its host's rate limit and failure tracking
+def guarded_get(session, url, deadline=None, **kwargs):
+    # Replaying an archive never touches the network, so there is no host to wait for
+    if website_archive and website_archive["mode"] == "replay":
+        return replay_archived_response(website_archive, url)
+    
+    host = urllib.parse.urlparse(url).netloc.lower()
+    acquire_host(host, deadline)
+    try:
+        response = session.get(url, **kwargs)
+    except HostUnavailableError:
+        raise
+    except HOST_FAILURE_ERRORS as e:
+        # The session's retries were all used up, so each of them failed too
+        record_host_result(host, e, attempts=1 + (session.get_adapter(url).max_retries.total or 0))
+        raise
+    except Exception as e:
+        # Anything else (too many redirects, a bad URL, a broken chunked reply) still ends a trial request
+        record_host_result(host, e)
+        raise
+    record_host_result(host)
+    if website_archive:
+        return archive_response(website_archive, url, response, deadline)
+    return response
+
+# Function to open the persistent website cache (shared by every session in the process)
+def open_website_cache(path, ttl_seconds=WEBSITE_CACHE_TTL_SECONDS):
+    with sqlite3.connect(path) as connection:
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS website_cache (
+                url TEXT PRIMARY KEY,
+                strategies TEXT NOT NULL,
+                ofsted_url TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+    return {
+        "path": path,
+        "ttl_seconds": ttl_seconds,
+        "lock": threading.Lock(),
+        "stats": {"hits": 0, "misses": 0, "revalidated": 0, "changed": 0}
+    }
+
+# Function to count a cache outcome
+def record_website_cache_stat(cache, name):
+    with cache["lock"]:
+        cache["stats"][name] += 1
+
+# Function to get the cached entry for a URL, or None
+def read_website_cache(cache, url):
+    with sqlite3.connect(cache["path"]) as connection:
+        row = connection.execute(
+            "SELECT strategies, ofsted_url, etag, last_modified, fetched_at FROM website_cache WHERE url = ?", (url,)
+        ).fetchone()
+    if row is None:
+        return None
+    return {
+        "strategies": json.loads(row[0]),
+        "ofsted_url": row[1],
+        "etag": row[2],
+        "last_modified": row[3],
+        "fetched_at": row[4]
+    }
+
+# Function to store (or refresh) the cached entry for a URL
+def write_website_cache(cache, url, result, etag, last_modified):
+    with sqlite3.connect(cache["path"]) as connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO website_cache (url, strategies, ofsted_url, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (url, json.dumps(result["strategies"]), result["ofsted_url"], etag, last_modified, time.time())
+        )
+
+# Function to mark a cached entry as checked just now, after the site answered 304 Not Modified
+def touch_website_cache(cache, url):
+    with sqlite3.connect(cache["path"]) as connection:
+        connection.execute("UPDATE website_cache SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+# Parser used for school web pages - lxml is opt-in until parse-benchmark shows identical output on saved school pages
+WEBSITE_HTML_PARSER = os.environ.get("WEBSITE_HTML_PARSER", "html.parser")
+if WEBSITE_HTML_PARSER == "lxml" and lxml is None:
+    WEBSITE_HTML_PARSER = "html.parser"
+
+# Top-level tags skipped by the fast parse path - the extractor never looks at the document head
+WEBSITE_HEAD_TAGS = ("html", "head", "title", "meta", "link", "base", "script", "style", "noscript", "template")
+
+# Function to parse a school web page with the configured parser
+def parse_school_page(html, parser=None):
+    parser = parser or WEBSITE_HTML_PARSER
+    if parser == "lxml":
+        # lxml always closes the head, so everything outside it can be kept without the head's scripts and styles
+        return BeautifulSoup(html, 'lxml', parse_only=SoupStrainer(lambda name, attrs: name not in WEBSITE_HEAD_TAGS))
+    # html.parser never closes an unclosed head, so it has to build the whole page as before
+    return BeautifulSoup(html, 'html.parser')
+
+# Keywords that mark a link as leading to an Ofsted report
+OFSTED_KEYWORDS = ['ofsted', 'inspection', 'report']
+
+# Keywords to look for in headings and content for strategies
+STRATEGY_KEYWORDS = [
+    'strategy', 'strategic', 'priorities', 'priority', 'vision', 'mission', 
+    'values', 'aims', 'objectives', 'goals', 'improvement', 'plan', 
+    'development', 'school development plan', 'sdp'
+]
+
+# How much each strategy keyword says about a paragraph found by the keyword scan (others count 1)
+STRATEGY_KEYWORD_WEIGHTS = {
+    'school development plan': 3, 'sdp': 3, 'priorities': 2, 'priority': 2,
+    'strategy': 2, 'strategic': 2, 'improvement': 2
+}
+
+# Paragraphs longer than this are usually whole page sections or boilerplate, and rank lower
+STRATEGY_IDEAL_MAX_LENGTH = 300
+
+# Word shingle size, and the share of the shorter text's shingles two texts must have in common to be the same strategy
+STRATEGY_SHINGLE_SIZE = 3
+STRATEGY_DUPLICATE_OVERLAP = 0.8
+
+# Words left out of shingles, so "reading & phonics" and "reading and phonics" match
+STRATEGY_STOPWORDS = {'a', 'an', 'and', 'the', 'of', 'to', 'in', 'for', 'with', 'on', 'at', 'by', 'our', 'is', 'are', 'be'}
+
+# Shingles held by more kept texts than this are too common to point at a duplicate ("of the school")
+STRATEGY_COMMON_SHINGLE_LIMIT = 50
+
+# Function to get the word shingles of a text, ignoring case, punctuation and spacing
+def get_text_shingles(text):
+    words = [word for word in re.findall(r'[a-z0-9]+', text.lower()) if word not in STRATEGY_STOPWORDS]
+    if len(words) < STRATEGY_SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i:i + STRATEGY_SHINGLE_SIZE]) for i in range(len(words) - STRATEGY_SHINGLE_SIZE + 1)}
+
+# Function to deduplicate and clean extracted strategy texts, keeping their order
+# A text is a duplicate when most of its shingles (or of a kept text's) are shared, which also catches one text
+# containing another and variants that differ only in punctuation. Kept texts are found through a shingle index,
+# so each text is compared with the few kept texts it overlaps rather than all of them
+def clean_strategies(strategies, limit=None):
+    cleaned_strategies = []
+    kept_shingles = []
+    shingle_index = {}
+    for text in strategies:
+        # Clean up whitespace
+        cleaned = re.sub(r'\s+', ' ', text).strip()
+        
+        # Skip if too short
+        if len(cleaned) < 30:
+            continue
+        
+        # Check if this is a duplicate or very similar
+        shingles = get_text_shingles(cleaned)
+        shared = {}
+        for shingle in shingles:
+            holders = shingle_index.get(shingle, ())
+            if len(holders) <= STRATEGY_COMMON_SHINGLE_LIMIT:
+                for position in holders:
+                    shared[position] = shared.get(position, 0) + 1
+        
+        # Confirm the likeliest matches against their full shingle sets
+        is_duplicate = False
+        for position in heapq.nlargest(3, shared, key=shared.get):
+            overlap = len(shingles & kept_shingles[position])
+            if overlap >= STRATEGY_DUPLICATE_OVERLAP * min(len(shingles), len(kept_shingles[position])):
+                is_duplicate = True
+                break
+        
+        if not is_duplicate:
+            for shingle in shingles:
+                shingle_index.setdefault(shingle, []).append(len(cleaned_strategies))
+            kept_shingles.append(shingles)
+            cleaned_strategies.append(cleaned)
+            if limit and len(cleaned_strategies) >= limit:
+                break
+    
+    return cleaned_strategies
+
+# Function to get how relevant a paragraph found by the keyword scan is as a strategy
+def score_strategy_text(text):
+    lowered = text.lower()
+    score = sum(STRATEGY_KEYWORD_WEIGHTS.get(keyword, 1) for keyword in STRATEGY_KEYWORDS if keyword in lowered)
+    return score / (1 + max(0, len(text) - STRATEGY_IDEAL_MAX_LENGTH) / STRATEGY_IDEAL_MAX_LENGTH)
+
+# Function to order keyword scan paragraphs best first, keeping page order between equal scores
+def rank_strategies(strategies):
+    return sorted(strategies, key=score_strategy_text, reverse=True)
+
+# Function to extract priorities, strategies, and Ofsted report links from a school homepage
+def extract_school_website_data(html, url, parser=None):
+    # Parse HTML
+    soup = parse_school_page(html, parser)
+    
+    # Look for Ofsted report links
+    ofsted_url = None
+    
+    # Check all links on the page
+    for link in soup.find_all('a', href=True):
+        link_text = link.get_text().lower()
+        link_href = link['href'].lower()
+        
+        # Check if link text or URL contains Ofsted keywords
+        if any(keyword in link_text for keyword in OFSTED_KEYWORDS) or any(keyword in link_href for keyword in OFSTED_KEYWORDS):
+            # If it's a relative URL, make it absolute
+            if not link['href'].startswith('http'):
+                if link['href'].startswith('/'):
+                    # Get the base URL
+                    parsed_url = urllib.parse.urlparse(url)
+                    base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
+                    ofsted_url = base_url + link['href']
+                else:
+                    # Relative to current path
+                    ofsted_url = url.rstrip('/') + '/' + link['href']
+            else:
+                ofsted_url = link['href']
+            
+            # If we found a direct link to an Ofsted report, prioritize it
+            if 'reports.ofsted.gov.uk' in ofsted_url:
+                break
+    
+    # Find relevant sections for strategies
+    strategies = []
+    
+    # Look for headings with strategy keywords
+    for heading in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
+        heading_text = heading.get_text().lower()
+        
+        if any(keyword in heading_text for keyword in STRATEGY_KEYWORDS):
+            # Get the next few paragraphs or list items
+            content = []
+            element = heading.find_next_sibling()
+            
+            # Collect up to 5 elements after the heading
+            count = 0
+            while element and count < 5:
+                if element.name in ['p', 'li', 'div'] and len(element.get_text().strip()) > 20:
+                    content.append(element.get_text().strip())
+                count += 1
+                element = element.find_next_sibling()
+            
+            if content:
+                strategies.extend(content)
+    
+    # If no structured content found, look for paragraphs with strategy keywords
+    if not strategies:
+        for paragraph in soup.find_all(['p', 'li']):
+            text = paragraph.get_text().strip()
+            if len(text) > 50 and any(keyword in text.lower() for keyword in STRATEGY_KEYWORDS):
+                strategies.append(text)
+        # These can be hundreds of loosely related paragraphs, so the best matches go first
+        strategies = rank_strategies(strategies)
+    
+    # Limit to top 5 most relevant strategies
+    return {
+        "strategies": clean_strategies(strategies, limit=5),
+        "ofsted_url": ofsted_url
+    }
+
+# Budgets for following links from a school homepage (WEBSITE_CRAWL_PAGES=0 fetches the homepage only)
+WEBSITE_CRAWL_PAGES = int(os.environ.get("WEBSITE_CRAWL_PAGES", 5))
+WEBSITE_CRAWL_MAX_BYTES = 4 * 1024 * 1024  # Across all pages, including the homepage
+WEBSITE_CRAWL_MAX_PAGE_BYTES = 1024 * 1024
+WEBSITE_CRAWL_TIME_BUDGET_SECONDS = 5.0  # Wall clock for the whole scrape
+WEBSITE_CRAWL_MAX_PER_HOST = 2  # Concurrent requests to one school's server, across all sessions
+
+# How strongly a link's text or URL suggests it leads to strategy or Ofsted information
+WEBSITE_CRAWL_LINK_KEYWORDS = {
+    "development plan": 5, "sdp": 5, "improvement": 4, "priorities": 4, "strategy": 4,
+    "vision": 3, "values": 2, "aims": 2, "ethos": 2, "ofsted": 3, "inspection": 2,
+    "about": 1, "governors": 1, "governance": 1, "mission": 2
+}
+
+# File types that are never crawled as pages
+WEBSITE_CRAWL_SKIPPED_EXTENSIONS = (".pdf", ".doc", ".docx", ".jpg", ".jpeg", ".png", ".gif", ".zip", ".mp4", ".mp3", ".xls", ".xlsx", ".ppt", ".pptx")
+
+# Function to get the semaphore limiting concurrent requests to a host
+def get_host_semaphore(host):
+    with crawl_host_limits["lock"]:
+        semaphores = crawl_host_limits["semaphores"]
+        if host not in semaphores:
+            semaphores[host] = threading.BoundedSemaphore(WEBSITE_CRAWL_MAX_PER_HOST)
+        return semaphores[host]
+
+# Function to pick the internal links most likely to hold strategy or Ofsted information
+def find_crawl_candidates(html, url, limit):
+    soup = BeautifulSoup(html, WEBSITE_HTML_PARSER, parse_only=SoupStrainer('a', href=True))
+    host = urllib.parse.urlparse(url).netloc.lower()
+    scores = {}
+    
+    for link in soup.find_all('a', href=True):
+        target = urllib.parse.urljoin(url, link['href']).split('#')[0]
+        parsed = urllib.parse.urlparse(target)
+        if parsed.scheme not in ('http', 'https') or parsed.netloc.lower() != host:
+            continue
+        if target.rstrip('/') == url.rstrip('/') or parsed.path.lower().endswith(WEBSITE_CRAWL_SKIPPED_EXTENSIONS):
+            continue
+        
+        text = f"{link.get_text()} {urllib.parse.unquote(parsed.path)}".lower().replace('-', ' ').replace('_', ' ')
+        score = sum(weight for keyword, weight in WEBSITE_CRAWL_LINK_KEYWORDS.items() if keyword in text)
+        if score:
+            scores[target] = max(score, scores.get(target, 0))
+    
+    return sorted(scores, key=lambda target: -scores[target])[:limit]
+
+# Function to fetch one crawled page within the crawl's byte and time budgets
+def fetch_crawl_page(url, deadline, budget):
+    host = urllib.parse.urlparse(url).netloc.lower()
+    with get_host_semaphore(host):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        
+        with guarded_get(crawl_http_session, url, deadline=deadline, timeout=(min(HTTP_TIMEOUT[0], remaining), min(HTTP_TIMEOUT[1], remaining)), stream=True) as response:
+            if response.status_code != 200 or 'html' not in response.headers.get('Content-Type', 'text/html'):
+                return None
+            
+            chunks = []
+            size = 0
+            for chunk in iter_response_chunks(response, WEBSITE_STREAM_CHUNK_BYTES):
+                with budget["lock"]:
+                    allowed = min(len(chunk), budget["bytes_left"], WEBSITE_CRAWL_MAX_PAGE_BYTES - size)
+                    budget["bytes_left"] -= allowed
+                chunks.append(chunk[:allowed])
+                size += allowed
+                if allowed < len(chunk) or time.monotonic() > deadline:
+                    break
+            
+            return b"".join(chunks).decode(response.encoding or 'utf-8', errors='replace')
+
+# Whether the crawl reads robots.txt and sitemaps to find strategy pages
+WEBSITE_USE_SITEMAPS = os.environ.get("WEBSITE_USE_SITEMAPS", "1") != "0"
+
+# Limits for reading a school's robots.txt and sitemaps (cached per host)
+SITE_DISCOVERY_TTL_SECONDS = 86400
+SITEMAP_MAX_FILES = 10  # Sitemaps read per host, counting sitemap indexes
+SITEMAP_MAX_BYTES = 2 * 1024 * 1024  # Per file, after decompression
+SITEMAP_MAX_URLS = 20000
+
+# Function to fetch a robots.txt or sitemap file up to a size cap, decompressing gzipped sitemaps
+# Returns the status code and the body, or (None, b"") when the host can't be reached in time
+def fetch_site_file(url, deadline, max_bytes):
+    host = urllib.parse.urlparse(url).netloc.lower()
+    with get_host_semaphore(host):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None, b""
+        try:
+            with guarded_get(crawl_http_session, url, deadline=deadline, timeout=(min(HTTP_TIMEOUT[0], remaining), min(HTTP_TIMEOUT[1], remaining)), stream=True) as response:
+                if response.status_code != 200:
+                    return response.status_code, b""
+                chunks = []
+                size = 0
+                for chunk in iter_response_chunks(response, WEBSITE_STREAM_CHUNK_BYTES):
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= max_bytes or time.monotonic() > deadline:
+                        break
+        except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError):
+            return None, b""
+
+    data = b"".join(chunks)[:max_bytes]
+    if data[:2] == b"\x1f\x8b":
+        # sitemap.xml.gz - stop decompressing at the cap rather than trusting the archive
+        try:
+            data = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(data, max_bytes)
+        except zlib.error:
+            # A corrupt archive is read as an empty file, so it can't lose the robots.txt rules already read
+            return 200, b""
+    return 200, data
+
+# Function to read the page URLs and nested sitemap URLs from a sitemap or sitemap index
+# A sitemap cut off by the size cap still gives the URLs before the cut
+def read_sitemap_urls(data):
+    parser = xml.etree.ElementTree.XMLPullParser(events=("end",))
+    page_urls = []
+    sitemap_urls = []
+    try:
+        parser.feed(data)
+        parser.close()
+    except xml.etree.ElementTree.ParseError:
+        pass
+    for _, element in parser.read_events():
+        name = element.tag.rsplit('}', 1)[-1]
+        if name in ('url', 'sitemap'):
+            loc = next((child.text.strip() for child in element if child.tag.rsplit('}', 1)[-1] == 'loc' and child.text), None)
+            if loc:
+                (page_urls if name == 'url' else sitemap_urls).append(loc)
+            element.clear()
+    return page_urls, sitemap_urls
+
+# Function to score a URL from a sitemap by the strategy and Ofsted keywords in its path
+def score_site_url(url):
+    words = re.sub(r'[-_/.+%]+', ' ', urllib.parse.unquote(urllib.parse.urlparse(url).path).lower())
+    score = sum(STRATEGY_KEYWORD_WEIGHTS.get(keyword, 1) for keyword in STRATEGY_KEYWORDS if keyword in words)
+    score += sum(2 for keyword in OFSTED_KEYWORDS if keyword in words)
+    return score
+
+# Function to read a school's robots.txt and sitemaps and rank the pages they list
+def discover_site(url, deadline):
+    parsed = urllib.parse.urlparse(url)
+    root = f"{parsed.scheme}://{parsed.netloc}"
+    host = parsed.netloc.lower()
+    discovery = {"fetched_at": time.time(), "robots": None, "crawl_delay": None, "candidates": [], "pdf_candidates": [], "sitemap_files": 0}
+    
+    status, data = fetch_site_file(root + "/robots.txt", deadline, SITEMAP_MAX_BYTES)
+    sitemaps = []
+    if status == 200:
+        robots = urllib.robotparser.RobotFileParser(root + "/robots.txt")
+        robots.parse(data.decode('utf-8', errors='replace').splitlines())
+        discovery["robots"] = robots
+        discovery["crawl_delay"] = robots.crawl_delay(SCRAPER_USER_AGENT)
+        sitemaps = list(robots.site_maps() or [])
+    elif status in (401, 403):
+        # The site forbids crawling altogether
+        robots = urllib.robotparser.RobotFileParser(root + "/robots.txt")
+        robots.disallow_all = True
+        discovery["robots"] = robots
+    
+    if discovery["crawl_delay"]:
+        set_host_crawl_delay(host, float(discovery["crawl_delay"]))
+    
+    # Walk sitemap indexes breadth first, within the file and URL limits
+    queue = sitemaps or [root + "/sitemap.xml"]
+    seen = set()
+    page_urls = []
+    while queue and len(seen) < SITEMAP_MAX_FILES and len(page_urls) < SITEMAP_MAX_URLS:
+        sitemap_url = queue.pop(0)
+        if sitemap_url in seen or urllib.parse.urlparse(sitemap_url).netloc.lower() != host:
+            continue
+        seen.add(sitemap_url)
+        status, data = fetch_site_file(sitemap_url, deadline, SITEMAP_MAX_BYTES)
+        if status == 200:
+            pages, nested = read_sitemap_urls(data)
+            page_urls.extend(pages[:SITEMAP_MAX_URLS - len(page_urls)])
+            queue.extend(nested)
+    discovery["sitemap_files"] = len(seen)
+    
+    scored = {}
+    pdf_scored = {}
+    for page_url in page_urls:
+        target = page_url.split('#')[0]
+        target_parsed = urllib.parse.urlparse(target)
+        if target_parsed.netloc.lower() != host or target.rstrip('/') == url.rstrip('/'):
+            continue
+        path = target_parsed.path.lower()
+        if path.endswith(WEBSITE_CRAWL_SKIPPED_EXTENSIONS) and not path.endswith('.pdf'):
+            continue
+        score = score_site_url(target)
+        if score > 0:
+            (pdf_scored if path.endswith('.pdf') else scored)[target] = score
+    # Best score first, and the shallower page of two equally scored ones
+    discovery["candidates"] = sorted(scored, key=lambda target: (-scored[target], target.count('/'), target))
+    discovery["pdf_candidates"] = sorted(pdf_scored, key=lambda target: (-pdf_scored[target], target.count('/'), target))
+    return discovery
+
+# Function to get a school's robots.txt and sitemap discovery, from the per-host cache while it's fresh
+def get_site_discovery(url, deadline):
+    host = urllib.parse.urlparse(url).netloc.lower()
+    with site_discovery_cache["lock"]:
+        cached = site_discovery_cache["hosts"].get(host)
+    if cached and time.time() - cached["fetched_at"] < SITE_DISCOVERY_TTL_SECONDS:
+        return cached
+    
+    discovery = discover_site(url, deadline)
+    with site_discovery_cache["lock"]:
+        site_discovery_cache["hosts"][host] = discovery
+    return discovery
+
+# Function to check whether robots.txt lets the scraper fetch a page
+def robots_allows(discovery, url):
+    return discovery is None or discovery["robots"] is None or discovery["robots"].can_fetch(SCRAPER_USER_AGENT, url)
+
+# Limits for reading development plans and reports published as PDFs (WEBSITE_PDF_DOCUMENTS=0 skips them)
+WEBSITE_PDF_DOCUMENTS = int(os.environ.get("WEBSITE_PDF_DOCUMENTS", 2))  # Best-scoring PDF links read per school
+WEBSITE_PDF_MAX_BYTES = int(os.environ.get("WEBSITE_PDF_MAX_BYTES", 10 * 1024 * 1024))  # Larger PDFs are dropped without reading the rest
+WEBSITE_PDF_MAX_PAGES = int(os.environ.get("WEBSITE_PDF_MAX_PAGES", 20))
+WEBSITE_PDF_TIMEOUT_SECONDS = float(os.environ.get("WEBSITE_PDF_TIMEOUT_SECONDS", 10))  # Download and extraction of one document
+WEBSITE_PDF_MEMORY_MB = int(os.environ.get("WEBSITE_PDF_MEMORY_MB", 512))  # Extra memory one extraction may use before it is stopped
+WEBSITE_PDF_WORKERS = int(os.environ.get("WEBSITE_PDF_WORKERS", 4))  # Extraction processes running at once, across all sessions
+
+# Bullets and list numbers that start a new paragraph in text taken from a PDF
+PDF_BULLET_PATTERN = re.compile(r'^(?:[•▪●◦‣∙–*-]|\(?\d{1,2}[.)]|\(?[a-z][.)])\s+')
+
+# Function to pick the PDF links most likely to be a development plan or Ofsted report
+# PDFs are often kept on a CMS file host, so unlike pages they may be on another server
+def find_pdf_candidates(html, url, limit):
+    soup = BeautifulSoup(html, WEBSITE_HTML_PARSER, parse_only=SoupStrainer('a', href=True))
+    scores = {}
+    
+    for link in soup.find_all('a', href=True):
+        target = urllib.parse.urljoin(url, link['href']).split('#')[0]
+        parsed = urllib.parse.urlparse(target)
+        if parsed.scheme not in ('http', 'https') or not parsed.path.lower().endswith('.pdf'):
+            continue
+        
+        text = f"{link.get_text()} {urllib.parse.unquote(parsed.path)}".lower().replace('-', ' ').replace('_', ' ')
+        score = sum(weight for keyword, weight in WEBSITE_CRAWL_LINK_KEYWORDS.items() if keyword in text)
+        if score:
+            scores[target] = max(score, scores.get(target, 0))
+    
+    return sorted(scores, key=lambda target: -scores[target])[:limit]
+
+# Function to download a PDF up to the size cap, giving up as soon as it is known to be larger
+def fetch_pdf_document(url, deadline):
+    host = urllib.parse.urlparse(url).netloc.lower()
+    with get_host_semaphore(host):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        
+        with guarded_get(crawl_http_session, url, deadline=deadline, timeout=(min(HTTP_TIMEOUT[0], remaining), min(HTTP_TIMEOUT[1], remaining)), stream=True) as response:
+            if response.status_code != 200:
+                return None
+            if int(response.headers.get('Content-Length') or 0) > WEBSITE_PDF_MAX_BYTES:
+                record_pdf_stat("too_large")
+                return None
+            
+            chunks = []
+            size = 0
+            for chunk in iter_response_chunks(response, WEBSITE_STREAM_CHUNK_BYTES):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > WEBSITE_PDF_MAX_BYTES:
+                    # A cut-off PDF loses its cross-reference table, so there is nothing to gain from the part already read
+                    record_pdf_stat("too_large")
+                    return None
+                if time.monotonic() > deadline:
+                    record_pdf_stat("timeouts")
+                    return None
+    
+    data = b"".join(chunks)
+    return data if b"%PDF-" in data[:1024] else None
+
+# Function to add to the PDF extraction counters shared by every session
+def record_pdf_stat(name, count=1):
+    with pdf_workers["lock"]:
+        pdf_workers["stats"][name] += count
+
+# Function to read the text of a PDF page by page, up to the page limit
+def read_pdf_pages(data, max_pages):
+    reader = pypdf.PdfReader(io.BytesIO(data), strict=False)
+    if reader.is_encrypted:
+        # Most "encrypted" school PDFs only restrict printing and open with an empty password
+        reader.decrypt("")
+    for page in itertools.islice(reader.pages, max_pages):
+        yield page.extract_text() or ""
+
+# Function run in a long-lived PDF worker process: extracts the documents sent to it one at a time,
+# sending each page's text as soon as it is read so that a document stopped by the time limit still gives the pages before it;
+# report downloads sent to it are rendered the same way, sending their progress and then the document
+def run_pdf_worker(connection, memory_bytes):
+    try:
+        if resource and memory_bytes:
+            with open("/proc/self/statm") as f:
+                address_space = int(f.read().split()[0]) * resource.getpagesize()
+            soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+            limit = address_space + memory_bytes
+            resource.setrlimit(resource.RLIMIT_AS, (limit if hard == resource.RLIM_INFINITY else min(limit, hard), hard))
+    except (OSError, ValueError):
+        pass
+    connection.send(("ready", None))
+    
+    while True:
+        try:
+            task, *args = connection.recv()
+        except EOFError:
+            return
+        try:
+            if task == "export":
+                model, export_format = args
+                data = REPORT_EXPORT_FORMATS[export_format]["render"](model, progress=lambda fraction: connection.send(("progress", fraction)))
+                connection.send(("done", data))
+                continue
+            data, max_pages = args
+            for text in read_pdf_pages(data, max_pages):
+                connection.send(("page", text))
+        except MemoryError:
+            # Hit the memory limit - the worker is replaced rather than reused with a fragmented heap
+            connection.send(("error", "memory"))
+            return
+        except Exception as e:
+            connection.send(("error", f"{type(e).__name__}: {e}" if task == "export" else "failures"))
+            continue
+        connection.send(("done", None))
+
+# Function to start a PDF worker process from the forkserver (or spawn), never by forking the threaded web server
+# A new worker imports this script for its functions before it is ready, which takes a few seconds
+def start_pdf_worker():
+    context = pdf_workers["context"]
+    connection, worker_connection = context.Pipe()
+    process = context.Process(target=run_pdf_worker, args=(worker_connection, WEBSITE_PDF_MEMORY_MB * 1024 * 1024),
+                              name="pdf-worker", daemon=True)
+    process.start()
+    worker_connection.close()
+    return {"process": process, "connection": connection, "ready": False}
+
+# Function to wait, up to the deadline, for a new PDF worker to say it has started
+def wait_for_pdf_worker(worker, deadline):
+    if not worker["ready"]:
+        remaining = deadline - time.monotonic()
+        if remaining > 0 and worker["connection"].poll(remaining):
+            worker["ready"] = worker["connection"].recv()[0] == "ready"
+    return worker["ready"]
+
+# Function to stop a PDF worker that overran its document or failed
+def stop_pdf_worker(worker):
+    if worker["process"].is_alive():
+        worker["process"].kill()
+    worker["process"].join()
+    worker["connection"].close()
+
+# Function to take an idle PDF worker, or start one, and wait up to the deadline for it to be ready
+# Returns the worker, or None with "timeouts" or "failures" when none could be had in time
+def take_pdf_worker(deadline):
+    with pdf_workers["lock"]:
+        # Take a worker that has finished starting up if there is one
+        ready = [worker for worker in pdf_workers["idle"] if worker["ready"]]
+        worker = (ready or pdf_workers["idle"] or [None])[-1]
+        if worker is not None:
+            pdf_workers["idle"].remove(worker)
+    if worker is not None and not worker["process"].is_alive():
+        stop_pdf_worker(worker)
+        worker = None
+    
+    try:
+        if worker is None:
+            worker = start_pdf_worker()
+        ready = wait_for_pdf_worker(worker, deadline)
+    except (EOFError, OSError, pickle.PicklingError):
+        # The process couldn't start, or the script it runs can't be imported from where it was loaded
+        if worker is not None:
+            stop_pdf_worker(worker)
+        return None, "failures"
+    if not ready:
+        # Still starting up - it's kept for the next task rather than started again
+        with pdf_workers["lock"]:
+            pdf_workers["idle"].append(worker)
+        return None, "timeouts"
+    return worker, None
+
+# Function to give a PDF worker back to the pool once its task is over
+# A worker still busy past the deadline, or dead, is stopped and a new one starts up in its place while the next task gets ready
+def return_pdf_worker(worker, reusable):
+    if not reusable:
+        stop_pdf_worker(worker)
+        try:
+            worker = start_pdf_worker()
+        except (OSError, pickle.PicklingError):
+            return
+    with pdf_workers["lock"]:
+        pdf_workers["idle"].append(worker)
+
+# Function to extract a PDF's page text in a worker process within the per-document time and memory limits
+# Parsing is CPU-heavy pure Python, so doing it in the web server process would hold up every session
+def extract_pdf_pages(data, deadline, max_pages=None):
+    max_pages = max_pages or WEBSITE_PDF_MAX_PAGES
+    if pypdf is None:
+        return []
+    
+    if not pdf_workers["slots"].acquire(timeout=max(0, deadline - time.monotonic())):
+        record_pdf_stat("timeouts")
+        return []
+    try:
+        worker, problem = take_pdf_worker(deadline)
+        if worker is None:
+            record_pdf_stat(problem)
+            return []
+        
+        pages = []
+        reusable = False
+        try:
+            worker["connection"].send(("pdf", data, max_pages))
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not worker["connection"].poll(remaining):
+                    record_pdf_stat("timeouts")
+                    break
+                kind, value = worker["connection"].recv()
+                if kind == "done":
+                    reusable = True
+                    break
+                if kind == "error":
+                    record_pdf_stat(value)
+                    reusable = value != "memory"
+                    break
+                pages.append(value)
+        except (EOFError, OSError):
+            record_pdf_stat("failures")
+        finally:
+            return_pdf_worker(worker, reusable)
+    finally:
+        pdf_workers["slots"].release()
+    
+    record_pdf_stat("documents")
+    record_pdf_stat("pages", len(pages))
+    return pages
+
+# Function to split text taken from a PDF into paragraphs, joining lines wrapped by the page layout
+# Returns (text, is_heading) pairs - a heading is a short line on its own that doesn't end a sentence
+def split_pdf_paragraphs(text):
+    lines = [" ".join(line.split()) for line in text.splitlines()]
+    paragraphs = []
+    current = []
+    
+    def flush(is_heading=False):
+        if current:
+            paragraphs.append((" ".join(current), is_heading))
+            current.clear()
+    
+    for index, line in enumerate(lines):
+        if not line:
+            flush()
+            continue
+        
+        next_line = next((following for following in lines[index + 1:] if following), "")
+        bullet = PDF_BULLET_PATTERN.match(line)
+        if bullet:
+            flush()
+            current.append(line[bullet.end():])
+        elif (len(line) < 60 and not line.endswith(('.', ',', ';', ':', '!')) and
+                (not next_line or next_line[0].isupper() or next_line[0].isdigit() or PDF_BULLET_PATTERN.match(next_line))):
+            # Wrapped lines run on into a lower-case word; a heading is followed by a new sentence or list
+            flush()
+            current.append(line)
+            flush(is_heading=True)
+        else:
+            if current and current[-1].endswith(('.', ':', '!', '?')):
+                flush()
+            current.append(line)
+    flush()
+    return paragraphs
+
+# Function to find strategies in the text of a PDF, the same way as on a web page:
+# the paragraphs under strategy headings, or else the best paragraphs that mention strategy keywords
+def extract_pdf_strategies(pages):
+    paragraphs = [paragraph for text in pages for paragraph in split_pdf_paragraphs(text)]
+    strategies = []
+    
+    for index, (text, is_heading) in enumerate(paragraphs):
+        if is_heading and any(keyword in text.lower() for keyword in STRATEGY_KEYWORDS):
+            # Up to 5 paragraphs, stopping at the next heading
+            for following, following_heading in paragraphs[index + 1:index + 6]:
+                if following_heading:
+                    break
+                if len(following) > 20:
+                    strategies.append(following)
+    
+    if not strategies:
+        strategies = rank_strategies([text for text, _ in paragraphs
+                                      if len(text) > 50 and any(keyword in text.lower() for keyword in STRATEGY_KEYWORDS)])
+    
+    return {"strategies": clean_strategies(strategies, limit=5), "ofsted_url": None}
+
+# Function to download one PDF and find the strategies in it, all within the per-document time limit
+# and the deadline of the scrape it is part of
+def read_school_pdf(url, deadline=None):
+    timeout_at = time.monotonic() + WEBSITE_PDF_TIMEOUT_SECONDS
+    deadline = timeout_at if deadline is None else min(deadline, timeout_at)
+    if deadline <= time.monotonic():
+        return None
+    data = fetch_pdf_document(url, deadline)
+    if not data:
+        return None
+    
+    def extract():
+        pages = extract_pdf_pages(data, deadline)
+        return extract_pdf_strategies(pages) if pages else None
+    return extract_section(url, data, extract)
+
+# Function to create the PDF worker processes' pool: the limit on tasks running at once, the idle workers and their counters
+# (the same workers render the Word and PDF report downloads)
+def create_pdf_workers():
+    return {
+        "slots": threading.BoundedSemaphore(WEBSITE_PDF_WORKERS),
+        # Workers are started by a forkserver (spawn without one), so they never inherit the web server's threads and sockets
+        "context": multiprocessing.get_context("forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"),
+        "idle": [],
+        "lock": threading.Lock(),
+        "stats": {"documents": 0, "pages": 0, "too_large": 0, "timeouts": 0, "memory": 0, "failures": 0}
+    }
+
+# Function to combine the results from several pages of a school website
+def merge_website_results(results):
+    strategies = []
+    ofsted_url = None
+    for result in results:
+        strategies.extend(result["strategies"])
+        # A direct link to the Ofsted reports site beats a link to the school's own Ofsted page
+        if result["ofsted_url"] and (ofsted_url is None or
+                ('reports.ofsted.gov.uk' in result["ofsted_url"] and 'reports.ofsted.gov.uk' not in ofsted_url)):
+            ofsted_url = result["ofsted_url"]
+    return {"strategies": clean_strategies(strategies, limit=5), "ofsted_url": ofsted_url}
+
+# Function to follow the most promising links from a homepage concurrently and merge what they contain
+# Pages listed in the school's sitemap come first, then links guessed from the homepage,
+# and PDFs linked from any of them (or listed in the sitemap) are read last
+def crawl_school_website(url, homepage_html, homepage_result, deadline, max_pages=None, discovery=None):
+    max_pages = max_pages or WEBSITE_CRAWL_PAGES
+    candidates = list(discovery["candidates"][:max_pages]) if discovery else []
+    candidates += [candidate for candidate in find_crawl_candidates(homepage_html, url, max_pages) if candidate not in candidates]
+    candidates = [candidate for candidate in candidates if robots_allows(discovery, candidate)][:max_pages]
+    
+    # Keep the homepage first and the rest in link-score order
+    results = [homepage_result]
+    pages = [(url, homepage_html)]
+    if candidates:
+        budget = {"bytes_left": WEBSITE_CRAWL_MAX_BYTES - len(homepage_html.encode('utf-8', errors='replace')), "lock": threading.Lock()}
+        futures = {crawl_executor.submit(fetch_crawl_page, candidate, deadline, budget): candidate for candidate in candidates}
+        done, not_done = concurrent.futures.wait(futures, timeout=max(0, deadline - time.monotonic()))
+        for future in not_done:
+            future.cancel()
+        
+        for future in sorted(done, key=lambda future: candidates.index(futures[future])):
+            try:
+                html = future.result()
+            except Exception:
+                continue
+            if html:
+                results.append(extract_section(futures[future], html, lambda: extract_school_website_data(html, futures[future])))
+                pages.append((futures[future], html))
+    
+    results.extend(crawl_school_pdfs(pages, discovery, deadline=deadline))
+    return merge_website_results(results)
+
+# Function to read the best-scoring PDFs linked from the crawled pages, each with its own time limit
+# PDFs are read with whatever is left of the deadline, and skipped once it has passed
+def crawl_school_pdfs(pages, discovery=None, limit=None, deadline=None):
+    limit = limit or WEBSITE_PDF_DOCUMENTS
+    if pypdf is None or limit <= 0 or (deadline is not None and time.monotonic() >= deadline):
+        return []
+    
+    candidates = list(discovery["pdf_candidates"][:limit]) if discovery else []
+    for page_url, html in pages:
+        candidates += [candidate for candidate in find_pdf_candidates(html, page_url, limit) if candidate not in candidates]
+    candidates = [candidate for candidate in candidates if robots_allows(discovery, candidate)][:limit]
+    if not candidates:
+        return []
+    
+    futures = [crawl_executor.submit(read_school_pdf, candidate, deadline) for candidate in candidates]
+    done, not_done = concurrent.futures.wait(futures, timeout=None if deadline is None else max(0, deadline - time.monotonic()))
+    for future in not_done:
+        future.cancel()
+    
+    results = []
+    for future in [future for future in futures if future in done]:
+        try:
+            result = future.result()
+        except Exception:
+            continue
+        if result:
+            results.append(result)
+    return results
+
+# Homepage download limits - bytes beyond the cap are never read
+WEBSITE_HOMEPAGE_MAX_BYTES = int(os.environ.get("WEBSITE_HOMEPAGE_MAX_BYTES", 2 * 1024 * 1024))
+WEBSITE_STREAM_CHUNK_BYTES = 16384
+
+# Elements html.parser never keeps open
+VOID_HTML_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+
+# Incremental parser fed with a homepage as it downloads, to tell when reading more can't change the extracted data
+# It follows the tree html.parser builds: a strategy heading's block is complete once five following
+# siblings have been seen or the heading's parent has closed, the same window the extractor reads
+class HomepageScanner(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+        self.captures = []
+        self.blocks = []
+        self.found_ofsted_report = False
+    
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href and 'reports.ofsted.gov.uk' in href:
+                self.found_ofsted_report = True
+        
+        depth = len(self.stack)
+        for block in self.blocks:
+            if not block["done"] and depth == block["depth"]:
+                block["siblings"] += 1
+                if block["siblings"] <= 5 and tag in ('p', 'li', 'div'):
+                    block["open"] += 1
+                    self.captures.append({"depth": depth, "parts": [], "block": block})
+        
+        if tag in VOID_HTML_TAGS:
+            self.update_blocks()
+            return
+        self.stack.append(tag)
+        if tag in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
+            self.captures.append({"depth": depth, "parts": [], "block": None})
+        self.update_blocks()
+    
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            return
+        # Close the most recent element with this name and everything opened inside it
+        del self.stack[len(self.stack) - 1 - self.stack[::-1].index(tag):]
+        
+        for capture in [capture for capture in self.captures if len(self.stack) <= capture["depth"]]:
+            self.captures.remove(capture)
+            text = "".join(capture["parts"])
+            if capture["block"] is None:
+                if any(keyword in text.lower() for keyword in STRATEGY_KEYWORDS):
+                    self.blocks.append({"depth": capture["depth"], "siblings": 0, "open": 0, "texts": [], "done": False})
+            else:
+                capture["block"]["open"] -= 1
+                if len(text.strip()) > 20:
+                    capture["block"]["texts"].append(text.strip())
+        self.update_blocks()
+    
+    def handle_data(self, data):
+        # Script and style text is left out of get_text() too
+        if self.stack and self.stack[-1] in ('script', 'style'):
+            return
+        for capture in self.captures:
+            capture["parts"].append(data)
+    
+    def update_blocks(self):
+        for block in self.blocks:
+            if not block["done"] and (len(self.stack) < block["depth"] or (block["siblings"] >= 5 and block["open"] == 0)):
+                block["done"] = True
+    
+    # Strategy texts of the complete blocks before the first incomplete one, which later content can't displace
+    def settled_strategies(self):
+        texts = []
+        for block in self.blocks:
+            if not block["done"]:
+                break
+            texts.extend(block["texts"])
+        return texts
+
+# Function to read a streamed response in pieces as they arrive, so a slowly dripping server can't hold a read past the deadline
+def iter_response_chunks(response, chunk_size):
+    read1 = getattr(response.raw, "read1", None)
+    if read1 is None:
+        # urllib3 1.x only reads whole chunks
+        yield from response.iter_content(chunk_size)
+        return
+    while True:
+        chunk = read1(chunk_size, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+# Function to get an incremental decoder for a response's declared encoding
+def get_response_decoder(response):
+    try:
+        return codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+    except LookupError:
+        return codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+# Function to check a homepage result is as full as one can be: five strategies and a direct Ofsted report link
+def is_complete_homepage_result(result):
+    return len(result["strategies"]) == 5 and bool(result["ofsted_url"]) and 'reports.ofsted.gov.uk' in result["ofsted_url"]
+
+# Function to stream a homepage up to the byte cap and the deadline, extracting its data
+# Stops reading as soon as a direct Ofsted report link and five settled strategies have been found
+# Returns the HTML read, the extracted result and whether it stopped early with a complete result
+def read_school_homepage(response, url, deadline):
+    decoder = get_response_decoder(response)
+    scanner = HomepageScanner()
+    chunks = []
+    parts = []
+    size = 0
+    settled_count = 0
+    
+    for chunk in iter_response_chunks(response, WEBSITE_STREAM_CHUNK_BYTES):
+        chunk = chunk[:WEBSITE_HOMEPAGE_MAX_BYTES - size]
+        size += len(chunk)
+        chunks.append(chunk)
+        text = decoder.decode(chunk)
+        parts.append(text)
+        scanner.feed(text)
+        
+        settled = scanner.settled_strategies()
+        if scanner.found_ofsted_report and len(settled) > settled_count:
+            settled_count = len(settled)
+            if len(clean_strategies(settled, limit=5)) >= 5:
+                html = "".join(parts)
+                
+                # Only a complete result is kept, so an incomplete one for part of the page can't displace the whole page's
+                def extract():
+                    result = extract_school_website_data(html, url)
+                    return result if is_complete_homepage_result(result) else None
+                result = extract_section(url, b"".join(chunks), extract)
+                # The scanner only decides when to look - the page read so far must give the full result on its own
+                if result is not None and is_complete_homepage_result(result):
+                    return html, result, True
         
-        # If CSV not found, show error
-        st.error("National datasheet CSV file not found. Please ensure the file is uploaded correctly.")
-        return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Error loading CSV file: {e}")
-        return pd.DataFrame()
+        if size >= WEBSITE_HOMEPAGE_MAX_BYTES or time.monotonic() > deadline:
+            break
+    
+    parts.append(decoder.decode(b"", final=True))
+    html = "".join(parts)
+    return html, extract_section(url, b"".join(chunks), lambda: extract_school_website_data(html, url)), False
 
-# Function to get default Ofsted report URL (fallback)
-def get_default_ofsted_report_url(urn):
-    return f"https://reports.ofsted.gov.uk/provider/21/{urn}"
+# Function to download a school website and extract its data, without the cache
+# Returns the HTTP status, the extracted result (None unless the status is 200) and the response headers
+def fetch_school_website(url, headers=None, deadline=None):
+    if deadline is None:
+        deadline = time.monotonic() + WEBSITE_CRAWL_TIME_BUDGET_SECONDS
+    
+    # Read robots.txt and the sitemaps while the homepage downloads
+    discovery_future = crawl_executor.submit(get_site_discovery, url, deadline) if WEBSITE_CRAWL_PAGES > 0 and WEBSITE_USE_SITEMAPS else None
+    
+    # Add timeout to avoid hanging
+    with guarded_get(http_session, url, deadline=deadline, timeout=HTTP_TIMEOUT, headers=headers or {}, stream=True) as response:
+        if response.status_code != 200:
+            return response.status_code, None, response.headers
+        try:
+            html, result, complete = read_school_homepage(response, url, deadline)
+        except HOST_FAILURE_ERRORS as e:
+            # The server answered but stalled part way through the page
+            record_host_result(urllib.parse.urlparse(url).netloc.lower(), e)
+            raise
+    
+    # Nothing on other pages could displace a complete homepage result
+    if WEBSITE_CRAWL_PAGES > 0 and not complete:
+        # Don't let a slow sitemap eat the whole crawl budget - it keeps loading into the cache for next time
+        try:
+            discovery = discovery_future.result(timeout=max(0, deadline - time.monotonic()) / 2) if discovery_future else None
+        except Exception:
+            discovery = None
+        result = crawl_school_website(url, html, result, deadline, discovery=discovery)
+    return response.status_code, result, response.headers
 
 # Enhanced function to scrape school website for priorities, strategies, and Ofsted report links
+# Runs on a background thread, where Streamlit calls are dropped, so a failure is returned as the result's "error"
 def scrape_school_website(url):
     if not url or not isinstance(url, str) or not url.startswith('http'):
         return {"strategies": [], "ofsted_url": None}
     
+    cached = None
     try:
-        # Add timeout to avoid hanging
-        response = requests.get(url, timeout=10, headers={
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        deadline = time.monotonic() + WEBSITE_CRAWL_TIME_BUDGET_SECONDS
         
-        if response.status_code != 200:
-            return {"strategies": [], "ofsted_url": None}
-        
-        # Parse HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # Serve from the persistent cache while the entry is fresh
+        cached = read_website_cache(website_cache, url)
+        if cached and time.time() - cached["fetched_at"] < website_cache["ttl_seconds"]:
+            record_website_cache_stat(website_cache, "hits")
+            return {"strategies": cached["strategies"], "ofsted_url": cached["ofsted_url"]}
         
-        # Look for Ofsted report links
-        ofsted_url = None
-        ofsted_keywords = ['ofsted', 'inspection', 'report']
+        headers = {}
         
-        # Check all links on the page
-        for link in soup.find_all('a', href=True):
-            link_text = link.get_text().lower()
-            link_href = link['href'].lower()
-            
-            # Check if link text or URL contains Ofsted keywords
-            if any(keyword in link_text for keyword in ofsted_keywords) or any(keyword in link_href for keyword in ofsted_keywords):
-                # If it's a relative URL, make it absolute
-                if not link['href'].startswith('http'):
-                    if link['href'].startswith('/'):
-                        # Get the base URL
-                        parsed_url = urllib.parse.urlparse(url)
-                        base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
-                        ofsted_url = base_url + link['href']
-                    else:
-                        # Relative to current path
-                        ofsted_url = url.rstrip('/') + '/' + link['href']
-                else:
-                    ofsted_url = link['href']
-                
-                # If we found a direct link to an Ofsted report, prioritize it
-                if 'reports.ofsted.gov.uk' in ofsted_url:
-                    break
+        # Stale entry - ask the site whether the page changed rather than downloading it again
+        if cached:
+            if cached["etag"]:
+                headers['If-None-Match'] = cached["etag"]
+            if cached["last_modified"]:
+                headers['If-Modified-Since'] = cached["last_modified"]
         
-        # Keywords to look for in headings and content for strategies
-        strategy_keywords = [
-            'strategy', 'strategic', 'priorities', 'priority', 'vision', 'mission', 
-            'values', 'aims', 'objectives', 'goals', 'improvement', 'plan', 
-            'development', 'school development plan', 'sdp'
-        ]
+        status_code, result, response_headers = fetch_school_website(url, headers, deadline)
         
-        # Find relevant sections for strategies
-        strategies = []
+        if status_code == 304 and cached:
+            touch_website_cache(website_cache, url)
+            record_website_cache_stat(website_cache, "revalidated")
+            return {"strategies": cached["strategies"], "ofsted_url": cached["ofsted_url"]}
         
-        # Look for headings with strategy keywords
-        for heading in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-            heading_text = heading.get_text().lower()
-            
-            if any(keyword in heading_text for keyword in strategy_keywords):
-                # Get the next few paragraphs or list items
-                content = []
-                element = heading.find_next_sibling()
-                
-                # Collect up to 5 elements after the heading
-                count = 0
-                while element and count < 5:
-                    if element.name in ['p', 'li', 'div'] and len(element.get_text().strip()) > 20:
-                        content.append(element.get_text().strip())
-                    count += 1
-                    element = element.find_next_sibling()
-                
-                if content:
-                    strategies.extend(content)
+        if status_code != 200:
+            if cached:
+                # The site is erroring - what was read from it last time is better than nothing
+                return {"strategies": cached["strategies"], "ofsted_url": cached["ofsted_url"]}
+            return {"strategies": [], "ofsted_url": None, "error": f"Could not scrape school website: HTTP {status_code}"}
         
-        # If no structured content found, look for paragraphs with strategy keywords
-        if not strategies:
-            for paragraph in soup.find_all(['p', 'li']):
-                text = paragraph.get_text().strip()
-                if len(text) > 50 and any(keyword in text.lower() for keyword in strategy_keywords):
-                    strategies.append(text)
+        write_website_cache(website_cache, url, result, response_headers.get('ETag'), response_headers.get('Last-Modified'))
+        record_website_cache_stat(website_cache, "changed" if cached else "misses")
+        return result
         
-        # Deduplicate and clean strategies
-        cleaned_strategies = []
-        for text in strategies:
-            # Clean up whitespace
-            cleaned = re.sub(r'\s+', ' ', text).strip()
-            
-            # Skip if too short
-            if len(cleaned) < 30:
-                continue
-                
-            # Check if this is a duplicate or very similar
-            is_duplicate = False
-            for existing in cleaned_strategies:
-                if cleaned in existing or existing in cleaned:
-                    is_duplicate = True
-                    break
-                    
-            if not is_duplicate:
-                cleaned_strategies.append(cleaned)
+    except Exception as e:
+        if cached:
+            # Unreachable or too slow - the stale entry stands in until the site answers again
+            return {"strategies": cached["strategies"], "ofsted_url": cached["ofsted_url"]}
+        return {"strategies": [], "ofsted_url": None, "error": f"Could not scrape school website: {e}"}
+
+# Where raw responses are archived for re-extraction and replay (empty = no archive)
+WEBSITE_ARCHIVE_DIR = os.environ.get("WEBSITE_ARCHIVE_DIR", "")
+
+# Archive files are started afresh past this size
+WEBSITE_ARCHIVE_FILE_BYTES = 256 * 1024 * 1024
+
+# Bodies are archived up to every reader's cap plus a chunk, so a replayed response
+# is cut off at exactly the point the live one was
+WEBSITE_ARCHIVE_MAX_BYTES = max(WEBSITE_HOMEPAGE_MAX_BYTES, WEBSITE_PDF_MAX_BYTES, SITEMAP_MAX_BYTES) + WEBSITE_STREAM_CHUNK_BYTES
+
+# Function to open a raw response archive, mode "record" to add to it or "replay" to serve responses from it
+# Records are WARC response records, each its own gzip member, with a CDX line per record saying where it is
+def open_website_archive(directory, mode="record"):
+    archive = {"directory": directory, "mode": mode, "lock": threading.Lock(), "file": None, "cdx": None, "path": None,
+               "files": 0, "index": {}, "stats": {"records": 0, "raw_bytes": 0, "stored_bytes": 0}}
+    if mode == "record":
+        os.makedirs(directory, exist_ok=True)
+        return archive
+    
+    # The last record of a URL wins, and file names sort in the order they were written
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".cdx"):
+            continue
+        path = os.path.join(directory, name[:-len(".cdx")] + ".warc.gz")
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) == 5:
+                    archive["index"][urllib.parse.unquote(fields[0])] = (path, int(fields[3]), int(fields[4]))
+    return archive
+
+# Function to append one response to the archive and index it
+def write_archive_record(archive, url, status, reason, headers, body, truncated):
+    # The body is stored decoded, so the transfer headers no longer apply to it
+    http_head = f"HTTP/1.1 {status} {reason}\r\n" + "".join(
+        f"{name}: {value}\r\n" for name, value in headers.items() if name.lower() not in ("content-encoding", "transfer-encoding")
+    ) + "\r\n"
+    payload = http_head.encode("latin-1", errors="replace") + body
+    date = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    warc_head = (
+        "WARC/1.1\r\nWARC-Type: response\r\n"
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\nWARC-Date: {date}\r\nWARC-Target-URI: {url}\r\n"
+        f"Content-Type: application/http;msgtype=response\r\nContent-Length: {len(payload)}\r\n"
+        + ("WARC-Truncated: length\r\n" if truncated else "") + "\r\n"
+    )
+    record = gzip.compress(warc_head.encode("utf-8") + payload + b"\r\n\r\n", compresslevel=6)
+    
+    with archive["lock"]:
+        # Each process writes its own file, so prefetch workers never interleave records
+        if archive["file"] is None or archive["file"].tell() >= WEBSITE_ARCHIVE_FILE_BYTES:
+            if archive["file"] is not None:
+                archive["file"].close()
+                archive["cdx"].close()
+            name = f"{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}-{archive['files']}"
+            archive["files"] += 1
+            archive["path"] = os.path.join(archive["directory"], name + ".warc.gz")
+            archive["file"] = open(archive["path"], "ab")
+            archive["cdx"] = open(os.path.join(archive["directory"], name + ".cdx"), "a", encoding="utf-8")
+        offset = archive["file"].tell()
+        archive["file"].write(record)
+        archive["file"].flush()
+        archive["cdx"].write(f"{urllib.parse.quote(url, safe=':/?&=%#+;,@!$()*~')} {date} {status} {offset} {len(record)}\n")
+        archive["cdx"].flush()
+        archive["index"][url] = (archive["path"], offset, len(record))
+        archive["stats"]["records"] += 1
+        archive["stats"]["raw_bytes"] += len(payload)
+        archive["stats"]["stored_bytes"] += len(record)
+
+# Function to read one archived response back as (status, reason, headers, body)
+def read_archive_record(path, offset, length):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = gzip.decompress(f.read(length))
+    warc_head, _, rest = data.partition(b"\r\n\r\n")
+    content_length = next(int(line.split(b":", 1)[1]) for line in warc_head.split(b"\r\n") if line.lower().startswith(b"content-length:"))
+    http_head, _, body = rest[:content_length].partition(b"\r\n\r\n")
+    status_line, *header_lines = http_head.decode("latin-1").split("\r\n")
+    _, status, reason = (status_line.split(" ", 2) + [""])[:3]
+    headers = requests.structures.CaseInsensitiveDict(
+        (name.strip(), value.strip()) for name, _, value in (line.partition(":") for line in header_lines)
+    )
+    return int(status), reason, headers, body
+
+# Function to build a streaming response over a body that is already in memory
+def build_buffered_response(url, status, reason, headers, body):
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response.reason = reason
+    response.headers = requests.structures.CaseInsensitiveDict(headers)
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    # The body may have been cut off, so urllib3 isn't told the length the server sent
+    response.raw = urllib3.response.HTTPResponse(
+        body=io.BytesIO(body), headers={name: value for name, value in headers.items() if name.lower() not in ("content-encoding", "content-length")},
+        status=status, reason=reason, preload_content=False, decode_content=False
+    )
+    return response
+
+# Function to archive a live response, handing back an equivalent response read from memory
+# Reading the whole body (to the cap or the deadline) is what makes the archive complete enough to re-extract from,
+# at the cost of the early stop on homepages while recording
+def archive_response(archive, url, response, deadline=None):
+    # A 304 has no body - keep the full response archived before it
+    if response.status_code == 304:
+        return response
+    
+    chunks = []
+    size = 0
+    truncated = False
+    with response:
+        for chunk in iter_response_chunks(response, WEBSITE_STREAM_CHUNK_BYTES):
+            chunks.append(chunk)
+            size += len(chunk)
+            # A slowly dripping server is cut off at the deadline, as read_school_homepage would cut it off
+            if size > WEBSITE_ARCHIVE_MAX_BYTES or (deadline is not None and time.monotonic() > deadline):
+                truncated = True
+                break
+    body = b"".join(chunks)[:WEBSITE_ARCHIVE_MAX_BYTES]
+    
+    write_archive_record(archive, url, response.status_code, response.reason or "", response.headers, body, truncated)
+    return build_buffered_response(url, response.status_code, response.reason or "", response.headers, body)
+
+# Function to answer a request from the archive, as a connection error when the URL was never archived
+def replay_archived_response(archive, url):
+    location = archive["index"].get(url)
+    if location is None:
+        raise requests.exceptions.ConnectionError(f"{url} is not in the archive")
+    status, reason, headers, body = read_archive_record(*location)
+    return build_buffered_response(url, status, reason, headers, body)
+
+# Where the offline prefetch stores website data, keyed by URN
+PREFETCH_STORE_PATH = os.environ.get("PREFETCH_STORE_PATH", "prefetched_websites.sqlite3")
+
+# Results written per transaction by the prefetch, so a crash loses at most this many schools
+PREFETCH_CHECKPOINT_EVERY = 25
+
+# Function to open (and create if needed) the prefetch store
+def open_prefetch_store(path):
+    with sqlite3.connect(path) as connection:
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS prefetched_websites (
+                urn INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                status TEXT NOT NULL,
+                strategies TEXT NOT NULL,
+                ofsted_url TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS refresh_schedule (
+                urn INTEGER PRIMARY KEY,
+                result_hash TEXT,
+                checked_at REAL,
+                changed_at REAL,
+                interval REAL NOT NULL,
+                views INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS extracted_sections (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                result TEXT NOT NULL,
+                checked_at REAL NOT NULL,
+                extracted_at REAL NOT NULL
+            )
+        """)
+    return {"path": path}
+
+# Function to get the prefetched website data for a school, or None if it wasn't prefetched successfully
+def read_prefetched_website(store, urn):
+    try:
+        with sqlite3.connect(store["path"]) as connection:
+            row = connection.execute(
+                "SELECT strategies, ofsted_url FROM prefetched_websites WHERE urn = ? AND status = 'ok'", (int(urn),)
+            ).fetchone()
+    except (sqlite3.Error, ValueError, TypeError):
+        return None
+    if row is None:
+        return None
+    return {"strategies": json.loads(row[0]), "ofsted_url": row[1]}
+
+# Function to get the URNs already in the prefetch store (the resume checkpoint)
+def read_prefetched_urns(store, include_failed=True):
+    query = "SELECT urn FROM prefetched_websites" if include_failed else "SELECT urn FROM prefetched_websites WHERE status = 'ok'"
+    with sqlite3.connect(store["path"]) as connection:
+        return {row[0] for row in connection.execute(query)}
+
+# Function to write a batch of prefetch results in one transaction
+# A failed fetch never replaces data from an earlier one that worked
+def write_prefetched_websites(store, rows):
+    with sqlite3.connect(store["path"]) as connection:
+        for status, verb in [("ok", "INSERT OR REPLACE"), ("failed", "INSERT OR IGNORE")]:
+            connection.executemany(
+                f"{verb} INTO prefetched_websites (urn, url, status, strategies, ofsted_url, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(urn, url, status, json.dumps(result["strategies"]), result["ofsted_url"], time.time()) for urn, url, row_status, result in rows if row_status == status]
+            )
+
+# How often a school's website is checked again - the interval halves when it changed and doubles when it didn't
+REFRESH_DEFAULT_INTERVAL_SECONDS = 7 * 86400
+REFRESH_MIN_INTERVAL_SECONDS = 86400
+REFRESH_MAX_INTERVAL_SECONDS = 60 * 86400
+
+# How long a view count waits for a store busy with the refresh before it is dropped
+REFRESH_VIEW_TIMEOUT_SECONDS = 0.5
+
+# Function to hash what was extracted for a school, so a refresh can tell whether anything changed
+def hash_website_result(result):
+    return hashlib.sha1(json.dumps([result["strategies"], result["ofsted_url"]]).encode("utf-8")).hexdigest()
+
+# Function to record a batch of fetches in the refresh schedule, adapting each school's interval to how often it changes
+def update_refresh_schedule(store, rows, now=None):
+    now = now or time.time()
+    with sqlite3.connect(store["path"]) as connection:
+        previous = {}
+        for start in range(0, len(rows), 500):
+            urns = [row[0] for row in rows[start:start + 500]]
+            previous.update((row[0], row[1:]) for row in connection.execute(
+                f"SELECT urn, result_hash, changed_at, interval FROM refresh_schedule WHERE urn IN ({','.join('?' * len(urns))})", urns
+            ))
         
-        # Limit to top 5 most relevant strategies
-        return {
-            "strategies": cleaned_strategies[:5],
-            "ofsted_url": ofsted_url
-        }
+        updates = []
+        for urn, url, status, result in rows:
+            result_hash, changed_at, interval = previous.get(urn, (None, None, REFRESH_DEFAULT_INTERVAL_SECONDS))
+            if status == "ok":
+                new_hash = hash_website_result(result)
+                if result_hash is None:
+                    changed_at = now
+                elif new_hash != result_hash:
+                    changed_at = now
+                    interval = max(REFRESH_MIN_INTERVAL_SECONDS, interval / 2)
+                else:
+                    interval = min(REFRESH_MAX_INTERVAL_SECONDS, interval * 2)
+                result_hash = new_hash
+            updates.append((urn, result_hash, now, changed_at, interval))
         
-    except Exception as e:
-        st.warning(f"Could not scrape school website: {e}")
-        return {"strategies": [], "ofsted_url": None}
+        connection.executemany("""
+            INSERT INTO refresh_schedule (urn, result_hash, checked_at, changed_at, interval) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(urn) DO UPDATE SET result_hash = excluded.result_hash, checked_at = excluded.checked_at,
+                changed_at = excluded.changed_at, interval = excluded.interval
+        """, updates)
+
+# Function to count a view of a school, which makes the refresh check it more often
+# A count is best effort, so it gives up quickly rather than wait for a refresh to finish writing
+def record_school_view(store, urn, count=1):
+    try:
+        with sqlite3.connect(store["path"], timeout=REFRESH_VIEW_TIMEOUT_SECONDS) as connection:
+            connection.execute("""
+                INSERT INTO refresh_schedule (urn, interval, views) VALUES (?, ?, ?)
+                ON CONFLICT(urn) DO UPDATE SET views = views + excluded.views
+            """, (int(urn), REFRESH_DEFAULT_INTERVAL_SECONDS, count))
+    except (sqlite3.Error, ValueError, TypeError):
+        pass
+
+# Function to read the refresh schedule as {urn: (checked_at, changed_at, interval, views)}
+def read_refresh_schedule(store):
+    with sqlite3.connect(store["path"]) as connection:
+        return {row[0]: row[1:] for row in connection.execute("SELECT urn, checked_at, changed_at, interval, views FROM refresh_schedule")}
+
+# Function to get a school's refresh priority - how far past its interval it is, weighted by how much it is viewed
+# Schools never fetched come first; a priority below 1 means the school isn't due yet
+def get_refresh_priority(entry, now):
+    checked_at, _, interval, views = entry
+    if checked_at is None:
+        return math.inf
+    return (now - checked_at) / interval * (1 + math.log1p(views))
+
+# Function to pick the schools to refresh next, the most overdue first, up to the budget
+def select_refresh_batch(store, schools, now, limit):
+    schedule = read_refresh_schedule(store)
+    default = (None, None, REFRESH_DEFAULT_INTERVAL_SECONDS, 0)
+    due = []
+    for urn, url in schools:
+        entry = schedule.get(urn, default)
+        priority = get_refresh_priority(entry, now)
+        if priority >= 1:
+            due.append((priority, entry[3], urn, url))
+    return [(urn, url) for _, _, urn, url in heapq.nlargest(limit, due)], len(due)
+
+# Function to summarise how much of the dataset has been fetched and how long ago it was checked
+def get_refresh_report(store, schools, now):
+    schedule = read_refresh_schedule(store)
+    covered = read_prefetched_urns(store, include_failed=False)
+    urns = [urn for urn, _ in schools]
+    ages = np.array([now - schedule[urn][0] for urn in urns if urn in schedule and schedule[urn][0] is not None])
+    percentiles = np.percentile(ages, [50, 90, 99]) if len(ages) else [math.nan] * 3
+    return {
+        "schools": len(urns),
+        "covered": sum(urn in covered for urn in urns),
+        "checked": len(ages),
+        "due": sum(get_refresh_priority(schedule[urn], now) >= 1 if urn in schedule else True for urn in urns),
+        "age_p50": percentiles[0],
+        "age_p90": percentiles[1],
+        "age_p99": percentiles[2],
+        "age_max": ages.max() if len(ages) else math.nan
+    }
+
+# Function to print a refresh report, with ages in days
+def print_refresh_report(report):
+    print(f"Coverage: {report['covered']}/{report['schools']} schools with website data "
+          f"({report['covered'] / max(report['schools'], 1):.1%}), {report['checked']} checked, {report['due']} due now")
+    print(f"Days since last check: p50 {report['age_p50'] / 86400:.1f}, p90 {report['age_p90'] / 86400:.1f}, "
+          f"p99 {report['age_p99'] / 86400:.1f}, max {report['age_max'] / 86400:.1f}")
+
+# Bump when the extraction code changes, so every cached section is extracted again
+SECTION_EXTRACTION_VERSION = 1
+
+# Function to set up reuse of extraction results for pages and PDFs whose content hasn't changed
+# The keywords go into every hash, so changing them is enough to extract everything again
+def open_section_cache(path):
+    fingerprint = json.dumps([SECTION_EXTRACTION_VERSION, STRATEGY_KEYWORDS, STRATEGY_KEYWORD_WEIGHTS, OFSTED_KEYWORDS, WEBSITE_PDF_MAX_PAGES])
+    return {"path": path, "fingerprint": fingerprint.encode("utf-8")}
+
+# Function to extract a homepage, crawled page or PDF, reusing the last result for the same URL while its content hash matches
+# extract returns the result, or None for one that shouldn't be kept (a PDF cut short by its limits)
+def extract_section(url, content, extract):
+    if section_cache is None:
+        return extract()
+    
+    data = content.encode("utf-8", errors="replace") if isinstance(content, str) else content
+    content_hash = hashlib.sha1(section_cache["fingerprint"] + data).hexdigest()
+    now = time.time()
+    with sqlite3.connect(section_cache["path"], timeout=30) as connection:
+        row = connection.execute("SELECT content_hash, result FROM extracted_sections WHERE url = ?", (url,)).fetchone()
+        if row and row[0] == content_hash:
+            connection.execute("UPDATE extracted_sections SET checked_at = ? WHERE url = ?", (now, url))
+            return json.loads(row[1])
+    
+    result = extract()
+    if result is not None:
+        with sqlite3.connect(section_cache["path"], timeout=30) as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO extracted_sections (url, content_hash, result, checked_at, extracted_at) VALUES (?, ?, ?, ?, ?)",
+                (url, content_hash, json.dumps(result), now, now)
+            )
+    return result
+
+# Function to count the sections checked since a time, and how many of them had to be extracted again
+def count_section_extractions(store, since):
+    with sqlite3.connect(store["path"]) as connection:
+        checked, extracted = connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(extracted_at >= ?), 0) FROM extracted_sections WHERE checked_at >= ?", (since, since)
+        ).fetchone()
+    return checked, extracted
+
+# Function to set up a prefetch worker process with its own connections, threads and the shared rate limit
+def init_prefetch_worker(next_slot, rate_lock, rate_per_second, archive=None, sections=None):
+    global http_session, crawl_http_session, crawl_executor, crawl_host_limits, host_health, site_discovery_cache, pdf_workers, website_archive, section_cache, prefetch_rate_limit
+    # Sockets and threads inherited from the parent can't be used safely in a forked child
+    http_session = create_http_session()
+    crawl_http_session = create_http_session(retries=0)
+    crawl_executor = concurrent.futures.ThreadPoolExecutor(max_workers=WEBSITE_CRAWL_MAX_PER_HOST, thread_name_prefix="website-crawl")
+    crawl_host_limits = {"semaphores": {}, "lock": threading.Lock()}
+    host_health = {"hosts": {}, "lock": threading.Lock(), "stats": {"skipped": 0, "failures": 0}}
+    site_discovery_cache = {"hosts": {}, "lock": threading.Lock()}
+    pdf_workers = create_pdf_workers()
+    # archive is (directory, mode) - each worker records to its own file
+    website_archive = open_website_archive(*archive) if archive else None
+    # sections is the store path when unchanged pages and PDFs should reuse their last extraction
+    section_cache = open_section_cache(sections) if sections else None
+    prefetch_rate_limit = {"next_slot": next_slot, "lock": rate_lock, "interval": 1 / rate_per_second if rate_per_second > 0 else 0}
+
+# Function to wait for this worker's turn under the rate limit shared by all worker processes
+def wait_for_prefetch_slot():
+    if not prefetch_rate_limit["interval"]:
+        return
+    with prefetch_rate_limit["lock"]:
+        now = time.time()
+        slot = max(now, prefetch_rate_limit["next_slot"].value)
+        prefetch_rate_limit["next_slot"].value = slot + prefetch_rate_limit["interval"]
+    time.sleep(max(0, slot - now))
+
+# Function run in a worker process to fetch and extract one school's website
+def prefetch_school_website(urn, url):
+    wait_for_prefetch_slot()
+    try:
+        status_code, result, _ = fetch_school_website(url)
+    except Exception:
+        return urn, url, "failed", {"strategies": [], "ofsted_url": None}
+    if status_code != 200:
+        return urn, url, "failed", {"strategies": [], "ofsted_url": None}
+    return urn, url, "ok", result
+
+# Function to prefetch every school's website into the store, skipping schools already done unless refreshing
+# Each fetch is recorded in the refresh schedule (at time now) unless schedule is off, as it is for re-extraction
+def run_prefetch(schools, store, workers, rate_per_second, retry_failed=False, progress=None, refresh=False, archive=None,
+                 sections=False, schedule=True, now=None):
+    done_urns = set() if refresh else read_prefetched_urns(store, include_failed=not retry_failed)
+    pending = [(urn, url) for urn, url in schools if urn not in done_urns]
+    stats = {"skipped": len(schools) - len(pending), "ok": 0, "failed": 0, "seconds": 0.0}
+    
+    start = time.perf_counter()
+    batch = []
+    next_slot = multiprocessing.Value('d', 0.0)
+    rate_lock = multiprocessing.Lock()
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=init_prefetch_worker,
+        initargs=(next_slot, rate_lock, rate_per_second, archive, store["path"] if sections else None)
+    ) as executor:
+        # Keep a bounded number of schools in flight so memory doesn't grow with the dataset
+        queue = iter(pending)
+        in_flight = set()
+        while True:
+            for urn, url in itertools.islice(queue, workers * 4 - len(in_flight)):
+                in_flight.add(executor.submit(prefetch_school_website, urn, url))
+            if not in_flight:
+                break
+            
+            finished, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                row = future.result()
+                stats[row[2]] += 1
+                batch.append(row)
+            
+            if len(batch) >= PREFETCH_CHECKPOINT_EVERY:
+                write_prefetched_websites(store, batch)
+                if schedule:
+                    update_refresh_schedule(store, batch, now)
+                batch = []
+                if progress:
+                    progress(stats)
+    
+    if batch:
+        write_prefetched_websites(store, batch)
+        if schedule:
+            update_refresh_schedule(store, batch, now)
+    stats["seconds"] = time.perf_counter() - start
+    return stats
 
 # DfE Technology Standards focused on leadership, accessibility, and devices
 @st.cache_data
@@ -494,10 +2683,297 @@ def load_improvement_solutions():
         }
     }
 
+# Function to compile every solution keyword and title word into one matcher
+# A single pass over an area finds where any of them starts, then only the words starting with that letter are checked
+def build_keyword_matcher(solutions):
+    words = {}
+    for key, solution in solutions.items():
+        # Keywords score 3 and significant title words 1, counted once per listing as the original scan did
+        for keyword in solution["keywords"]:
+            entries = words.setdefault(keyword.lower(), {})
+            entries[(key, True)] = entries.get((key, True), 0) + 3
+        for word in solution["title"].lower().split():
+            if len(word) > 3:
+                entries = words.setdefault(word, {})
+                entries[(key, False)] = entries.get((key, False), 0) + 1
+    
+    buckets = {}
+    for word, entries in words.items():
+        buckets.setdefault(word[0], []).append((word, [(key, points, is_keyword) for (key, is_keyword), points in entries.items()]))
+    # Finding where a word starts only needs the shortest of words sharing a prefix ("sen" covers "send"),
+    # and nesting them as a trie lets the regex engine branch on each letter instead of trying every word
+    trie = {}
+    for word in sorted(words):
+        node = trie
+        for char in word:
+            if "" in node:
+                break
+            node = node.setdefault(char, {})
+        else:
+            node.clear()
+            node[""] = True
+    
+    def trie_pattern(node):
+        branches = [re.escape(char) + trie_pattern(child) for char, child in sorted(node.items()) if char]
+        if "" in node or not branches:
+            return ""
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    
+    # The lookahead matches nothing itself, so overlapping words like "sen" and "send" are all found
+    pattern = re.compile("(?=" + trie_pattern(trie) + ")")
+    return {"pattern": pattern, "buckets": buckets, "words": len(words)}
+
+# Recommendation scorer used unless the report picks another: "keywords" counts keyword matches,
+# "tfidf" weighs the words an area shares with each solution's keywords, title and solution texts
+SOLUTION_SCORER = os.environ.get("SOLUTION_SCORER", "keywords")
+SOLUTION_SCORERS = {"keywords": "Keyword matches", "tfidf": "TF-IDF"}
+SOLUTION_BM25_K1 = 1.2  # How quickly repeats of a word in a solution stop adding weight
+SOLUTION_BM25_B = 0.75  # How much longer solutions are discounted
+SOLUTION_FIELD_WEIGHTS = {"keywords": 3, "title": 2, "solutions": 1}  # A word in the keywords counts as three in the solution texts
+SOLUTION_VECTOR_MIN_POINTS = 1.5  # Weaker overlaps than half a keyword match don't count towards a recommendation
+SOLUTION_BATCH_AREAS = 4096  # Areas multiplied at a time when scoring many schools, to bound memory
+SOLUTION_TERM_PATTERN = re.compile(r"[a-z0-9]+")
+SOLUTION_STOPWORDS = set("a an and are as at be been by can for from has have in into is it its of on or our "
+                         "so such than that the their them they this to was were which while will with".split())
+
+# Function to reduce a word to a rough stem so "reading", "readers" and "read" meet ("" for words that are skipped)
+@functools.lru_cache(maxsize=65536)
+def stem_solution_term(word):
+    if len(word) < 2 or word in SOLUTION_STOPWORDS:
+        return ""
+    word = word.replace("iour", "ior")  # behaviour and behavior
+    for suffix, replacement in (("ies", "y"), ("ing", ""), ("ers", ""), ("ed", ""), ("er", ""), ("ly", ""), ("s", "")):
+        if word.endswith(suffix) and not word.endswith("ss") and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)] + replacement
+    return word
+
+# Function to split text into the stemmed words the TF-IDF scorer compares
+def get_solution_terms(text):
+    return [term for term in map(stem_solution_term, SOLUTION_TERM_PATTERN.findall(text.lower())) if term]
+
+# Function to build the BM25 weight of every word for every solution, one column per solution
+def build_solution_vectors(solutions):
+    keys = list(solutions)
+    counts = []
+    for key in keys:
+        solution = solutions[key]
+        counts.append({})
+        for field, texts in (("keywords", solution["keywords"]), ("title", [solution["title"]]), ("solutions", solution["solutions"])):
+            for text in texts:
+                for term in get_solution_terms(text):
+                    counts[-1][term] = counts[-1].get(term, 0) + SOLUTION_FIELD_WEIGHTS[field]
+    
+    vocabulary = {term: row for row, term in enumerate(sorted(set().union(*counts)))}
+    document_frequency = np.zeros(len(vocabulary))
+    for term_counts in counts:
+        document_frequency[[vocabulary[term] for term in term_counts]] += 1
+    idf = np.log(1 + (len(keys) - document_frequency + 0.5) / (document_frequency + 0.5))
+    lengths = np.array([sum(term_counts.values()) for term_counts in counts], dtype=float)
+    
+    weights = np.zeros((len(vocabulary), len(keys)))
+    for column, term_counts in enumerate(counts):
+        saturation = SOLUTION_BM25_K1 * (1 - SOLUTION_BM25_B + SOLUTION_BM25_B * lengths[column] / lengths.mean())
+        for term, count in term_counts.items():
+            row = vocabulary[term]
+            weights[row, column] = idf[row] * count * (SOLUTION_BM25_K1 + 1) / (count + saturation)
+    
+    # Scale so a typical keyword word is worth 3 points, as a keyword match is in the keyword scorer,
+    # which lets the phase and type boosts be added in the same points
+    keyword_weights = [weights[vocabulary[term], column] for column, key in enumerate(keys)
+                       for keyword in solutions[key]["keywords"] for term in get_solution_terms(keyword)]
+    weights *= 3 / np.median(keyword_weights)
+    return {"keys": keys, "vocabulary": vocabulary, "weights": weights}
+
+# Function to fingerprint the solutions and standards reports are written from, so editing them drops built reports
+def get_knowledge_base_version(solutions, standards):
+    return hashlib.sha256(json.dumps([solutions, standards], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+# Approximate memory kept for built reports across all sessions, least recently used dropped first
+REPORT_CACHE_MAX_BYTES = int(os.environ.get("REPORT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Function to create the in-memory cache of built reports
+def create_report_cache(max_bytes=REPORT_CACHE_MAX_BYTES):
+    return {
+        "entries": collections.OrderedDict(),  # Least recently used first
+        "bytes": 0,
+        "max_bytes": max_bytes,
+        "version": None,
+        "lock": threading.Lock(),
+        "stats": {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+    }
+
+# Report downloads rendered at once across all sessions, and the longest one may take
+REPORT_EXPORT_WORKERS = int(os.environ.get("REPORT_EXPORT_WORKERS", 2))
+REPORT_EXPORT_TIMEOUT_SECONDS = float(os.environ.get("REPORT_EXPORT_TIMEOUT_SECONDS", 60))
+# How often a session waiting for a download checks its progress
+REPORT_EXPORT_POLL_SECONDS = 0.5
+
+# Function to create the export threads and the running exports, keyed by report and format so sessions share them
+def create_report_exports():
+    return {
+        "executor": concurrent.futures.ThreadPoolExecutor(max_workers=REPORT_EXPORT_WORKERS, thread_name_prefix="report-export"),
+        "jobs": {},
+        "lock": threading.Lock(),
+        "stats": {"started": 0, "joined": 0, "failed": 0, "timeouts": 0}
+    }
+
+# Build the search index once per process so every session shares it
+# (the leading underscore stops Streamlit hashing the whole dataframe on every rerun)
+@st.cache_resource
+def load_search_index(_school_data_df):
+    try:
+        return build_search_index(_school_data_df)
+    except Exception:
+        # search_school_data falls back to scanning the columns when the index doesn't fit the data
+        return build_search_index(pd.DataFrame())
+
+# Build the URN lookup once per process alongside the search index
+@st.cache_resource
+def load_urn_index(_school_data_df):
+    try:
+        return build_urn_index(_school_data_df)
+    except Exception:
+        return build_urn_index(pd.DataFrame())
+
+# Build the ranked search index once per process
+@st.cache_resource
+def load_ranked_search_index(_school_data_df):
+    try:
+        return build_ranked_search_index(_school_data_df)
+    except Exception:
+        return build_ranked_search_index(pd.DataFrame())
+
+# Build the nearby-schools grid once per process
+@st.cache_resource
+def load_geo_index(_school_data_df):
+    try:
+        return build_geo_index(_school_data_df)
+    except Exception:
+        return build_geo_index(pd.DataFrame())
+
+# Open the website cache once per process so every session shares it and its counters
+@st.cache_resource
+def load_website_cache():
+    try:
+        return open_website_cache(WEBSITE_CACHE_PATH)
+    except (sqlite3.Error, OSError):
+        # Read-only app directory - keep the cache in the temp directory instead
+        return open_website_cache(os.path.join(tempfile.gettempdir(), os.path.basename(WEBSITE_CACHE_PATH)))
+
+# Create the HTTP session once per process so connections are reused across sessions
+@st.cache_resource
+def load_http_session():
+    return create_http_session()
+
+# Create the background executor for website fetches once per process
+@st.cache_resource
+def load_website_fetch_executor():
+    return concurrent.futures.ThreadPoolExecutor(max_workers=WEBSITE_FETCH_WORKERS, thread_name_prefix="website-fetch")
+
+# School views are counted by one background thread, so selecting a school never waits on the prefetch store
+@st.cache_resource
+def load_view_executor():
+    return concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="school-views")
+
+# Crawled pages are best effort, so they get a session without retries that could overrun the budget
+@st.cache_resource
+def load_crawl_http_session():
+    return create_http_session(retries=0)
+
+# Create the executor used to fetch crawled pages concurrently
+@st.cache_resource
+def load_crawl_executor():
+    return concurrent.futures.ThreadPoolExecutor(max_workers=WEBSITE_FETCH_WORKERS * WEBSITE_CRAWL_MAX_PER_HOST, thread_name_prefix="website-crawl")
+
+# Per-host request limits have to outlive a single script run to apply across sessions
+@st.cache_resource
+def load_crawl_host_limits():
+    return {"semaphores": {}, "lock": threading.Lock()}
+
+# Open the prefetch store once per process (it is only read by the dashboard)
+@st.cache_resource
+def load_prefetch_store():
+    try:
+        return open_prefetch_store(PREFETCH_STORE_PATH)
+    except (sqlite3.Error, OSError):
+        # No prefetch and nowhere to create one - lookups will just find nothing
+        return {"path": PREFETCH_STORE_PATH}
+
+# Host rate limits and failures are shared by every session, so a dead site fails fast for everyone
+@st.cache_resource
+def load_host_health():
+    return {"hosts": {}, "lock": threading.Lock(), "stats": {"skipped": 0, "failures": 0}}
+
+# Open the raw response archive when one is configured, shared by every session
+@st.cache_resource
+def load_website_archive():
+    return open_website_archive(WEBSITE_ARCHIVE_DIR) if WEBSITE_ARCHIVE_DIR else None
+
+# Website fetches in flight, shared so sessions opening the same school wait on one fetch
+@st.cache_resource
+def load_website_flights():
+    # Re-entrant, because cancelling a queued fetch runs its done callback, which takes the lock too
+    return {"flights": {}, "lock": threading.RLock(), "stats": {"started": 0, "joined": 0}}
+
+# robots.txt and sitemap discovery is cached per host for every session
+@st.cache_resource
+def load_site_discovery_cache():
+    return {"hosts": {}, "lock": threading.Lock()}
+
+# PDF worker processes are shared by every session so a burst of scrapes can't start unbounded processes
+@st.cache_resource
+def load_pdf_workers():
+    return create_pdf_workers()
+
+# Compile the solution keywords once per knowledge base version
+# (keyed on the version rather than the solutions, which Streamlit would hash in full on every rerun)
+@st.cache_resource
+def load_keyword_matcher(_solutions, version):
+    return build_keyword_matcher(_solutions)
+
+# Build the TF-IDF weights of the solutions once per knowledge base version, next to the keyword matcher
+@st.cache_resource
+def load_solution_vectors(_solutions, version):
+    return build_solution_vectors(_solutions)
+
+# Built reports are shared by every session, so rerunning or reopening a report is a lookup
+@st.cache_resource
+def load_report_cache():
+    return create_report_cache()
+
+# Report downloads are rendered by shared export threads, so two sessions asking for the same one render it once
+@st.cache_resource
+def load_report_exports():
+    return create_report_exports()
+
 # Load data
 school_data_df = load_school_data()
+school_search_index = load_search_index(school_data_df)
+school_urn_index = load_urn_index(school_data_df)
+school_ranked_search_index = load_ranked_search_index(school_data_df)
+school_geo_index = load_geo_index(school_data_df)
+website_cache = load_website_cache()
+http_session = load_http_session()
+website_fetch_executor = load_website_fetch_executor()
+website_flights = load_website_flights()
+crawl_executor = load_crawl_executor()
+crawl_http_session = load_crawl_http_session()
+crawl_host_limits = load_crawl_host_limits()
+host_health = load_host_health()
+site_discovery_cache = load_site_discovery_cache()
+pdf_workers = load_pdf_workers()
+website_archive = load_website_archive()
+# Live scrapes use the website cache; reusing extracted sections is for the scheduled refresh
+section_cache = None
+prefetch_store = load_prefetch_store()
+view_executor = load_view_executor()
 dfe_standards = load_dfe_standards()
 improvement_solutions = load_improvement_solutions()
+knowledge_base_version = get_knowledge_base_version(improvement_solutions, dfe_standards)
+keyword_matcher = load_keyword_matcher(improvement_solutions, knowledge_base_version)
+solution_vectors = load_solution_vectors(improvement_solutions, knowledge_base_version)
+report_cache = load_report_cache()
+report_exports = load_report_exports()
 
 # Function to search schools
 def search_schools():
@@ -505,9 +2981,22 @@ def search_schools():
     if not query or query.strip() == '':
         st.session_state.search_results = pd.DataFrame()
         st.session_state.search_performed = False
+        st.session_state.search_positions = None
         return
     
     query = query.lower().strip()
+    search_mode = st.session_state.get("search_mode", "All matches")
+    if search_mode == "Nearby schools":
+        # The nearby settings change the results as much as the query does
+        search_mode = (search_mode, st.session_state.get("nearby_count", 10), st.session_state.get("nearby_radius_km", 0.0))
+    
+    # Skip the work entirely if nothing changed since the last search
+    if (st.session_state.search_performed and st.session_state.search_positions is not None and
+            query == st.session_state.search_query and search_mode == st.session_state.search_mode_used):
+        return
+    
+    previous_query = st.session_state.search_query if st.session_state.search_mode_used == search_mode else None
+    previous_positions = st.session_state.search_positions
     st.session_state.search_query = query
     
     try:
@@ -517,20 +3006,86 @@ def search_schools():
             st.session_state.search_results = pd.DataFrame()
             st.session_state.search_performed = True
             return
-            
-        results = school_data_df[
-            school_data_df["EstablishmentName"].str.lower().str.contains(query, na=False) | 
-            school_data_df["URN"].astype(str).str.contains(query, na=False) |
-            school_data_df["Postcode"].str.lower().str.contains(query, na=False)
-        ]
         
+        start = time.perf_counter()
+        distances = None
+        if search_mode == "Best matches":
+            positions = ranked_search_positions(school_ranked_search_index, query)
+        elif isinstance(search_mode, tuple):
+            positions, distances = search_nearby_schools(query, *search_mode[1:])
+        else:
+            positions = search_school_positions(school_data_df, school_search_index, query, previous_query, previous_positions)
+        
+        results = school_data_df.iloc[positions]
+        if distances is not None:
+            results = results.assign(**{"Distance (km)": np.round(distances / 1000, 2)})
         st.session_state.search_results = results
+        st.session_state.search_positions = positions
+        st.session_state.search_mode_used = search_mode
+        st.session_state.search_latency_ms = (time.perf_counter() - start) * 1000
         st.session_state.search_performed = True
     except Exception as e:
         st.error(f"Error searching schools: {e}")
         st.session_state.search_results = pd.DataFrame()
+        st.session_state.search_positions = None
         st.session_state.search_performed = True
 
+# Function to find the schools near a postcode or coordinates
+def search_nearby_schools(query, count, radius_km):
+    location = resolve_location(school_geo_index, query)
+    if location is None:
+        st.warning("Couldn't find that location. Enter a postcode from the dataset, \"easting, northing\" or \"latitude, longitude\".")
+        return np.array([], dtype=np.int32), np.array([])
+    
+    easting, northing, description = location
+    st.session_state.nearby_location = description
+    if radius_km > 0:
+        return schools_within_radius(school_geo_index, easting, northing, radius_km * 1000)
+    return nearest_school_positions(school_geo_index, easting, northing, count)
+
+# Function to get a school's row from its URN without scanning the dataframe
+def get_school_row(urn):
+    if school_urn_index["positions"]:
+        position = school_urn_index["positions"].get(urn)
+        return None if position is None else school_data_df.iloc[position]
+    
+    # The lookup couldn't be built, so fall back to a scan
+    school_rows = school_data_df[school_data_df["URN"] == urn]
+    return None if school_rows.empty else school_rows.iloc[0]
+
+# Function to label a school in the results selectbox
+def format_school_option(urn):
+    position = school_urn_index["positions"].get(urn)
+    if position is not None:
+        name = school_urn_index["names"][position]
+    else:
+        school_row = get_school_row(urn)
+        name = school_row["EstablishmentName"] if school_row is not None else ""
+    return f"{name} (URN: {urn})"
+
+# Function to get the details of a school the profile and report show, or None if the URN isn't in the dataset
+def get_school_details(urn):
+    # Find the selected school in the dataframe
+    school_row = get_school_row(urn)
+    if school_row is None:
+        return None
+    
+    # Create a dictionary with the school data
+    school = {
+        "urn": str(school_row["URN"]),
+        "name": school_row["EstablishmentName"],
+        "address": f"{school_row.get('Street', '')}, {school_row.get('Town', '')}, {school_row.get('Postcode', '')}",
+        "type": school_row.get("TypeOfEstablishment (name)", ""),
+        "phase": school_row.get("PhaseOfEducation (name)", ""),
+        "pupils": school_row.get("NumberOfPupils", 0),
+        "fsm": school_row.get("PercentageFSM", 0),
+        "website": school_row.get("SchoolWebsite", "")
+    }
+    
+    # Set default Ofsted URL (will be updated if found on website)
+    school["ofstedUrl"] = get_default_ofsted_report_url(urn)
+    return school
+
 # Function to select school
 def select_school(urn):
     if school_data_df.empty:
@@ -538,69 +3093,155 @@ def select_school(urn):
         return
         
     try:
-        # Find the selected school in the dataframe
-        school_rows = school_data_df[school_data_df["URN"] == urn]
+        school = get_school_details(urn)
         
-        if school_rows.empty:
+        if school is None:
             st.error(f"School with URN {urn} not found in the dataset.")
             return
-            
-        school_row = school_rows.iloc[0]
-        
-        # Create a dictionary with the school data
-        school = {
-            "urn": str(school_row["URN"]),
-            "name": school_row["EstablishmentName"],
-            "address": f"{school_row.get('Street', '')}, {school_row.get('Town', '')}, {school_row.get('Postcode', '')}",
-            "type": school_row.get("TypeOfEstablishment (name)", ""),
-            "phase": school_row.get("PhaseOfEducation (name)", ""),
-            "pupils": school_row.get("NumberOfPupils", 0),
-            "fsm": school_row.get("PercentageFSM", 0),
-            "website": school_row.get("SchoolWebsite", "")
-        }
-        
-        # Set default Ofsted URL (will be updated if found on website)
-        school["ofstedUrl"] = get_default_ofsted_report_url(urn)
         
         # Reset priorities and strategies
         st.session_state.custom_priorities = []
         st.session_state.school_strategies = []
         st.session_state.ofsted_priorities = []
         st.session_state.website_data_fetched = False
+        st.session_state.website_fetch_warning = None
         st.session_state.ofsted_url = None
         
         # Set the selected school in session state
         st.session_state.selected_school = school
         st.session_state.current_view = "profile"
+        
+        # Schools people look at are kept fresher by the scheduled refresh
+        view_executor.submit(record_school_view, prefetch_store, urn)
+        
+        # Start scraping the website now so the profile doesn't wait for it
+        start_website_fetch()
     except Exception as e:
         st.error(f"Error selecting school: {e}")
 
-# Function to fetch website data
+# Function to start scraping the selected school's website in the background
+def start_website_fetch():
+    cancel_website_fetch()
+    website_url = st.session_state.selected_school.get("website", "") if st.session_state.selected_school else ""
+    if website_url:
+        # Use the offline prefetch when it has this school, and only scrape live otherwise
+        prefetched = read_prefetched_website(prefetch_store, st.session_state.selected_school["urn"])
+        if prefetched is not None:
+            st.session_state.website_future = concurrent.futures.Future()
+            st.session_state.website_future.set_result(prefetched)
+            st.session_state.website_fetch_started = time.time()
+            return
+        st.session_state.website_future = join_website_fetch(website_url)
+        st.session_state.website_fetch_started = time.time()
+
+# Function to get a lookup key for a school website, so that trivially different URLs for one site share a fetch
+def normalise_website_url(url):
+    parsed = urllib.parse.urlsplit(url.strip())
+    host = (parsed.hostname or "").lower()
+    if parsed.port and parsed.port != {"http": 80, "https": 443}.get(parsed.scheme.lower()):
+        host = f"{host}:{parsed.port}"
+    return urllib.parse.urlunsplit((parsed.scheme.lower(), host, parsed.path.rstrip("/") or "/", parsed.query, ""))
+
+# Function to wait on the website fetch already running for this site in any session, or start one
+def join_website_fetch(url):
+    key = normalise_website_url(url)
+    with website_flights["lock"]:
+        flight = website_flights["flights"].get(key)
+        if flight is not None and not flight["future"].done():
+            flight["waiters"] += 1
+            website_flights["stats"]["joined"] += 1
+            return flight["future"]
+        
+        future = website_fetch_executor.submit(scrape_school_website, url)
+        website_flights["flights"][key] = {"future": future, "waiters": 1}
+        website_flights["stats"]["started"] += 1
+    
+    def finish(done):
+        with website_flights["lock"]:
+            if website_flights["flights"].get(key, {}).get("future") is done:
+                del website_flights["flights"][key]
+    future.add_done_callback(finish)
+    return future
+
+# Function to stop one session waiting on a shared website fetch, cancelling it once nobody is waiting
+def leave_website_fetch(future):
+    with website_flights["lock"]:
+        for key, flight in list(website_flights["flights"].items()):
+            if flight["future"] is future:
+                flight["waiters"] -= 1
+                # A fetch that already started can't be interrupted, but its result will still reach the cache
+                if flight["waiters"] <= 0 and future.cancel():
+                    website_flights["flights"].pop(key, None)
+                return
+
+# Function to stop waiting for the background website fetch
+def cancel_website_fetch():
+    future = st.session_state.website_future
+    if future is not None and not future.done():
+        leave_website_fetch(future)
+    st.session_state.website_future = None
+
+# Function to check whether the website fetch is still running
+def website_fetch_pending():
+    future = st.session_state.website_future
+    return not st.session_state.website_data_fetched and future is not None and not future.done()
+
+# Function to fetch website data (collects the background fetch once it has finished)
 def fetch_website_data():
     if st.session_state.selected_school and not st.session_state.website_data_fetched:
         website_url = st.session_state.selected_school.get("website", "")
         if website_url:
-            with st.spinner(f"Fetching data from school website ({website_url})..."):
-                try:
-                    # Get strategies and Ofsted URL from website
-                    result = scrape_school_website(website_url)
-                    
-                    # Update strategies
-                    st.session_state.school_strategies = result["strategies"]
-                    
-                    # Update Ofsted URL if found
-                    if result["ofsted_url"]:
-                        st.session_state.ofsted_url = result["ofsted_url"]
-                        st.session_state.selected_school["ofstedUrl"] = result["ofsted_url"]
-                    
+            if st.session_state.website_future is None:
+                start_website_fetch()
+            
+            future = st.session_state.website_future
+            if not future.done():
+                # Give up on sites that never answer
+                if time.time() - st.session_state.website_fetch_started > WEBSITE_FETCH_TIMEOUT_SECONDS:
+                    cancel_website_fetch()
+                    st.session_state.website_fetch_warning = "The school website took too long to respond. You can add strategies manually below."
                     st.session_state.website_data_fetched = True
-                    return True
-                except Exception as e:
-                    st.warning(f"Could not fetch website data: {e}")
-                    st.session_state.website_data_fetched = True  # Mark as fetched to avoid repeated attempts
-                    return False
+                return False
+            
+            try:
+                # Get strategies and Ofsted URL from website
+                result = future.result()
+                # Kept in the session because this may run in the polling fragment, whose output the rerun replaces
+                st.session_state.website_fetch_warning = result.get("error")
+                
+                # Update strategies, keeping any added by hand while the fetch was running
+                st.session_state.school_strategies = result["strategies"] + [
+                    strategy for strategy in st.session_state.school_strategies if strategy not in result["strategies"]
+                ]
+                
+                # Update Ofsted URL if found
+                if result["ofsted_url"]:
+                    st.session_state.ofsted_url = result["ofsted_url"]
+                    st.session_state.selected_school["ofstedUrl"] = result["ofsted_url"]
+                
+                st.session_state.website_data_fetched = True
+                return True
+            except Exception as e:
+                st.session_state.website_fetch_warning = f"Could not fetch website data: {e}"
+                st.session_state.website_data_fetched = True  # Mark as fetched to avoid repeated attempts
+                return False
     return False
 
+# Function to poll the background website fetch, rerunning the page once it has finished
+@st.fragment(run_every=WEBSITE_FETCH_POLL_SECONDS)
+def poll_website_fetch():
+    fetch_website_data()
+    if not website_fetch_pending():
+        st.rerun()
+    
+    st.info(f"Loading strategies from the school website ({st.session_state.selected_school['website']})...")
+    st.button("Stop loading", key="cancel_website_fetch_button", on_click=stop_website_fetch)
+
+# Function to stop the background fetch from the profile page
+def stop_website_fetch():
+    cancel_website_fetch()
+    st.session_state.website_data_fetched = True
+
 # Function to add priority
 def add_priority():
     if st.session_state.new_priority.strip():
@@ -644,51 +3285,15 @@ def back_to_profile():
     st.session_state.current_view = "profile"
 
 # Enhanced function to match improvement areas to solutions with better context awareness
-def match_improvement_areas_to_solutions(improvement_areas, school_context):
+# scorer picks "keywords" or "tfidf", defaulting to SOLUTION_SCORER
+def match_improvement_areas_to_solutions(improvement_areas, school_context, scorer=None):
     if not improvement_areas:
         return []
         
-    # Extract school phase and type for context-specific matching
-    school_phase = school_context.get("phase", "").lower()
-    school_type = school_context.get("type", "").lower()
-    
-    # Create a combined text of all improvement areas for better matching
-    combined_text = " ".join(improvement_areas).lower()
-    
-    # Score each solution based on keyword matches and context relevance
-    solution_scores = {}
-    
-    for key, solution in improvement_solutions.items():
-        # Initialize score
-        score = 0
-        
-        # Check each improvement area for keyword matches
-        for area in improvement_areas:
-            area_lower = area.lower()
-            
-            # Score based on keyword matches
-            for keyword in solution["keywords"]:
-                if keyword.lower() in area_lower:
-                    score += 3  # Direct keyword match
-            
-            # Score based on title words in the area
-            title_words = solution["title"].lower().split()
-            for word in title_words:
-                if len(word) > 3 and word in area_lower:  # Only consider significant words
-                    score += 1
-        
-        # Context-specific scoring
-        if "early_years" in key and ("early" in school_phase or "nursery" in school_phase or "foundation" in school_phase):
-            score += 5  # Boost early years solutions for early years/primary schools
-        
-        if "reading_instruction" in key and ("primary" in school_phase or "elementary" in school_phase):
-            score += 3  # Boost reading solutions for primary schools
-        
-        if "curriculum_implementation" in key and ("secondary" in school_phase or "high" in school_phase or "college" in school_type):
-            score += 3  # Boost curriculum solutions for secondary schools
-        
-        # Store the score
-        solution_scores[key] = score
+    if (scorer or SOLUTION_SCORER) == "tfidf":
+        solution_scores, relevant_areas = score_improvement_solutions_tfidf(improvement_areas, school_context)
+    else:
+        solution_scores, relevant_areas = score_improvement_solutions(improvement_areas, school_context)
     
     # Sort solutions by score (highest first)
     sorted_solutions = sorted(solution_scores.items(), key=lambda x: x[1], reverse=True)
@@ -698,23 +3303,136 @@ def match_improvement_areas_to_solutions(improvement_areas, school_context):
     for key, score in sorted_solutions:
         if score > 0 and len(top_solutions) < 5:  # Only include solutions with positive scores
             top_solutions.append({
+                "key": key,
                 "title": improvement_solutions[key]["title"],
                 "solutions": improvement_solutions[key]["solutions"],
                 "standards": improvement_solutions[key]["standards"],
-                "relevance": score  # Include the relevance score for reference
+                "relevance": score,  # Include the relevance score for reference
+                "areas": relevant_areas[key]  # The areas that led to it, for the report
             })
     
     # If no specific matches found, add digital technology as default
     if not top_solutions:
         top_solutions.append({
+            "key": "digital_technology",
             "title": improvement_solutions["digital_technology"]["title"],
             "solutions": improvement_solutions["digital_technology"]["solutions"],
             "standards": improvement_solutions["digital_technology"]["standards"],
-            "relevance": 1
+            "relevance": 1,
+            "areas": []
         })
     
-    return top_solutions
+    return top_solutions
+
+# Function to score every solution against the improvement areas with one keyword pass per area
+def score_improvement_solutions(improvement_areas, school_context):
+    # Score each solution based on keyword matches and context relevance
+    solution_scores = {key: 0 for key in improvement_solutions}
+    relevant_areas = {key: [] for key in improvement_solutions}
+    
+    for area in improvement_areas:
+        for key, found in find_keyword_matches(area).items():
+            # 3 for each keyword in the area, 1 for each significant title word
+            solution_scores[key] += sum(points for position, word, points, is_keyword in found)
+            if any(is_keyword for position, word, points, is_keyword in found):
+                relevant_areas[key].append(area)
+    
+    for key, boost in get_context_boosts(school_context).items():
+        solution_scores[key] += boost
+    
+    return solution_scores, relevant_areas
+
+# Function to get the points each solution gains from the school's phase and type
+def get_context_boosts(school_context):
+    # Extract school phase and type for context-specific matching
+    school_phase = school_context.get("phase", "").lower()
+    school_type = school_context.get("type", "").lower()
+    
+    boosts = {}
+    for key in improvement_solutions:
+        score = 0
+        
+        # Context-specific scoring
+        if "early_years" in key and ("early" in school_phase or "nursery" in school_phase or "foundation" in school_phase):
+            score += 5  # Boost early years solutions for early years/primary schools
+        
+        if "reading_instruction" in key and ("primary" in school_phase or "elementary" in school_phase):
+            score += 3  # Boost reading solutions for primary schools
+        
+        if "curriculum_implementation" in key and ("secondary" in school_phase or "high" in school_phase or "college" in school_type):
+            score += 3  # Boost curriculum solutions for secondary schools
+        
+        boosts[key] = score
+    
+    return boosts
+
+# Function to score every solution against the improvement areas with the TF-IDF weights,
+# in the same shape as the keyword scorer so the report can use either
+def score_improvement_solutions_tfidf(improvement_areas, school_context):
+    keys = solution_vectors["keys"]
+    school_scores, area_scores = score_solution_vectors([(improvement_areas, school_context)])
+    solution_scores = {key: round(float(score), 1) for key, score in zip(keys, school_scores[0])}
+    
+    # The areas that share enough with a solution, the closest first
+    order = np.argsort(-area_scores, axis=0, kind="stable").T.tolist()
+    relevant = (area_scores >= SOLUTION_VECTOR_MIN_POINTS).T.tolist()
+    relevant_areas = {key: [improvement_areas[row] for row in order[column] if relevant[column][row]] for column, key in enumerate(keys)}
+    return solution_scores, relevant_areas
+
+# Function to score many schools' improvement areas against every solution at once
+# Each school is (improvement_areas, school_context); returns a row of scores per school and per area
+def score_solution_vectors(schools, vectors=None):
+    vectors = vectors or solution_vectors
+    vocabulary = vectors["vocabulary"]
+    solutions = len(vectors["keys"])
+    
+    # The area-by-word matrix, kept sparse as the cells of the words each area contains
+    words = len(vocabulary)
+    cells = []
+    area_schools = []
+    for school, (improvement_areas, school_context) in enumerate(schools):
+        for area in improvement_areas:
+            rows = {vocabulary.get(term) for term in map(stem_solution_term, SOLUTION_TERM_PATTERN.findall(area.lower()))}
+            rows.discard(None)
+            cells.extend(sorted(len(area_schools) * words + row for row in rows))
+            area_schools.append(school)
+    cells = np.array(cells, dtype=np.int64)
+    
+    # Expanded a block of areas at a time, each block is one multiply by the weight matrix
+    area_scores = np.zeros((len(area_schools), solutions))
+    for start in range(0, len(area_schools), SOLUTION_BATCH_AREAS):
+        stop = min(start + SOLUTION_BATCH_AREAS, len(area_schools))
+        first, last = np.searchsorted(cells, [start * words, stop * words])
+        block = np.bincount(cells[first:last] - start * words, minlength=(stop - start) * words).reshape(stop - start, words)
+        area_scores[start:stop] = block @ vectors["weights"]
+    
+    # Each school's scores are the sum of its areas'
+    cells = (np.array(area_schools, dtype=np.int64)[:, None] * solutions + np.arange(solutions)).ravel()
+    school_scores = np.bincount(cells, weights=area_scores.ravel(), minlength=len(schools) * solutions).reshape(len(schools), solutions)
+    
+    # Overlaps too weak to count are dropped before the phase and type boosts are added as one row per school
+    school_scores[school_scores < SOLUTION_VECTOR_MIN_POINTS] = 0
+    boosts = [get_context_boosts(school_context) for improvement_areas, school_context in schools]
+    school_scores += np.array([[school_boosts[key] for key in vectors["keys"]] for school_boosts in boosts], dtype=float).reshape(len(schools), solutions)
+    return school_scores, area_scores
 
+# Function to find every solution keyword and title word in an area, with where each first appears
+def find_keyword_matches(area, matcher=None):
+    matcher = matcher or keyword_matcher
+    text = area.lower()
+    matches = {}
+    seen = set()
+    for found in matcher["pattern"].finditer(text):
+        position = found.start()
+        for word, entries in matcher["buckets"].get(text[position], []):
+            # An area scores each word once, however often it repeats
+            if word in seen or not text.startswith(word, position):
+                continue
+            seen.add(word)
+            for key, points, is_keyword in entries:
+                matches.setdefault(key, []).append((position, word, points, is_keyword))
+    return matches
+    
 # Function to display school profile
 def display_school_profile(school):
     # Try to fetch website data if not already done
@@ -757,7 +3475,11 @@ def display_school_profile(school):
     st.markdown("<h3>School Strategy & Priorities</h3>", unsafe_allow_html=True)
     st.markdown("<p>Strategies and priorities extracted from the school website:</p>", unsafe_allow_html=True)
     
-    if st.session_state.website_data_fetched and not st.session_state.school_strategies:
+    if website_fetch_pending():
+        poll_website_fetch()
+    elif st.session_state.website_fetch_warning:
+        st.warning(st.session_state.website_fetch_warning)
+    elif st.session_state.website_data_fetched and not st.session_state.school_strategies:
         st.info("No strategy information found on the school website. You can add strategies manually below.")
     
     # Display existing strategies
@@ -827,20 +3549,26 @@ def display_school_profile(school):
     # Generate report button
     st.button("Generate Report", key="generate_report_button", on_click=generate_report)
 
-# Function to display report
-def display_report(school):
+# Function to make a report model read-only, so the renderers (and anything caching it) can share one copy
+def freeze_report_model(value):
+    if isinstance(value, dict):
+        return types.MappingProxyType({key: freeze_report_model(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_report_model(item) for item in value)
+    return value
+
+# Function to copy a frozen report model back into plain dicts, to send it to a worker process (a read-only view can't be pickled)
+def thaw_report_model(value):
+    if isinstance(value, types.MappingProxyType):
+        return {key: thaw_report_model(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return tuple(thaw_report_model(item) for item in value)
+    return value
+
+# Function to work out everything a report says once, for the dashboard and the downloads to render
+def build_report_model(school, ofsted_priorities, school_strategies, custom_priorities, scorer=None):
     # Combine all priorities and strategies
-    all_improvement_areas = (
-        st.session_state.ofsted_priorities + 
-        st.session_state.school_strategies + 
-        st.session_state.custom_priorities
-    )
-    
-    # If no areas provided, show a message
-    if not all_improvement_areas:
-        st.warning("No improvement areas or strategies have been added. Please go back and add some priorities or strategies to generate a meaningful report.")
-        st.button("Back to School Profile", key="back_to_profile_empty", on_click=back_to_profile)
-        return
+    all_improvement_areas = list(ofsted_priorities) + list(school_strategies) + list(custom_priorities)
     
     # Create school context for better matching
     school_context = {
@@ -852,20 +3580,12 @@ def display_report(school):
     }
     
     # Match improvement areas to solutions with context awareness
-    matched_solutions = match_improvement_areas_to_solutions(all_improvement_areas, school_context)
-    
-    st.markdown("<div class='card'>", unsafe_allow_html=True)
+    matched_solutions = match_improvement_areas_to_solutions(all_improvement_areas, school_context, scorer)
     
-    # Report header
-    st.markdown(f"<h1>iPad Implementation Report</h1>", unsafe_allow_html=True)
-    st.markdown(f"<h2>{school['name']}</h2>", unsafe_allow_html=True)
-    st.markdown(f"<p>{school['address']}</p>", unsafe_allow_html=True)
-    
-    st.markdown("</div>", unsafe_allow_html=True)
-    
-    # Executive Summary
-    st.markdown("<div class='card'>", unsafe_allow_html=True)
-    st.markdown("<h3>Executive Summary</h3>", unsafe_allow_html=True)
+    # Replace generic terms with school-specific ones where appropriate
+    is_primary = "primary" in school['phase'].lower()
+    def personalize(text):
+        return text.replace("students", "pupils") if is_primary else text
     
     # Create a more personalized executive summary
     fsm_context = ""
@@ -882,48 +3602,720 @@ def display_report(school):
     
     # Create a summary of key improvement areas
     area_summary = ""
-    if st.session_state.ofsted_priorities:
+    if ofsted_priorities:
         area_summary += "Ofsted improvement areas"
-        if st.session_state.school_strategies or st.session_state.custom_priorities:
+        if school_strategies or custom_priorities:
             area_summary += ", "
     
-    if st.session_state.school_strategies:
+    if school_strategies:
         area_summary += "strategic priorities from the school website"
-        if st.session_state.custom_priorities:
+        if custom_priorities:
             area_summary += ", "
     
-    if st.session_state.custom_priorities:
+    if custom_priorities:
         area_summary += "and additional school priorities"
     
-    st.markdown(f"""
-    <p>This report outlines how implementing 1:1 iPads at {school['name']} can address the specific challenges and priorities 
-    identified in the {area_summary} while meeting the Department for Education's technology standards for digital leadership, 
-    accessibility, and devices.</p>
+    summary = [
+        f"This report outlines how implementing 1:1 iPads at {school['name']} can address the specific challenges and priorities "
+        f"identified in the {area_summary} while meeting the Department for Education's technology standards for digital leadership, "
+        "accessibility, and devices.",
+        f"The recommendations are tailored to the specific context of {school['name']} as a {size_context} {school['phase'].lower()} school "
+        f"{fsm_context}, with a focus on how iPad technology can support the school's unique improvement journey."
+    ]
+    
+    # Separate areas by type
+    area_groups = [
+        {"title": "From Ofsted Report:", "style": "improvement-area", "areas": ofsted_priorities},
+        {"title": "From School Strategy:", "style": "strategy-area", "areas": school_strategies},
+        {"title": "Additional Priorities:", "style": "priority-area", "areas": custom_priorities}
+    ]
+    
+    # Create personalized recommendations for each solution, with up to 2 of the areas that led to it
+    recommendations = [{
+        "title": solution["title"],
+        "areas": solution["areas"][:2],
+        "solutions": [personalize(item) for item in solution["solutions"]],
+        "standards": [dfe_standards[standard]['title'] for standard in solution["standards"]]
+    } for solution in matched_solutions]
+    
+    standards = [{
+        "label": label,
+        "title": dfe_standards[key]['title'],
+        "description": dfe_standards[key]['description'],
+        "benefits": [personalize(benefit) for benefit in dfe_standards[key]['ipad_benefits']]
+    } for key, label in (("leadership", "Leadership"), ("accessibility", "Accessibility"), ("devices", "Devices"))]
+    
+    # Implementation considerations, personalized for the school
+    considerations = []
+    
+    # Personalize based on school size
+    if school['pupils'] > 500:
+        text = (f"For a school of {school['name']}'s size ({school['pupils']} pupils), a phased approach to staff training is recommended. "
+                "Begin with a core team of digital champions who can then support colleagues. The Apple Teacher "
+                "professional learning program provides structured support for educators at all levels of technical confidence.")
+    else:
+        text = (f"For a smaller school like {school['name']} ({school['pupils']} pupils), whole-staff training sessions can be effective. "
+                "The Apple Teacher professional learning program provides structured support for educators at all levels of "
+                f"technical confidence, with resources specifically designed for {school['phase'].lower()} settings.")
+    considerations.append({"title": "Professional Development", "text": text})
+    
+    # Personalize based on FSM percentage (as a proxy for potential funding challenges)
+    if school['fsm'] > 30:
+        text = (f"Given {school['name']}'s FSM percentage of {school['fsm']}%, you may be eligible for additional funding or support "
+                "for infrastructure improvements. A technical audit should be conducted to ensure the Wi-Fi network can support "
+                "simultaneous connections from all devices. Consider a phased approach to implementation to manage costs effectively.")
+    else:
+        text = (f"Robust Wi-Fi coverage throughout {school['name']} is essential for effective iPad implementation. A technical audit "
+                "should be conducted to ensure the network can support simultaneous connections from all devices, particularly "
+                "in areas where multiple classes may be using devices simultaneously.")
+    considerations.append({"title": "Technical Infrastructure", "text": text})
+    
+    # Personalize based on school phase
+    if is_primary:
+        text = (f"For {school['name']} as a {school['phase']} school, consider a year-group by year-group rollout starting with "
+                "upper KS2 classes, followed by lower KS2 and then KS1. This allows for evaluation and refinement of implementation "
+                "strategies before full-school deployment. Shared iPad deployments can be effective for younger year groups.")
+    elif "secondary" in school['phase'].lower():
+        text = (f"For {school['name']} as a {school['phase']} school, consider a subject-based or year-group rollout starting with "
+                "departments that align with your improvement priorities. This allows for evaluation and refinement of implementation "
+                "strategies before full-school deployment. A BYOD (Bring Your Own Device) policy could be considered for older students.")
+    else:
+        text = (f"Consider a phased rollout at {school['name']} starting with specific year groups or departments that align with your "
+                "improvement priorities. This allows for evaluation and refinement of implementation strategies before full-school deployment.")
+    considerations.append({"title": "Deployment Strategy", "text": text})
+    
+    # Create a personalized conclusion based on the school's context and priorities
+    priority_themes = []
+    for area in all_improvement_areas:
+        area_lower = area.lower()
+        if "curriculum" in area_lower or "subject" in area_lower:
+            if "curriculum" not in priority_themes:
+                priority_themes.append("curriculum")
+        if "reading" in area_lower or "literacy" in area_lower:
+            if "literacy" not in priority_themes:
+                priority_themes.append("literacy")
+        if "send" in area_lower or "special" in area_lower or "need" in area_lower:
+            if "inclusion" not in priority_themes:
+                priority_themes.append("inclusion")
+        if "staff" in area_lower or "teacher" in area_lower or "cpd" in area_lower:
+            if "staff development" not in priority_themes:
+                priority_themes.append("staff development")
+    
+    priority_text = ""
+    if priority_themes:
+        priority_text = "particularly in the areas of " + ", ".join(priority_themes[:-1])
+        if len(priority_themes) > 1:
+            priority_text += " and "
+        priority_text += priority_themes[-1]
+    
+    conclusion = [
+        f"Implementing 1:1 iPads at {school['name']} would directly address the specific improvement areas identified "
+        f"in your school's priorities {priority_text}. The recommendations in this report are tailored to your context "
+        f"as a {school['phase'].lower()} school with {school['pupils']} pupils.",
+        "The versatility, reliability, and built-in accessibility features of iPads make them an ideal platform "
+        "to support teaching and learning across the curriculum, while meeting the DfE's technology standards for "
+        "leadership, accessibility, and devices.",
+        f"By implementing these recommendations, {school['name']} can enhance teaching and learning experiences, "
+        "support staff in delivering the curriculum effectively, and provide pupils with the digital skills they "
+        "need for future success."
+    ]
+    
+    return freeze_report_model({
+        "school": {
+            "name": school['name'],
+            "address": school['address'],
+            "type": school['type'],
+            "phase": school['phase'],
+            "pupils": school['pupils'],
+            "fsm": school['fsm'],
+            "ofsted_url": school['ofstedUrl'],
+            "website": school.get('website', 'Not available')
+        },
+        "summary": summary,
+        "area_groups": [group for group in area_groups if group["areas"]],
+        "recommendations": recommendations,
+        "standards": standards,
+        "considerations": considerations,
+        "conclusion": conclusion
+    })
+
+# Function to render a report model as Markdown, for the download
+def render_report_markdown(model):
+    school = model["school"]
+    lines = [
+        f"# iPad Implementation Report for {school['name']}",
+        "",
+        "## School Details",
+        f"- Name: {school['name']}",
+        f"- Address: {school['address']}",
+        f"- Type: {school['type']}",
+        f"- Phase: {school['phase']}",
+        f"- Pupils: {school['pupils']}",
+        f"- FSM: {school['fsm']}%",
+        f"- Ofsted Report: {school['ofsted_url']}",
+        f"- School Website: {school['website']}",
+        "",
+        "## Executive Summary"
+    ]
+    for paragraph in model["summary"]:
+        lines += [paragraph, ""]
+    
+    lines.append("## Key Improvement Areas")
+    for group in model["area_groups"]:
+        lines += ["", f"### {group['title']}"] + [f"- {area}" for area in group["areas"]]
+    
+    lines += ["", "## iPad Implementation Recommendations"]
+    for recommendation in model["recommendations"]:
+        lines += ["", f"### {recommendation['title']}"]
+        if recommendation["areas"]:
+            lines += ["Relevant to your priorities:"] + [f"- \"{area}\"" for area in recommendation["areas"]] + [""]
+        lines += [f"- {item}" for item in recommendation["solutions"]]
+        lines += ["", "Relevant DfE Standards:"] + [f"- {title}" for title in recommendation["standards"]]
+    
+    lines += ["", "## Alignment with DfE Technology Standards"]
+    for standard in model["standards"]:
+        lines += ["", f"### {standard['title']}", standard["description"], ""] + [f"- {benefit}" for benefit in standard["benefits"]]
+    
+    lines += ["", "## Implementation Considerations for Your School"]
+    for consideration in model["considerations"]:
+        lines += ["", f"### {consideration['title']}", consideration["text"]]
+    
+    lines += ["", "## Conclusion"]
+    for paragraph in model["conclusion"]:
+        lines += [paragraph, ""]
+    return "\n".join(lines)
+
+# Function to render a report model as plain text, with underlined headings instead of Markdown
+def render_report_text(model):
+    def heading(text, underline):
+        return [text, underline * len(text)]
+    
+    school = model["school"]
+    lines = heading(f"iPad Implementation Report for {school['name']}", "=") + [""]
+    lines += heading("School Details", "-")
+    lines += [f"{label + ':':16}{value}" for label, value in (
+        ("Name", school['name']), ("Address", school['address']), ("Type", school['type']), ("Phase", school['phase']),
+        ("Pupils", school['pupils']), ("FSM", f"{school['fsm']}%"), ("Ofsted Report", school['ofsted_url']), ("School Website", school['website']))]
+    
+    lines += [""] + heading("Executive Summary", "-")
+    for paragraph in model["summary"]:
+        lines += [paragraph, ""]
+    
+    lines += heading("Key Improvement Areas", "-")
+    for group in model["area_groups"]:
+        lines += [group["title"]] + [f"  * {area}" for area in group["areas"]] + [""]
+    
+    lines += heading("iPad Implementation Recommendations", "-")
+    for recommendation in model["recommendations"]:
+        lines += [recommendation["title"].upper()]
+        if recommendation["areas"]:
+            lines += ["Relevant to your priorities: " + "; ".join(f"\"{area}\"" for area in recommendation["areas"])]
+        lines += [f"  * {item}" for item in recommendation["solutions"]]
+        lines += ["Relevant DfE Standards: " + ", ".join(recommendation["standards"]), ""]
+    
+    lines += heading("Alignment with DfE Technology Standards", "-")
+    for standard in model["standards"]:
+        lines += [standard["title"].upper(), standard["description"]] + [f"  * {benefit}" for benefit in standard["benefits"]] + [""]
+    
+    lines += heading("Implementation Considerations for Your School", "-")
+    for consideration in model["considerations"]:
+        lines += [consideration["title"].upper(), consideration["text"], ""]
+    
+    lines += heading("Conclusion", "-")
+    for paragraph in model["conclusion"]:
+        lines += [paragraph, ""]
+    return "\n".join(lines)
+
+# Function to lay a report model out as a flat outline of (kind, text) blocks for the document exports
+# (kinds: title, heading, subheading, paragraph, label and bullet)
+def get_report_blocks(model):
+    school = model["school"]
+    blocks = [("title", f"iPad Implementation Report for {school['name']}"), ("paragraph", school["address"]), ("heading", "School Details")]
+    blocks += [("bullet", f"{label}: {value}") for label, value in (
+        ("Name", school['name']), ("Address", school['address']), ("Type", school['type']), ("Phase", school['phase']),
+        ("Pupils", school['pupils']), ("FSM", f"{school['fsm']}%"), ("Ofsted Report", school['ofsted_url']), ("School Website", school['website']))]
+    
+    blocks.append(("heading", "Executive Summary"))
+    blocks += [("paragraph", paragraph) for paragraph in model["summary"]]
+    
+    blocks.append(("heading", "Key Improvement Areas"))
+    for group in model["area_groups"]:
+        blocks.append(("subheading", group["title"].rstrip(":")))
+        blocks += [("bullet", area) for area in group["areas"]]
+    
+    blocks.append(("heading", "iPad Implementation Recommendations"))
+    for recommendation in model["recommendations"]:
+        blocks.append(("subheading", recommendation["title"]))
+        if recommendation["areas"]:
+            blocks.append(("label", "Relevant to your priorities:"))
+            blocks += [("bullet", f"\"{area}\"") for area in recommendation["areas"]]
+        blocks += [("bullet", item) for item in recommendation["solutions"]]
+        blocks.append(("label", "Relevant DfE Standards: " + ", ".join(recommendation["standards"])))
+    
+    blocks.append(("heading", "Alignment with DfE Technology Standards"))
+    for standard in model["standards"]:
+        blocks += [("subheading", standard["title"]), ("paragraph", standard["description"])]
+        blocks += [("bullet", benefit) for benefit in standard["benefits"]]
+    
+    blocks.append(("heading", "Implementation Considerations for Your School"))
+    for consideration in model["considerations"]:
+        blocks += [("subheading", consideration["title"]), ("paragraph", consideration["text"])]
+    
+    blocks.append(("heading", "Conclusion"))
+    blocks += [("paragraph", paragraph) for paragraph in model["conclusion"]]
+    return blocks
+
+# Styling for the HTML export, close to the dashboard's own
+REPORT_HTML_STYLE = """
+body { max-width: 800px; margin: 40px auto; padding: 0 20px; color: #1d1d1f; line-height: 1.5;
+       font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Helvetica, Arial, sans-serif; }
+h1, h2 { color: #0071e3; }
+h2 { border-bottom: 1px solid #e5e5e7; padding-bottom: 4px; margin-top: 32px; }
+li { margin-bottom: 4px; }
+"""
+
+# Function to render a report model as a standalone HTML page
+def render_report_html(model):
+    tags = {"title": "h1", "heading": "h2", "subheading": "h3", "paragraph": "p"}
+    parts = []
+    in_list = False
+    for kind, text in get_report_blocks(model):
+        if kind == "bullet":
+            if not in_list:
+                parts.append("<ul>")
+                in_list = True
+            parts.append(f"<li>{escape_xml(text)}</li>")
+            continue
+        if in_list:
+            parts.append("</ul>")
+            in_list = False
+        if kind == "label":
+            parts.append(f"<p><strong>{escape_xml(text)}</strong></p>")
+        else:
+            parts.append(f"<{tags[kind]}>{escape_xml(text)}</{tags[kind]}>")
+    if in_list:
+        parts.append("</ul>")
+    
+    title = escape_xml(f"iPad Implementation Report for {model['school']['name']}")
+    return (f"<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"utf-8\">\n<title>{title}</title>\n"
+            f"<style>{REPORT_HTML_STYLE}</style>\n</head>\n<body>\n" + "\n".join(parts) + "\n</body>\n</html>\n")
+
+# The fixed parts of a Word document: its content types, relationships and paragraph styles
+REPORT_DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>'
+)
+REPORT_DOCX_PACKAGE_RELATIONSHIPS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>'
+    '</Relationships>'
+)
+REPORT_DOCX_DOCUMENT_RELATIONSHIPS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+REPORT_DOCX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    '<w:docDefaults><w:rPrDefault><w:rPr><w:rFonts w:ascii="Calibri" w:hAnsi="Calibri" w:cs="Calibri"/><w:sz w:val="22"/></w:rPr></w:rPrDefault>'
+    '<w:pPrDefault><w:pPr><w:spacing w:after="120"/></w:pPr></w:pPrDefault></w:docDefaults>'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/>'
+    '<w:pPr><w:spacing w:after="240"/></w:pPr><w:rPr><w:b/><w:color w:val="0071E3"/><w:sz w:val="40"/></w:rPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/>'
+    '<w:pPr><w:keepNext/><w:spacing w:before="360" w:after="120"/><w:outlineLvl w:val="0"/></w:pPr>'
+    '<w:rPr><w:b/><w:color w:val="0071E3"/><w:sz w:val="30"/></w:rPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading2"><w:name w:val="heading 2"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/>'
+    '<w:pPr><w:keepNext/><w:spacing w:before="240" w:after="80"/><w:outlineLvl w:val="1"/></w:pPr>'
+    '<w:rPr><w:b/><w:sz w:val="24"/></w:rPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="ListBullet"><w:name w:val="List Bullet"/><w:basedOn w:val="Normal"/>'
+    '<w:pPr><w:spacing w:after="60"/><w:ind w:left="360" w:hanging="360"/></w:pPr></w:style>'
+    '</w:styles>'
+)
+
+# Function to render a report model as a Word document, written directly as the zipped XML a .docx is
+# so no word processor or library is needed on the server
+def render_report_docx(model, progress=None):
+    styles = {"title": "Title", "heading": "Heading1", "subheading": "Heading2", "bullet": "ListBullet"}
+    blocks = get_report_blocks(model)
+    paragraphs = []
+    for index, (kind, text) in enumerate(blocks):
+        properties = f'<w:pPr><w:pStyle w:val="{styles[kind]}"/></w:pPr>' if kind in styles else ""
+        run_properties = "<w:rPr><w:b/></w:rPr>" if kind == "label" else ""
+        if kind == "bullet":
+            text = "•\t" + text
+        text = escape_xml(text).replace("\t", '</w:t><w:tab/><w:t xml:space="preserve">')
+        paragraphs.append(f'<w:p>{properties}<w:r>{run_properties}<w:t xml:space="preserve">{text}</w:t></w:r></w:p>')
+        if progress and index % 100 == 0:
+            progress(0.9 * index / len(blocks))
+    
+    document = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>' + "".join(paragraphs) +
+                '<w:sectPr><w:pgSz w:w="11906" w:h="16838"/>'
+                '<w:pgMar w:top="1134" w:right="1134" w:bottom="1134" w:left="1134" w:header="709" w:footer="709" w:gutter="0"/>'
+                '</w:sectPr></w:body></w:document>')
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", REPORT_DOCX_CONTENT_TYPES)
+        archive.writestr("_rels/.rels", REPORT_DOCX_PACKAGE_RELATIONSHIPS)
+        archive.writestr("word/_rels/document.xml.rels", REPORT_DOCX_DOCUMENT_RELATIONSHIPS)
+        archive.writestr("word/styles.xml", REPORT_DOCX_STYLES)
+        archive.writestr("word/document.xml", document)
+    return buffer.getvalue()
+
+# Helvetica's character widths (thousandths of the font size) for the printable ASCII characters, from its font metrics
+PDF_HELVETICA_WIDTHS = dict(zip(range(32, 127), [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584
+]))
+# Helvetica-Bold is wider; scaling the regular widths keeps bold lines inside the margins
+PDF_BOLD_WIDTH_SCALE = 1.12
+PDF_PAGE_WIDTH, PDF_PAGE_HEIGHT, PDF_MARGIN = 595, 842, 56  # A4, in points
+# Font size, bold, space above and indent of each kind of report block
+PDF_BLOCK_STYLES = {
+    "title": (18, True, 0, 0),
+    "heading": (14, True, 16, 0),
+    "subheading": (11.5, True, 10, 0),
+    "paragraph": (10, False, 5, 0),
+    "label": (10, True, 5, 0),
+    "bullet": (10, False, 2, 14)
+}
+
+# Function to measure a line of text in Helvetica at a font size
+def get_pdf_text_width(text, size, bold=False):
+    width = sum(PDF_HELVETICA_WIDTHS.get(ord(char), 556) for char in text) * size / 1000
+    return width * PDF_BOLD_WIDTH_SCALE if bold else width
+
+# Function to word-wrap text to a width in points, splitting words too long for a line on their own
+def wrap_pdf_text(text, width, size, bold=False):
+    lines = []
+    line = ""
+    for word in text.split():
+        candidate = f"{line} {word}" if line else word
+        if get_pdf_text_width(candidate, size, bold) <= width:
+            line = candidate
+            continue
+        if line:
+            lines.append(line)
+        while get_pdf_text_width(word, size, bold) > width:
+            cut = len(word) - 1
+            while cut > 1 and get_pdf_text_width(word[:cut], size, bold) > width:
+                cut -= 1
+            lines.append(word[:cut])
+            word = word[cut:]
+        line = word
+    if line or not lines:
+        lines.append(line)
+    return lines
+
+# Function to write a string as a PDF literal string in the fonts' WinAnsi encoding
+def encode_pdf_text(text):
+    data = text.encode("cp1252", errors="replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+# Function to render a report model as an A4 PDF in the standard Helvetica fonts, laid out here in pure Python
+# so no PDF library is needed on the server; long reports are slow to lay out, so the dashboard renders this in a PDF worker process
+def render_report_pdf(model, progress=None):
+    blocks = get_report_blocks(model)
+    text_width = PDF_PAGE_WIDTH - 2 * PDF_MARGIN
+    pages = []
+    content = []
+    y = 0
+    for index, (kind, text) in enumerate(blocks):
+        size, bold, space, indent = PDF_BLOCK_STYLES[kind]
+        leading = size * 1.3
+        lines = wrap_pdf_text(text, text_width - indent, size, bold)
+        # Keep headings with the start of what follows them
+        needed = leading * (len(lines) + (2 if kind in ("heading", "subheading") else 0))
+        if not pages or y - space - needed < PDF_MARGIN:
+            content = []
+            pages.append(content)
+            y = PDF_PAGE_HEIGHT - PDF_MARGIN
+        elif y < PDF_PAGE_HEIGHT - PDF_MARGIN:
+            y -= space
+        font = b"/F2" if bold else b"/F1"
+        for number, line in enumerate(lines):
+            if y - leading < PDF_MARGIN:
+                content = []
+                pages.append(content)
+                y = PDF_PAGE_HEIGHT - PDF_MARGIN
+            y -= leading
+            if kind == "bullet" and number == 0:
+                content.append(b"BT /F1 %g Tf %g %g Td %s Tj ET" % (size, PDF_MARGIN + 3, y, encode_pdf_text("•")))
+            content.append(b"BT %s %g Tf %g %g Td %s Tj ET" % (font, size, PDF_MARGIN + indent, y, encode_pdf_text(line)))
+        if progress and index % 100 == 0:
+            progress(0.8 * index / len(blocks))
+    
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # The page tree, once the pages are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        b"<< /Title %s /Producer (School iPad Dashboard) >>" % encode_pdf_text(f"iPad Implementation Report for {model['school']['name']}")
+    ]
+    page_ids = []
+    for number, content in enumerate(pages, start=1):
+        footer = f"{model['school']['name']} - page {number} of {len(pages)}"
+        content.append(b"BT /F1 8 Tf %g %g Td %s Tj ET" % (PDF_MARGIN, PDF_MARGIN / 2, encode_pdf_text(footer)))
+        stream = zlib.compress(b"\n".join(content))
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R /Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>"
+                       % (PDF_PAGE_WIDTH, PDF_PAGE_HEIGHT, len(objects)))
+        page_ids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % page_id for page_id in page_ids), len(pages))
+    
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = output.tell()
+    output.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    output.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+    output.write(b"trailer\n<< /Size %d /Root 1 0 R /Info 5 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return output.getvalue()
+
+# Download formats for a report: Markdown and text are quick to render in the export thread,
+# Word and PDF documents are laid out in a PDF worker process so a long one can't hold up other sessions
+REPORT_EXPORT_FORMATS = {
+    "markdown": {"label": "Markdown", "extension": "md", "mime": "text/markdown", "render": render_report_markdown, "process": False},
+    "text": {"label": "Text", "extension": "txt", "mime": "text/plain", "render": render_report_text, "process": False},
+    "html": {"label": "HTML", "extension": "html", "mime": "text/html", "render": render_report_html, "process": False},
+    "docx": {"label": "Word", "extension": "docx", "process": True, "render": render_report_docx,
+             "mime": "application/vnd.openxmlformats-officedocument.wordprocessingml.document"},
+    "pdf": {"label": "PDF", "extension": "pdf", "mime": "application/pdf", "render": render_report_pdf, "process": True}
+}
+
+# Function to get the cache key of a school's report: its URN and a hash of everything else the report is built from
+# (the school's details are included because the Ofsted link can change once its website has been read)
+def get_report_cache_key(school, ofsted_priorities, school_strategies, custom_priorities, scorer=None):
+    fingerprint = json.dumps([school, list(ofsted_priorities), list(school_strategies), list(custom_priorities), scorer or SOLUTION_SCORER],
+                             sort_keys=True, default=str)
+    return school["urn"], hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+# Function to get a school's built report from the cache, building and storing it on a miss
+def get_cached_report(school, ofsted_priorities, school_strategies, custom_priorities, scorer=None, cache=None, version=None):
+    cache = cache or report_cache
+    version = version or knowledge_base_version
+    key = get_report_cache_key(school, ofsted_priorities, school_strategies, custom_priorities, scorer)
+    with cache["lock"]:
+        if cache["version"] != version:
+            # The solutions or standards changed, so every report built from the old ones is out of date
+            if cache["entries"]:
+                cache["stats"]["invalidations"] += 1
+            cache["entries"].clear()
+            cache["bytes"] = 0
+            cache["version"] = version
+        cached = cache["entries"].get(key)
+        if cached is not None:
+            cache["entries"].move_to_end(key)
+            cache["stats"]["hits"] += 1
+            return cached[0]
+        cache["stats"]["misses"] += 1
+    
+    model = build_report_model(school, ofsted_priorities, school_strategies, custom_priorities, scorer)
+    # Downloads are rendered on request and added to the artifacts by format
+    report = types.MappingProxyType({"key": key, "model": model, "artifacts": {}})
+    size = get_report_model_size(model) + 1024
+    
+    with cache["lock"]:
+        if cache["version"] == version and key not in cache["entries"]:
+            cache["entries"][key] = (report, size)
+            cache["bytes"] += size
+            evict_reports(cache)
+    return report
+
+# Function to estimate the memory held by a report model from its strings and containers
+def get_report_model_size(value):
+    if isinstance(value, types.MappingProxyType):
+        return 48 + sys.getsizeof(dict.fromkeys(value)) + sum(get_report_model_size(item) for item in value.values())
+    if isinstance(value, tuple):
+        return sys.getsizeof(value) + sum(get_report_model_size(item) for item in value)
+    return sys.getsizeof(value)
+
+# Function to drop the least recently used reports until the cache is back within its limit (call with the lock held)
+def evict_reports(cache):
+    while cache["bytes"] > cache["max_bytes"] and len(cache["entries"]) > 1:
+        evicted, evicted_size = cache["entries"].popitem(last=False)[1]
+        cache["bytes"] -= evicted_size
+        cache["stats"]["evictions"] += 1
+
+# Function to keep a rendered download with its cached report, counting it towards the cache's limit
+def store_report_artifact(report, export_format, data, cache=None):
+    cache = cache or report_cache
+    with cache["lock"]:
+        report["artifacts"][export_format] = data
+        cached = cache["entries"].get(report["key"])
+        if cached is not None and cached[0] is report:
+            cache["entries"][report["key"]] = (report, cached[1] + len(data))
+            cache["bytes"] += len(data)
+            evict_reports(cache)
+
+# Function to add to the report download counters shared by every session
+def record_export_stat(name):
+    with report_exports["lock"]:
+        report_exports["stats"][name] += 1
+
+# Function to render a Word or PDF export in a PDF worker process within the export time limit, passing on its progress
+# Returns None when no worker could be started, so the export thread renders it instead
+def render_export_in_worker(model, export_format, job):
+    label = REPORT_EXPORT_FORMATS[export_format]["label"]
+    deadline = time.monotonic() + REPORT_EXPORT_TIMEOUT_SECONDS
+    if not pdf_workers["slots"].acquire(timeout=REPORT_EXPORT_TIMEOUT_SECONDS):
+        record_export_stat("timeouts")
+        raise TimeoutError(f"the {label} export waited longer than {REPORT_EXPORT_TIMEOUT_SECONDS:g} seconds for a worker")
+    try:
+        worker, problem = take_pdf_worker(deadline)
+        if worker is None and problem == "failures":
+            return None
+        if worker is None:
+            record_export_stat("timeouts")
+            raise TimeoutError(f"the {label} export waited longer than {REPORT_EXPORT_TIMEOUT_SECONDS:g} seconds for a worker")
+        
+        reusable = False
+        try:
+            worker["connection"].send(("export", thaw_report_model(model), export_format))
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not worker["connection"].poll(remaining):
+                    record_export_stat("timeouts")
+                    raise TimeoutError(f"the {label} export took longer than {REPORT_EXPORT_TIMEOUT_SECONDS:g} seconds")
+                kind, value = worker["connection"].recv()
+                if kind == "progress":
+                    job["progress"] = value
+                    continue
+                if kind == "error":
+                    reusable = value != "memory"
+                    raise RuntimeError(f"the {label} export ran out of memory" if value == "memory" else value)
+                reusable = True
+                return value
+        except (EOFError, OSError):
+            raise RuntimeError(f"the {label} export process stopped unexpectedly")
+        finally:
+            return_pdf_worker(worker, reusable)
+    finally:
+        pdf_workers["slots"].release()
+
+# Function to render one export of a report in an export thread, storing it with the cached report when done
+# Word and PDF go to a PDF worker process, as PDF extraction does, so laying out a long document runs outside
+# the web server process instead of competing with every session's reruns
+def render_report_export(report, export_format, job):
+    details = REPORT_EXPORT_FORMATS[export_format]
+    if not details["process"]:
+        data = details["render"](report["model"])
+    else:
+        data = render_export_in_worker(report["model"], export_format, job)
+        if data is None:
+            # No worker process could be started - render here in the export thread
+            data = details["render"](report["model"], progress=lambda fraction: job.update(progress=fraction))
+    
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    store_report_artifact(report, export_format, data)
+    job["progress"] = 1.0
+    return data
+
+# Function to start rendering a report in a download format, or join the export already running for the same report
+# Returns None when the download is already cached with the report
+def start_report_export(report, export_format, exports=None):
+    exports = exports or report_exports
+    key = (report["key"], export_format)
+    with exports["lock"]:
+        if export_format in report["artifacts"]:
+            return None
+        job = exports["jobs"].get(key)
+        if job is not None:
+            exports["stats"]["joined"] += 1
+            return job
+        job = {"key": key, "format": export_format, "progress": 0.0}
+        exports["jobs"][key] = job
+        exports["stats"]["started"] += 1
+        job["future"] = exports["executor"].submit(render_report_export, report, export_format, job)
+    
+    def finish(future):
+        with exports["lock"]:
+            if exports["jobs"].get(key) is job:
+                del exports["jobs"][key]
+            if future.exception() is not None:
+                exports["stats"]["failed"] += 1
+    
+    job["future"].add_done_callback(finish)
+    return job
+
+# Function to start preparing the selected download of the report
+def prepare_report_export(report, export_format):
+    st.session_state.report_export = start_report_export(report, export_format)
+
+# Show the download's progress until it is ready, then rerun the page to offer it
+@st.fragment(run_every=REPORT_EXPORT_POLL_SECONDS)
+def poll_report_export():
+    job = st.session_state.get("report_export")
+    if job is None or job["future"].done():
+        st.rerun()
+    st.progress(job["progress"], text=f"Preparing the {REPORT_EXPORT_FORMATS[job['format']]['label']} download...")
+
+# Function to display report
+def display_report(school):
+    # If no areas provided, show a message
+    if not (st.session_state.ofsted_priorities or st.session_state.school_strategies or st.session_state.custom_priorities):
+        st.warning("No improvement areas or strategies have been added. Please go back and add some priorities or strategies to generate a meaningful report.")
+        st.button("Back to School Profile", key="back_to_profile_empty", on_click=back_to_profile)
+        return
+    
+    # Either scorer can make the recommendations, so the two can be compared on the same school
+    st.radio(
+        "Recommendation scoring",
+        list(SOLUTION_SCORERS),
+        format_func=SOLUTION_SCORERS.get,
+        index=list(SOLUTION_SCORERS).index(SOLUTION_SCORER) if SOLUTION_SCORER in SOLUTION_SCORERS else 0,
+        key="solution_scorer",
+        horizontal=True,
+        help="Keyword matches counts the solution keywords found in each area. "
+             "TF-IDF weighs every word an area shares with a solution's keywords, title and descriptions, so reworded priorities still match."
+    )
+    
+    # Everything below is rendered from this one model, including the downloads,
+    # and reruns that change nothing it depends on reuse the cached one
+    report = get_cached_report(school, st.session_state.ofsted_priorities, st.session_state.school_strategies,
+                               st.session_state.custom_priorities, st.session_state.solution_scorer)
+    model = report["model"]
+    
+    st.markdown("<div class='card'>", unsafe_allow_html=True)
+    
+    # Report header
+    st.markdown(f"<h1>iPad Implementation Report</h1>", unsafe_allow_html=True)
+    st.markdown(f"<h2>{school['name']}</h2>", unsafe_allow_html=True)
+    st.markdown(f"<p>{school['address']}</p>", unsafe_allow_html=True)
+    
+    st.markdown("</div>", unsafe_allow_html=True)
     
-    <p>The recommendations are tailored to the specific context of {school['name']} as a {size_context} {school['phase'].lower()} school
-    {fsm_context}, with a focus on how iPad technology can support the school's unique improvement journey.</p>
-    """, unsafe_allow_html=True)
+    # Executive Summary
+    st.markdown("<div class='card'>", unsafe_allow_html=True)
+    st.markdown("<h3>Executive Summary</h3>", unsafe_allow_html=True)
+    st.markdown("".join(f"<p>{paragraph}</p>" for paragraph in model["summary"]), unsafe_allow_html=True)
     st.markdown("</div>", unsafe_allow_html=True)
     
     # Key Improvement Areas
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.markdown("<h3>Key Improvement Areas</h3>", unsafe_allow_html=True)
     
-    # Separate areas by type
-    if st.session_state.ofsted_priorities:
-        st.markdown("<h4>From Ofsted Report:</h4>", unsafe_allow_html=True)
-        for area in st.session_state.ofsted_priorities:
-            st.markdown(f"<div class='improvement-area'>{area}</div>", unsafe_allow_html=True)
-    
-    if st.session_state.school_strategies:
-        st.markdown("<h4>From School Strategy:</h4>", unsafe_allow_html=True)
-        for area in st.session_state.school_strategies:
-            st.markdown(f"<div class='strategy-area'>{area}</div>", unsafe_allow_html=True)
-    
-    if st.session_state.custom_priorities:
-        st.markdown("<h4>Additional Priorities:</h4>", unsafe_allow_html=True)
-        for area in st.session_state.custom_priorities:
-            st.markdown(f"<div class='priority-area'>{area}</div>", unsafe_allow_html=True)
+    for group in model["area_groups"]:
+        st.markdown(f"<h4>{group['title']}</h4>", unsafe_allow_html=True)
+        for area in group["areas"]:
+            st.markdown(f"<div class='{group['style']}'>{area}</div>", unsafe_allow_html=True)
     
     st.markdown("</div>", unsafe_allow_html=True)
     
@@ -931,34 +4323,21 @@ def display_report(school):
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.markdown("<h3>iPad Implementation Recommendations</h3>", unsafe_allow_html=True)
     
-    # Create personalized recommendations for each solution
-    for solution in matched_solutions:
-        with st.expander(solution["title"]):
+    for recommendation in model["recommendations"]:
+        with st.expander(recommendation["title"]):
             # Add context about why this solution is relevant to the school
-            relevant_areas = []
-            for area in all_improvement_areas:
-                area_lower = area.lower()
-                if any(keyword.lower() in area_lower for keyword in improvement_solutions[next(k for k, v in improvement_solutions.items() if v["title"] == solution["title"])]["keywords"]):
-                    relevant_areas.append(area)
-            
-            if relevant_areas:
+            if recommendation["areas"]:
                 st.markdown("**Relevant to your priorities:**")
-                for area in relevant_areas[:2]:  # Show up to 2 most relevant areas
+                for area in recommendation["areas"]:
                     st.markdown(f"- *\"{area}\"*")
                 st.markdown("")
             
-            # Show the solutions with school context
-            for item in solution["solutions"]:
-                # Replace generic terms with school-specific ones where appropriate
-                personalized_item = item
-                if "primary" in school['phase'].lower():
-                    personalized_item = personalized_item.replace("students", "pupils")
-                
-                st.markdown(f"- {personalized_item}")
+            for item in recommendation["solutions"]:
+                st.markdown(f"- {item}")
             
             st.markdown("**Relevant DfE Standards:**")
-            for standard in solution["standards"]:
-                st.markdown(f"<span style='background-color: #e8f0fe; padding: 4px 8px; border-radius: 12px; font-size: 14px;'>{dfe_standards[standard]['title']}</span>", unsafe_allow_html=True)
+            for title in recommendation["standards"]:
+                st.markdown(f"<span style='background-color: #e8f0fe; padding: 4px 8px; border-radius: 12px; font-size: 14px;'>{title}</span>", unsafe_allow_html=True)
     
     st.markdown("</div>", unsafe_allow_html=True)
     
@@ -966,43 +4345,15 @@ def display_report(school):
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.markdown("<h3>Alignment with DfE Technology Standards</h3>", unsafe_allow_html=True)
     
-    tabs = st.tabs(["Leadership", "Accessibility", "Devices"])
-    
-    with tabs[0]:
-        st.markdown(f"<h4>{dfe_standards['leadership']['title']}</h4>", unsafe_allow_html=True)
-        st.markdown(f"<p>{dfe_standards['leadership']['description']}</p>", unsafe_allow_html=True)
-        st.markdown("<h5>How 1:1 iPads Support This Standard at Your School:</h5>", unsafe_allow_html=True)
-        for benefit in dfe_standards['leadership']['ipad_benefits']:
-            # Personalize the benefit with school context
-            personalized_benefit = benefit
-            if "primary" in school['phase'].lower():
-                personalized_benefit = personalized_benefit.replace("students", "pupils")
-            
-            st.markdown(f"- {personalized_benefit}")
-    
-    with tabs[1]:
-        st.markdown(f"<h4>{dfe_standards['accessibility']['title']}</h4>", unsafe_allow_html=True)
-        st.markdown(f"<p>{dfe_standards['accessibility']['description']}</p>", unsafe_allow_html=True)
-        st.markdown("<h5>How 1:1 iPads Support This Standard at Your School:</h5>", unsafe_allow_html=True)
-        for benefit in dfe_standards['accessibility']['ipad_benefits']:
-            # Personalize the benefit with school context
-            personalized_benefit = benefit
-            if "primary" in school['phase'].lower():
-                personalized_benefit = personalized_benefit.replace("students", "pupils")
-            
-            st.markdown(f"- {personalized_benefit}")
-    
-    with tabs[2]:
-        st.markdown(f"<h4>{dfe_standards['devices']['title']}</h4>", unsafe_allow_html=True)
-        st.markdown(f"<p>{dfe_standards['devices']['description']}</p>", unsafe_allow_html=True)
-        st.markdown("<h5>How 1:1 iPads Support This Standard at Your School:</h5>", unsafe_allow_html=True)
-        for benefit in dfe_standards['devices']['ipad_benefits']:
-            # Personalize the benefit with school context
-            personalized_benefit = benefit
-            if "primary" in school['phase'].lower():
-                personalized_benefit = personalized_benefit.replace("students", "pupils")
-            
-            st.markdown(f"- {personalized_benefit}")
+    tabs = st.tabs([standard["label"] for standard in model["standards"]])
+    
+    for tab, standard in zip(tabs, model["standards"]):
+        with tab:
+            st.markdown(f"<h4>{standard['title']}</h4>", unsafe_allow_html=True)
+            st.markdown(f"<p>{standard['description']}</p>", unsafe_allow_html=True)
+            st.markdown("<h5>How 1:1 iPads Support This Standard at Your School:</h5>", unsafe_allow_html=True)
+            for benefit in standard["benefits"]:
+                st.markdown(f"- {benefit}")
     
     st.markdown("</div>", unsafe_allow_html=True)
     
@@ -1010,99 +4361,16 @@ def display_report(school):
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.markdown("<h3>Implementation Considerations for Your School</h3>", unsafe_allow_html=True)
     
-    with st.expander("Professional Development"):
-        # Personalize based on school size
-        if school['pupils'] > 500:
-            st.markdown(f"""
-            For a school of {school['name']}'s size ({school['pupils']} pupils), a phased approach to staff training is recommended. 
-            Begin with a core team of digital champions who can then support colleagues. The Apple Teacher 
-            professional learning program provides structured support for educators at all levels of technical confidence.
-            """)
-        else:
-            st.markdown(f"""
-            For a smaller school like {school['name']} ({school['pupils']} pupils), whole-staff training sessions can be effective. 
-            The Apple Teacher professional learning program provides structured support for educators at all levels of 
-            technical confidence, with resources specifically designed for {school['phase'].lower()} settings.
-            """)
-    
-    with st.expander("Technical Infrastructure"):
-        # Personalize based on FSM percentage (as a proxy for potential funding challenges)
-        if school['fsm'] > 30:
-            st.markdown(f"""
-            Given {school['name']}'s FSM percentage of {school['fsm']}%, you may be eligible for additional funding or support 
-            for infrastructure improvements. A technical audit should be conducted to ensure the Wi-Fi network can support 
-            simultaneous connections from all devices. Consider a phased approach to implementation to manage costs effectively.
-            """)
-        else:
-            st.markdown(f"""
-            Robust Wi-Fi coverage throughout {school['name']} is essential for effective iPad implementation. A technical audit 
-            should be conducted to ensure the network can support simultaneous connections from all devices, particularly 
-            in areas where multiple classes may be using devices simultaneously.
-            """)
-    
-    with st.expander("Deployment Strategy"):
-        # Personalize based on school phase
-        if "primary" in school['phase'].lower():
-            st.markdown(f"""
-            For {school['name']} as a {school['phase']} school, consider a year-group by year-group rollout starting with 
-            upper KS2 classes, followed by lower KS2 and then KS1. This allows for evaluation and refinement of implementation 
-            strategies before full-school deployment. Shared iPad deployments can be effective for younger year groups.
-            """)
-        elif "secondary" in school['phase'].lower():
-            st.markdown(f"""
-            For {school['name']} as a {school['phase']} school, consider a subject-based or year-group rollout starting with 
-            departments that align with your improvement priorities. This allows for evaluation and refinement of implementation 
-            strategies before full-school deployment. A BYOD (Bring Your Own Device) policy could be considered for older students.
-            """)
-        else:
-            st.markdown(f"""
-            Consider a phased rollout at {school['name']} starting with specific year groups or departments that align with your 
-            improvement priorities. This allows for evaluation and refinement of implementation strategies before full-school deployment.
-            """)
+    for consideration in model["considerations"]:
+        with st.expander(consideration["title"]):
+            st.markdown(consideration["text"])
     
     st.markdown("</div>", unsafe_allow_html=True)
     
     # Conclusion - Personalized for the school
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.markdown("<h3>Conclusion</h3>", unsafe_allow_html=True)
-    
-    # Create a personalized conclusion based on the school's context and priorities
-    priority_themes = []
-    for area in all_improvement_areas:
-        area_lower = area.lower()
-        if "curriculum" in area_lower or "subject" in area_lower:
-            if "curriculum" not in priority_themes:
-                priority_themes.append("curriculum")
-        if "reading" in area_lower or "literacy" in area_lower:
-            if "literacy" not in priority_themes:
-                priority_themes.append("literacy")
-        if "send" in area_lower or "special" in area_lower or "need" in area_lower:
-            if "inclusion" not in priority_themes:
-                priority_themes.append("inclusion")
-        if "staff" in area_lower or "teacher" in area_lower or "cpd" in area_lower:
-            if "staff development" not in priority_themes:
-                priority_themes.append("staff development")
-    
-    priority_text = ""
-    if priority_themes:
-        priority_text = "particularly in the areas of " + ", ".join(priority_themes[:-1])
-        if len(priority_themes) > 1:
-            priority_text += " and "
-        priority_text += priority_themes[-1]
-    
-    st.markdown(f"""
-    <p>Implementing 1:1 iPads at {school['name']} would directly address the specific improvement areas identified 
-    in your school's priorities {priority_text}. The recommendations in this report are tailored to your context 
-    as a {school['phase'].lower()} school with {school['pupils']} pupils.</p>
-    
-    <p>The versatility, reliability, and built-in accessibility features of iPads make them an ideal platform 
-    to support teaching and learning across the curriculum, while meeting the DfE's technology standards for 
-    leadership, accessibility, and devices.</p>
-    
-    <p>By implementing these recommendations, {school['name']} can enhance teaching and learning experiences, 
-    support staff in delivering the curriculum effectively, and provide pupils with the digital skills they 
-    need for future success.</p>
-    """, unsafe_allow_html=True)
+    st.markdown("".join(f"<p>{paragraph}</p>" for paragraph in model["conclusion"]), unsafe_allow_html=True)
     st.markdown("</div>", unsafe_allow_html=True)
     
     # Navigation buttons
@@ -1110,148 +4378,30 @@ def display_report(school):
     with col1:
         st.button("Back to School Profile", key="back_to_profile_button", on_click=back_to_profile)
     with col2:
-        # Simple text download instead of PDF
-        report_text = f"""
-        # iPad Implementation Report for {school['name']}
-        
-        ## School Details
-        - Name: {school['name']}
-        - Address: {school['address']}
-        - Type: {school['type']}
-        - Phase: {school['phase']}
-        - Pupils: {school['pupils']}
-        - FSM: {school['fsm']}%
-        - Ofsted Report: {school['ofstedUrl']}
-        - School Website: {school.get('website', 'Not available')}
-        
-        ## Executive Summary
-        This report outlines how implementing 1:1 iPads at {school['name']} can address the specific challenges and priorities 
-        identified in the {area_summary} while meeting the Department for Education's technology standards for digital leadership, 
-        accessibility, and devices.
-        
-        The recommendations are tailored to the specific context of {school['name']} as a {size_context} {school['phase'].lower()} school
-        {fsm_context}, with a focus on how iPad technology can support the school's unique improvement journey.
-        
-        ## Key Improvement Areas
-        """
-        
-        # Add Ofsted priorities
-        if st.session_state.ofsted_priorities:
-            report_text += "\n### From Ofsted Report:\n"
-            report_text += chr(10).join(['- ' + area for area in st.session_state.ofsted_priorities])
-            report_text += "\n"
-        
-        # Add school strategies
-        if st.session_state.school_strategies:
-            report_text += "\n### From School Strategy:\n"
-            report_text += chr(10).join(['- ' + area for area in st.session_state.school_strategies])
-            report_text += "\n"
-        
-        # Add custom priorities
-        if st.session_state.custom_priorities:
-            report_text += "\n### Additional Priorities:\n"
-            report_text += chr(10).join(['- ' + area for area in st.session_state.custom_priorities])
-            report_text += "\n"
-        
-        # Add solutions
-        report_text += "\n## iPad Implementation Recommendations\n"
-        
-        for solution in matched_solutions:
-            report_text += f"### {solution['title']}\n"
-            
-            # Add relevant priorities
-            relevant_areas = []
-            for area in all_improvement_areas:
-                area_lower = area.lower()
-                if any(keyword.lower() in area_lower for keyword in improvement_solutions[next(k for k, v in improvement_solutions.items() if v["title"] == solution["title"])]["keywords"]):
-                    relevant_areas.append(area)
-            
-            if relevant_areas:
-                report_text += "Relevant to your priorities:\n"
-                for area in relevant_areas[:2]:
-                    report_text += f"- \"{area}\"\n"
-                report_text += "\n"
-            
-            # Add solutions
-            for item in solution["solutions"]:
-                personalized_item = item
-                if "primary" in school['phase'].lower():
-                    personalized_item = personalized_item.replace("students", "pupils")
-                report_text += f"- {personalized_item}\n"
-            
-            report_text += "\nRelevant DfE Standards:\n"
-            for standard in solution["standards"]:
-                report_text += f"- {dfe_standards[standard]['title']}\n"
-            
-            report_text += "\n"
-        
-        # Add standards
-        report_text += "\n## Alignment with DfE Technology Standards\n"
-        
-        report_text += "\n### Digital Leadership and Governance Standards\n"
-        report_text += chr(10).join(['- ' + benefit for benefit in dfe_standards['leadership']['ipad_benefits']])
-        
-        report_text += "\n\n### Digital Accessibility Standards\n"
-        report_text += chr(10).join(['- ' + benefit for benefit in dfe_standards['accessibility']['ipad_benefits']])
-        
-        report_text += "\n\n### Device Standards\n"
-        report_text += chr(10).join(['- ' + benefit for benefit in dfe_standards['devices']['ipad_benefits']])
-        
-        # Add implementation considerations
-        report_text += "\n\n## Implementation Considerations for Your School\n"
-        
-        report_text += "\n### Professional Development\n"
-        if school['pupils'] > 500:
-            report_text += f"For a school of {school['name']}'s size ({school['pupils']} pupils), a phased approach to staff training is recommended. "
-            report_text += "Begin with a core team of digital champions who can then support colleagues. The Apple Teacher "
-            report_text += "professional learning program provides structured support for educators at all levels of technical confidence."
-        else:
-            report_text += f"For a smaller school like {school['name']} ({school['pupils']} pupils), whole-staff training sessions can be effective. "
-            report_text += "The Apple Teacher professional learning program provides structured support for educators at all levels of "
-            report_text += f"technical confidence, with resources specifically designed for {school['phase'].lower()} settings."
+        # Downloads are only rendered once asked for, in the background, and kept with the cached report
+        export_format = st.selectbox("Download format", list(REPORT_EXPORT_FORMATS),
+                                     format_func=lambda name: REPORT_EXPORT_FORMATS[name]["label"], key="export_format")
+        details = REPORT_EXPORT_FORMATS[export_format]
+        data = report["artifacts"].get(export_format)
+        job = st.session_state.get("report_export")
+        if job is not None and job["key"] != (report["key"], export_format):
+            job = None
         
-        report_text += "\n\n### Technical Infrastructure\n"
-        if school['fsm'] > 30:
-            report_text += f"Given {school['name']}'s FSM percentage of {school['fsm']}%, you may be eligible for additional funding or support "
-            report_text += "for infrastructure improvements. A technical audit should be conducted to ensure the Wi-Fi network can support "
-            report_text += "simultaneous connections from all devices. Consider a phased approach to implementation to manage costs effectively."
+        if data is not None:
+            st.download_button(
+                f"Download Report as {details['label']}",
+                data,
+                file_name=f"{school['name']}_iPad_Implementation_Report.{details['extension']}",
+                mime=details["mime"],
+                key="download_report_button"
+            )
+        elif job is not None and not job["future"].done():
+            poll_report_export()
         else:
-            report_text += f"Robust Wi-Fi coverage throughout {school['name']} is essential for effective iPad implementation. A technical audit "
-            report_text += "should be conducted to ensure the network can support simultaneous connections from all devices, particularly "
-            report_text += "in areas where multiple classes may be using devices simultaneously."
-        
-        report_text += "\n\n### Deployment Strategy\n"
-        if "primary" in school['phase'].lower():
-            report_text += f"For {school['name']} as a {school['phase']} school, consider a year-group by year-group rollout starting with "
-            report_text += "upper KS2 classes, followed by lower KS2 and then KS1. This allows for evaluation and refinement of implementation "
-            report_text += "strategies before full-school deployment. Shared iPad deployments can be effective for younger year groups."
-        elif "secondary" in school['phase'].lower():
-            report_text += f"For {school['name']} as a {school['phase']} school, consider a subject-based or year-group rollout starting with "
-            report_text += "departments that align with your improvement priorities. This allows for evaluation and refinement of implementation "
-            report_text += "strategies before full-school deployment. A BYOD (Bring Your Own Device) policy could be considered for older students."
-        else:
-            report_text += f"Consider a phased rollout at {school['name']} starting with specific year groups or departments that align with your "
-            report_text += "improvement priorities. This allows for evaluation and refinement of implementation strategies before full-school deployment."
-        
-        # Add conclusion
-        report_text += "\n\n## Conclusion\n"
-        report_text += f"Implementing 1:1 iPads at {school['name']} would directly address the specific improvement areas identified "
-        report_text += f"in your school's priorities {priority_text}. The recommendations in this report are tailored to your context "
-        report_text += f"as a {school['phase'].lower()} school with {school['pupils']} pupils.\n\n"
-        report_text += "The versatility, reliability, and built-in accessibility features of iPads make them an ideal platform "
-        report_text += "to support teaching and learning across the curriculum, while meeting the DfE's technology standards for "
-        report_text += "leadership, accessibility, and devices.\n\n"
-        report_text += f"By implementing these recommendations, {school['name']} can enhance teaching and learning experiences, "
-        report_text += "support staff in delivering the curriculum effectively, and provide pupils with the digital skills they "
-        report_text += "need for future success."
-        
-        st.download_button(
-            "Download Report as Text",
-            report_text,
-            file_name=f"{school['name']}_iPad_Implementation_Report.txt",
-            mime="text/plain",
-            key="download_report_button"
-        )
+            if job is not None and job["future"].exception() is not None:
+                st.warning(f"Could not prepare the {details['label']} download: {job['future'].exception()}")
+            st.button(f"Prepare {details['label']} Download", key="prepare_export_button",
+                      on_click=prepare_report_export, args=(report, export_format))
 
 # Main application logic
 def main():
@@ -1273,6 +4423,17 @@ def main():
             if st.button("Generate Report", key="nav_report"):
                 st.session_state.current_view = "report"
         
+        stats = website_cache["stats"]
+        st.caption(f"Website cache: {stats['hits']} hits, {stats['misses']} misses, {stats['revalidated']} revalidated, {stats['changed']} changed")
+        if host_health["stats"]["skipped"]:
+            st.caption(f"Unreachable school websites: {host_health['stats']['skipped']} fetches skipped")
+        if website_flights["stats"]["joined"]:
+            st.caption(f"Shared website fetches: {website_flights['stats']['joined']} waited on another session's fetch")
+        stats = report_cache["stats"]
+        if stats["hits"] or stats["misses"]:
+            st.caption(f"Report cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evicted, "
+                       f"{len(report_cache['entries'])} reports in {report_cache['bytes'] / 1024 / 1024:.1f} MB")
+        
         st.markdown("<hr>", unsafe_allow_html=True)
         st.markdown("<h3>About</h3>", unsafe_allow_html=True)
         st.markdown("""
@@ -1298,21 +4459,63 @@ def main():
         if school_data_df.empty:
             st.error("National datasheet CSV file not found or empty. Please ensure the file is uploaded correctly.")
         else:
-            st.text_input("Enter school name, URN, or postcode", key="search_input")
+            live_search = st.session_state.get("live_search", False)
+            if live_search and st_keyup is not None:
+                # Reports keystrokes, debounced in the browser
+                st_keyup("Enter school name, URN, or postcode", key="search_input", debounce=SEARCH_DEBOUNCE_MS, on_change=search_schools)
+            elif live_search:
+                st.text_input("Enter school name, URN, or postcode", key="search_input", on_change=search_schools)
+            else:
+                st.text_input("Enter school name, URN, or postcode", key="search_input")
+            
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                st.radio(
+                    "Search mode",
+                    ["All matches", "Best matches", "Nearby schools"],
+                    key="search_mode",
+                    horizontal=True,
+                    on_change=search_schools if live_search else None,
+                    help=f"Best matches tolerates typos and shows the {RANKED_SEARCH_TOP_K} most relevant schools across name, town and postcode. "
+                         "Nearby schools takes a postcode, \"easting, northing\" or \"latitude, longitude\" and lists the closest open schools."
+                )
+            with col2:
+                st.toggle("Search as you type", key="live_search")
+            
+            if st.session_state.get("search_mode") == "Nearby schools":
+                col1, col2 = st.columns([1, 1])
+                with col1:
+                    st.number_input("Number of schools", min_value=1, max_value=200, value=10, key="nearby_count",
+                                    on_change=search_schools if live_search else None)
+                with col2:
+                    st.number_input("Within radius (km, 0 for nearest only)", min_value=0.0, max_value=100.0, value=0.0, step=1.0,
+                                    key="nearby_radius_km", on_change=search_schools if live_search else None)
             
-            if st.button("Search", key="search_button"):
+            if not live_search and st.button("Search", key="search_button"):
                 search_schools()
             
+            if live_search and st.session_state.search_performed and st.session_state.search_latency_ms is not None:
+                st.caption(f"Searched in {st.session_state.search_latency_ms:.1f} ms")
+            
             # Display search results if search was performed
             if st.session_state.search_performed:
                 results = st.session_state.search_results
                 
                 if len(results) > 0:
-                    st.markdown(f"<p>Found {len(results)} schools matching your search.</p>", unsafe_allow_html=True)
+                    if st.session_state.get("search_mode") == "Best matches":
+                        st.markdown(f"<p>Showing the {len(results)} best matches for your search.</p>", unsafe_allow_html=True)
+                    elif "Distance (km)" in results.columns:
+                        radius_km = st.session_state.search_mode_used[2]
+                        if radius_km > 0:
+                            st.markdown(f"<p>Showing {len(results)} open schools within {radius_km:g} km of {st.session_state.nearby_location}.</p>", unsafe_allow_html=True)
+                        else:
+                            st.markdown(f"<p>Showing the {len(results)} open schools nearest to {st.session_state.nearby_location}.</p>", unsafe_allow_html=True)
+                    else:
+                        st.markdown(f"<p>Found {len(results)} schools matching your search.</p>", unsafe_allow_html=True)
                     
                     try:
                         # Create a DataFrame for display with selected columns
-                        display_columns = ["URN", "EstablishmentName", "Town", "Postcode", "PhaseOfEducation (name)"]
+                        display_columns = ["URN", "EstablishmentName", "Town", "Postcode", "PhaseOfEducation (name)", "Distance (km)"]
                         available_columns = [col for col in display_columns if col in results.columns]
                         
                         results_display = results[available_columns].copy()
@@ -1323,7 +4526,8 @@ def main():
                             "EstablishmentName": "School Name",
                             "Town": "Town",
                             "Postcode": "Postcode",
-                            "PhaseOfEducation (name)": "Phase"
+                            "PhaseOfEducation (name)": "Phase",
+                            "Distance (km)": "Distance (km)"
                         }
                         
                         results_display = results_display.rename(columns={col: column_rename.get(col, col) for col in available_columns})
@@ -1336,7 +4540,7 @@ def main():
                             selected_urn = st.selectbox(
                                 "Select a school to view details",
                                 options=results["URN"].tolist(),
-                                format_func=lambda x: f"{results[results['URN']==x]['EstablishmentName'].values[0]} (URN: {x})"
+                                format_func=format_school_option
                             )
                             
                             if st.button("View School Profile", key="view_profile_button"):
@@ -1360,6 +4564,233 @@ def main():
         # Display report
         display_report(st.session_state.selected_school)
 
+# Function to get the current resident memory of this process in MB (Linux only)
+def get_process_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+# Command to build the typed snapshot and report load time and memory before and after
+def ingest_command(args):
+    if pyarrow is None:
+        print("The snapshot is written with pyarrow, which is not installed (pip install pyarrow).")
+        return 1
+    csv_path = args.csv
+    if not os.path.exists(csv_path):
+        print(f"CSV file not found: {csv_path}")
+        return 1
+    
+    # Before: the full CSV with every GIAS column, as load_school_data used to read it
+    gc.collect()
+    rss_before = get_process_rss_mb()
+    start = time.perf_counter()
+    raw_df = pd.read_csv(csv_path, low_memory=False)
+    csv_seconds = time.perf_counter() - start
+    csv_rss = get_process_rss_mb() - rss_before
+    csv_frame_mb = raw_df.memory_usage(deep=True).sum() / 1e6
+    csv_columns = len(raw_df.columns)
+    del raw_df
+    gc.collect()
+    
+    start = time.perf_counter()
+    df = build_school_snapshot(csv_path)
+    build_seconds = time.perf_counter() - start
+    snapshot_path, meta_path = get_snapshot_paths(csv_path)
+    del df
+    gc.collect()
+    
+    if not snapshot_is_current(csv_path, meta_path):
+        print("Could not write the snapshot (is pyarrow installed and the directory writable?)")
+        return 1
+    
+    # After: the typed snapshot
+    rss_before = get_process_rss_mb()
+    start = time.perf_counter()
+    df = pd.read_parquet(snapshot_path)
+    snapshot_seconds = time.perf_counter() - start
+    snapshot_rss = get_process_rss_mb() - rss_before
+    snapshot_frame_mb = df.memory_usage(deep=True).sum() / 1e6
+    
+    print(f"Snapshot written to {snapshot_path} ({len(df)} rows, built in {build_seconds:.2f}s)")
+    print(f"{'':10}{'columns':>10}{'load (s)':>12}{'frame (MB)':>12}{'RSS (MB)':>12}")
+    print(f"{'CSV':10}{csv_columns:>10}{csv_seconds:>12.3f}{csv_frame_mb:>12.1f}{csv_rss:>12.1f}")
+    print(f"{'Snapshot':10}{len(df.columns):>10}{snapshot_seconds:>12.3f}{snapshot_frame_mb:>12.1f}{snapshot_rss:>12.1f}")
+    return 0
+
+# Function to list the (URN, website) pairs the prefetch should visit
+def get_prefetch_schools(df, limit=None):
+    websites = df["SchoolWebsite"].astype(str)
+    rows = df.loc[websites.str.startswith("http"), ["URN", "SchoolWebsite"]]
+    schools = [(int(urn), url) for urn, url in rows.itertuples(index=False)]
+    return schools[:limit] if limit else schools
+
+# Function to print a one-line prefetch progress report
+def print_prefetch_progress(stats):
+    print(f"  {stats['ok']} ok, {stats['failed']} failed, {stats['skipped']} already done", flush=True)
+
+# Command to prefetch every school website into the store the dashboard reads from
+def prefetch_command(args):
+    global WEBSITE_CRAWL_PAGES
+    WEBSITE_CRAWL_PAGES = args.pages
+    store = open_prefetch_store(args.store)
+    schools = get_prefetch_schools(school_data_df, args.limit)
+    print(f"Prefetching {len(schools)} school websites with {args.workers} workers at up to {args.rate:g} schools/s into {args.store}")
+    
+    if args.archive:
+        print(f"Archiving raw responses to {args.archive}")
+    stats = run_prefetch(schools, store, args.workers, args.rate, retry_failed=args.retry_failed, progress=print_prefetch_progress,
+                         archive=(args.archive, "record") if args.archive else None)
+    fetched = stats["ok"] + stats["failed"]
+    print(f"Done: {stats['ok']} ok, {stats['failed']} failed, {stats['skipped']} skipped in {stats['seconds']:.1f}s "
+          f"({fetched / stats['seconds'] * 60 if stats['seconds'] else 0:.0f} schools/min)")
+    return 0
+
+# Command to run the extractor again over every archived school website, with no network
+def reextract_command(args):
+    global WEBSITE_CRAWL_PAGES
+    WEBSITE_CRAWL_PAGES = args.pages
+    archive = open_website_archive(args.archive, "replay")
+    schools = [(urn, url) for urn, url in get_prefetch_schools(school_data_df) if url in archive["index"]][:args.limit]
+    store = open_prefetch_store(args.store)
+    previous = {urn: read_prefetched_website(store, urn) for urn, _ in schools}
+    print(f"Re-extracting {len(schools)} archived school websites ({len(archive['index'])} responses) with {args.workers} workers into {args.store}")
+    
+    stats = run_prefetch(schools, store, args.workers, 0, progress=print_prefetch_progress, refresh=True, archive=(args.archive, "replay"), schedule=False)
+    changed = [(urn, previous[urn], read_prefetched_website(store, urn)) for urn, _ in schools]
+    changed = [(urn, before, after) for urn, before, after in changed if before != after]
+    print(f"Done: {stats['ok']} ok, {stats['failed']} failed in {stats['seconds']:.1f}s "
+          f"({len(schools) / stats['seconds'] * 60 if stats['seconds'] else 0:.0f} schools/min), {len(changed)} changed since the last extraction")
+    for urn, before, after in changed[:args.show]:
+        print(f"  URN {urn}:")
+        for strategy in (before or {}).get("strategies", []):
+            if strategy not in (after or {}).get("strategies", []):
+                print(f"    - {strategy}")
+        for strategy in (after or {}).get("strategies", []):
+            if strategy not in (before or {}).get("strategies", []):
+                print(f"    + {strategy}")
+    return 0
+
+# Command to refresh the school websites most overdue for a check, within a budget of fetches per hour
+def refresh_command(args):
+    global WEBSITE_CRAWL_PAGES
+    WEBSITE_CRAWL_PAGES = args.pages
+    store = open_prefetch_store(args.store)
+    schools = get_prefetch_schools(school_data_df, args.limit)
+    now = time.time()
+    batch, due = select_refresh_batch(store, schools, now, int(args.budget * args.hours))
+    rate = 0 if args.no_pace else args.budget / 3600
+    print(f"{due} of {len(schools)} schools due, refreshing {len(batch)} (budget {args.budget:g} schools/hour for {args.hours:g}h"
+          f"{', unpaced' if args.no_pace else ''}) with {args.workers} workers")
+    
+    stats = run_prefetch(batch, store, args.workers, rate, progress=print_prefetch_progress, refresh=True, sections=True)
+    checked, extracted = count_section_extractions(store, now)
+    changed = sum(1 for entry in read_refresh_schedule(store).values() if entry[1] is not None and entry[1] >= now)
+    print(f"Done: {stats['ok']} ok, {stats['failed']} failed in {stats['seconds']:.1f}s, {changed} changed, "
+          f"{extracted} of {checked} pages and PDFs extracted (the rest were unchanged)")
+    print_refresh_report(get_refresh_report(store, schools, time.time()))
+    return 0
+
+# Command to report how much of the dataset has website data and how stale it is
+def refresh_status_command(args):
+    store = open_prefetch_store(args.store)
+    print_refresh_report(get_refresh_report(store, get_prefetch_schools(school_data_df), time.time()))
+    return 0
+
+# Command to write a school's report from the command line, with its strategies from the prefetch store
+def report_command(args):
+    school = get_school_details(args.urn)
+    if school is None:
+        print(f"School with URN {args.urn} not found in the dataset.", file=sys.stderr)
+        return 1
+    
+    strategies = []
+    if args.store:
+        prefetched = read_prefetched_website(open_prefetch_store(args.store), args.urn)
+        if prefetched:
+            strategies = prefetched["strategies"]
+            school["ofstedUrl"] = prefetched["ofsted_url"] or school["ofstedUrl"]
+    
+    start = time.perf_counter()
+    model = build_report_model(school, args.ofsted, strategies, args.priority, args.scorer)
+    build_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    report = REPORT_EXPORT_FORMATS[args.format]["render"](model)
+    render_ms = (time.perf_counter() - start) * 1000
+    
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(report.encode("utf-8") if isinstance(report, str) else report)
+    elif isinstance(report, bytes):
+        print(f"The {args.format} format needs --output to write the document to.", file=sys.stderr)
+        return 1
+    else:
+        print(report)
+    print(f"Built the report model in {build_ms:.2f} ms and rendered {args.format} in {render_ms:.2f} ms", file=sys.stderr)
+    return 0
+
+# Command line entry point for running maintenance tasks outside Streamlit
+def run_command_line(argv):
+    parser = argparse.ArgumentParser(description="School iPad Implementation Dashboard tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = subparsers.add_parser("ingest", help="Build the typed snapshot of the national datasheet")
+    ingest_parser.add_argument("csv", nargs="?", default="National datasheeet.csv", help="Path to the national datasheet CSV")
+    ingest_parser.set_defaults(handler=ingest_command)
+    
+    prefetch_parser = subparsers.add_parser("prefetch", help="Fetch every school website ahead of time for the dashboard")
+    prefetch_parser.add_argument("--store", default=PREFETCH_STORE_PATH, help="SQLite file to write results to")
+    prefetch_parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Worker processes")
+    prefetch_parser.add_argument("--rate", type=float, default=5.0, help="Maximum schools started per second across all workers (0 for no limit)")
+    prefetch_parser.add_argument("--pages", type=int, default=WEBSITE_CRAWL_PAGES, help="Linked pages to crawl per school")
+    prefetch_parser.add_argument("--limit", type=int, default=None, help="Only prefetch the first N schools")
+    prefetch_parser.add_argument("--retry-failed", action="store_true", help="Fetch schools that failed last time again")
+    prefetch_parser.add_argument("--archive", default=WEBSITE_ARCHIVE_DIR, help="Directory to archive raw responses to for re-extraction")
+    prefetch_parser.set_defaults(handler=prefetch_command)
+    
+    refresh_parser = subparsers.add_parser("refresh", help="Refresh the most overdue school websites within a fetch budget")
+    refresh_parser.add_argument("--store", default=PREFETCH_STORE_PATH, help="Prefetch store to refresh")
+    refresh_parser.add_argument("--budget", type=float, default=500, help="School websites fetched per hour")
+    refresh_parser.add_argument("--hours", type=float, default=1, help="Hours of budget to use - the run is paced to take this long")
+    refresh_parser.add_argument("--no-pace", action="store_true", help="Fetch the batch as fast as the host limits allow")
+    refresh_parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Worker processes")
+    refresh_parser.add_argument("--pages", type=int, default=WEBSITE_CRAWL_PAGES, help="Linked pages to crawl per school")
+    refresh_parser.add_argument("--limit", type=int, default=None, help="Only consider the first N schools")
+    refresh_parser.set_defaults(handler=refresh_command)
+    
+    refresh_status_parser = subparsers.add_parser("refresh-status", help="Report website data coverage and staleness")
+    refresh_status_parser.add_argument("--store", default=PREFETCH_STORE_PATH, help="Prefetch store to report on")
+    refresh_status_parser.set_defaults(handler=refresh_status_command)
+    
+    reextract_parser = subparsers.add_parser("reextract", help="Run the extractor again over the raw response archive, with no network")
+    reextract_parser.add_argument("--archive", default=WEBSITE_ARCHIVE_DIR or None, required=not WEBSITE_ARCHIVE_DIR, help="Archive directory written by prefetch --archive")
+    reextract_parser.add_argument("--store", default=PREFETCH_STORE_PATH, help="SQLite file to write results to")
+    reextract_parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Worker processes")
+    reextract_parser.add_argument("--pages", type=int, default=WEBSITE_CRAWL_PAGES, help="Linked pages to crawl per school, as when archived")
+    reextract_parser.add_argument("--limit", type=int, default=None, help="Only re-extract the first N archived schools")
+    reextract_parser.add_argument("--show", type=int, default=5, help="Schools whose strategies changed to print")
+    reextract_parser.set_defaults(handler=reextract_command)
+    
+    report_parser = subparsers.add_parser("report", help="Write a school's iPad implementation report without the dashboard")
+    report_parser.add_argument("urn", type=int, help="URN of the school")
+    report_parser.add_argument("--ofsted", action="append", default=[], help="An Ofsted improvement area (repeatable)")
+    report_parser.add_argument("--priority", action="append", default=[], help="An additional school priority (repeatable)")
+    report_parser.add_argument("--store", default=PREFETCH_STORE_PATH, help="Prefetch store to take the school's strategies from ('' for none)")
+    report_parser.add_argument("--scorer", choices=list(SOLUTION_SCORERS), default=SOLUTION_SCORER, help="Recommendation scorer")
+    report_parser.add_argument("--format", choices=list(REPORT_EXPORT_FORMATS), default="markdown", help="Report format")
+    report_parser.add_argument("--output", help="File to write the report to instead of printing it (needed for docx and pdf)")
+    report_parser.set_defaults(handler=report_command)
+    
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
 # Run the app
 if __name__ == "__main__":
-    main()
+    if runtime.exists():
+        main()
+    else:
+        # Started with plain `python` rather than `streamlit run`
+        sys.exit(run_command_line(sys.argv[1:]))
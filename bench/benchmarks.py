@@ -0,0 +1,1652 @@
+# Benchmarks and fixture sites for the School iPad Implementation Dashboard
+# Run from the directory holding the national datasheet, as the dashboard is:
+#   python bench/benchmarks.py <command> [options]
+import argparse
+import concurrent.futures
+import gzip
+import http.server
+import io
+import json
+import os
+import re
+import socket
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import xml.etree.ElementTree
+import zipfile
+import zlib
+import importlib.util
+import numpy as np
+import requests
+
+# Load the dashboard module from its file (its name has a space in it, so it can't simply be imported)
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app_improved 2.py")
+app_spec = importlib.util.spec_from_file_location("app", APP_PATH)
+app = importlib.util.module_from_spec(app_spec)
+sys.modules["app"] = app
+app_spec.loader.exec_module(app)
+
+# Command to check indexed search against the column scan and time both
+def search_benchmark_command(args):
+    df = app.load_school_data()
+    if df.empty:
+        print("No school data available.")
+        return 1
+    
+    start = time.perf_counter()
+    index = app.build_search_index(df)
+    print(f"Index built over {len(df)} schools in {time.perf_counter() - start:.2f}s ({len(index['postings'])} n-grams)")
+    
+    print(f"{'query':20}{'matches':>10}{'scan (ms)':>12}{'index (ms)':>12}  parity")
+    mismatches = 0
+    for query in args.queries:
+        query = query.lower().strip()
+        
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            expected = df[app.search_mask(df, query)]
+        scan_ms = (time.perf_counter() - start) * 1000 / args.repeat
+        
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            results = app.search_school_data(df, index, query)
+        index_ms = (time.perf_counter() - start) * 1000 / args.repeat
+        
+        parity = results.equals(expected)
+        mismatches += not parity
+        print(f"{query[:20]:20}{len(results):>10}{scan_ms:>12.3f}{index_ms:>12.3f}  {'ok' if parity else 'MISMATCH'}")
+    
+    return 1 if mismatches else 0
+
+# Command to time the work a search view rerun does for broad queries, before and after the URN index
+def rerun_benchmark_command(args):
+    df = app.school_data_df
+    if df.empty:
+        print("No school data available.")
+        return 1
+    
+    index = app.school_search_index
+    
+    print(f"{'query':12}{'options':>10}{'scan + mask labels (ms)':>26}{'index + URN labels (ms)':>26}")
+    for query in args.queries:
+        query = query.lower().strip()
+        
+        # Before: column scan, then a boolean mask per selectbox option and for the selected school
+        start = time.perf_counter()
+        results = df[app.search_mask(df, query)]
+        labels = [f"{results[results['URN']==x]['EstablishmentName'].values[0]} (URN: {x})" for x in results["URN"].tolist()]
+        if labels:
+            df[df["URN"] == results["URN"].iloc[0]].iloc[0]
+        before_ms = (time.perf_counter() - start) * 1000
+        
+        # After: posting list intersection, then dictionary lookups
+        start = time.perf_counter()
+        results = app.search_school_data(df, index, query)
+        new_labels = [app.format_school_option(x) for x in results["URN"].tolist()]
+        if new_labels:
+            app.get_school_row(results["URN"].iloc[0])
+        after_ms = (time.perf_counter() - start) * 1000
+        
+        if new_labels != labels:
+            print(f"Labels differ for {query!r}")
+            return 1
+        print(f"{query[:12]:12}{len(results):>10}{before_ms:>26.1f}{after_ms:>26.1f}")
+    
+    return 0
+
+# Command to time the ranked search and show the top matches for each query
+def ranked_search_benchmark_command(args):
+    df = app.school_data_df
+    if df.empty:
+        print("No school data available.")
+        return 1
+    
+    start = time.perf_counter()
+    index = app.build_ranked_search_index(df)
+    print(f"Ranked index built over {len(df)} schools in {time.perf_counter() - start:.2f}s ({len(index['vocabulary'])} words)")
+    
+    for query in args.queries:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            positions = app.ranked_search_positions(index, query, args.top_k)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / args.repeat
+        
+        print(f"\n{query!r}: {len(positions)} results in {elapsed_ms:.2f} ms")
+        for position in positions[:args.show]:
+            school_row = df.iloc[position]
+            print(f"  {school_row['URN']:>8}  {school_row['EstablishmentName']}, {school_row.get('Town', '')}, {school_row.get('Postcode', '')}")
+    
+    return 0
+
+# Command to simulate typing a query and time each keystroke with and without narrowing
+def live_search_benchmark_command(args):
+    df = app.school_data_df
+    if df.empty:
+        print("No school data available.")
+        return 1
+    
+    for typed in args.queries:
+        typed = typed.lower()
+        print(f"\nTyping {typed!r}")
+        print(f"{'query':24}{'matches':>9}{'scan (ms)':>12}{'index (ms)':>12}{'narrowed (ms)':>15}{'ranked (ms)':>13}")
+        
+        previous_query = None
+        previous_positions = None
+        timings = {"scan": [], "index": [], "narrowed": [], "ranked": []}
+        for length in range(1, len(typed) + 1):
+            query = typed[:length].strip()
+            if not query or query == previous_query:
+                continue
+            
+            start = time.perf_counter()
+            expected = np.flatnonzero(app.search_mask(df, query).to_numpy())
+            timings["scan"].append((time.perf_counter() - start) * 1000)
+            
+            start = time.perf_counter()
+            app.search_school_positions(df, app.school_search_index, query)
+            timings["index"].append((time.perf_counter() - start) * 1000)
+            
+            start = time.perf_counter()
+            positions = app.search_school_positions(df, app.school_search_index, query, previous_query, previous_positions)
+            timings["narrowed"].append((time.perf_counter() - start) * 1000)
+            
+            start = time.perf_counter()
+            app.ranked_search_positions(app.school_ranked_search_index, query)
+            timings["ranked"].append((time.perf_counter() - start) * 1000)
+            
+            if not np.array_equal(positions, expected):
+                print(f"Narrowed results differ from the scan for {query!r}")
+                return 1
+            
+            print(f"{query[:24]:24}{len(positions):>9}" + "".join(
+                f"{timings[name][-1]:>{width}.3f}" for name, width in [("scan", 12), ("index", 12), ("narrowed", 15), ("ranked", 13)]
+            ))
+            previous_query = query
+            previous_positions = positions
+        
+        for label, summary in [("median", np.median), ("max", max)]:
+            print(f"{label:24}{'':>9}" + "".join(
+                f"{summary(timings[name]):>{width}.3f}" for name, width in [("scan", 12), ("index", 12), ("narrowed", 15), ("ranked", 13)]
+            ))
+    
+    return 0
+
+# Command to time nearest-school and radius queries and check them against a brute-force search
+def nearby_benchmark_command(args):
+    df = app.school_data_df
+    start = time.perf_counter()
+    index = app.build_geo_index(df)
+    build_seconds = time.perf_counter() - start
+    if not len(index["positions"]):
+        print("No open schools with Easting/Northing coordinates in the dataset.")
+        return 1
+    print(f"Grid built over {len(index['positions'])} open schools in {build_seconds:.2f}s ({len(index['cells'])} cells)")
+    
+    # Query points near real schools, jittered by up to 2 km
+    rng = np.random.default_rng(0)
+    samples = rng.integers(0, len(index["positions"]), args.queries)
+    points = np.column_stack([index["eastings"][samples], index["northings"][samples]]) + rng.uniform(-2000, 2000, (args.queries, 2))
+    
+    for label, run in [
+        (f"{args.k} nearest", lambda e, n: app.nearest_school_positions(index, e, n, args.k)),
+        (f"within {args.radius_km:g} km", lambda e, n: app.schools_within_radius(index, e, n, args.radius_km * 1000))
+    ]:
+        timings = []
+        for easting, northing in points:
+            start = time.perf_counter()
+            positions, distances = run(easting, northing)
+            timings.append((time.perf_counter() - start) * 1e6)
+            
+            all_distances = np.hypot(index["eastings"] - easting, index["northings"] - northing)
+            if label.startswith("within"):
+                expected = np.sort(all_distances[all_distances <= args.radius_km * 1000])
+            else:
+                expected = np.sort(all_distances)[:args.k]
+            if not np.allclose(distances, expected):
+                print(f"{label} disagrees with brute force at {easting:.0f}, {northing:.0f}")
+                return 1
+        
+        print(f"{label:16} median {np.median(timings):8.1f} us   p99 {np.percentile(timings, 99):8.1f} us   max {max(timings):8.1f} us")
+    
+    return 0
+
+# Sample school homepage served by the local fixture server
+FIXTURE_SCHOOL_HOMEPAGE = """<!DOCTYPE html>
+<html>
+<head><title>Oak Park Primary School</title></head>
+<body>
+<nav>
+  <a href="/about">About us</a>
+  <a href="/vision">Our vision and values</a>
+  <a href="/governors">Governors</a>
+  <a href="/ofsted">Ofsted and performance</a>
+  <a href="https://reports.ofsted.gov.uk/provider/21/100000">Latest Ofsted report</a>
+</nav>
+<h1>Welcome to Oak Park Primary School</h1>
+<p>We are a friendly community school at the heart of the village.</p>
+<h2>Our Vision</h2>
+<p>Every child leaves Oak Park as a confident, curious reader who loves learning.</p>
+<p>We aim to provide a broad and balanced curriculum that builds knowledge year on year.</p>
+<h2>School Development Plan Priorities</h2>
+<ul>
+  <li>Improve the teaching of early reading and phonics across EYFS and KS1.</li>
+  <li>Develop the use of assessment to close gaps in pupils' mathematical reasoning.</li>
+  <li>Strengthen provision for pupils with SEND through adaptive teaching.</li>
+</ul>
+<p>Raise attainment in writing, with a focus on spelling, grammar and punctuation.</p>
+<p>Continue to develop staff expertise through a programme of coaching and CPD.</p>
+</body>
+</html>
+"""
+
+# Fixture homepage with little content of its own, so the strategies have to come from linked pages
+FIXTURE_CRAWL_HOMEPAGE = """<!DOCTYPE html>
+<html>
+<body>
+<nav>
+  <a href="/about-us">About us</a>
+  <a href="/vision-and-values">Vision and values</a>
+  <a href="/school-development-plan">School development plan</a>
+  <a href="/strategy-archive">Strategy archive</a>
+  <a href="/ofsted">Ofsted</a>
+  <a href="/governors">Governors</a>
+  <a href="/news">News</a>
+  <a href="/prospectus.pdf">Prospectus</a>
+  <a href="https://example.org/vision">Another school's vision</a>
+</nav>
+<h1>Welcome to Oak Park Primary School</h1>
+<p>Term dates and letters home are in the parents section.</p>
+</body>
+</html>
+"""
+
+# Linked pages of the crawl fixture site
+FIXTURE_CRAWL_PAGES = {
+    "/about-us": """<html><body><h1>About us</h1>
+        <p>Oak Park is a two-form entry primary school serving a diverse community.</p></body></html>""",
+    "/vision-and-values": """<html><body><h1>Our Vision</h1>
+        <p>Every child leaves Oak Park as a confident, curious reader who loves learning.</p>
+        <p>We aim to provide a broad and balanced curriculum that builds knowledge year on year.</p></body></html>""",
+    "/school-development-plan": """<html><body><h2>School Development Plan Priorities</h2>
+        <ul>
+          <li>Improve the teaching of early reading and phonics across EYFS and KS1.</li>
+          <li>Develop the use of assessment to close gaps in pupils' mathematical reasoning.</li>
+          <li>Strengthen provision for pupils with SEND through adaptive teaching.</li>
+        </ul></body></html>""",
+    "/ofsted": """<html><body><h1>Ofsted</h1>
+        <p><a href="https://reports.ofsted.gov.uk/provider/21/100000">Read our latest Ofsted inspection report</a></p></body></html>""",
+    "/governors": """<html><body><h1>Governors</h1>
+        <p>The governing body meets twice a term to review the school improvement plan.</p></body></html>""",
+    "/news": """<html><body><h1>News</h1><p>Sports day has moved to Friday.</p></body></html>"""
+}
+
+# Function to build a large CMS-style homepage (big head, mega menu, many sections) for parser benchmarks
+def build_fixture_cms_homepage(sections):
+    headings = ["Latest news", "Our Vision", "Upcoming events", "School Improvement Plan", "Our Values", "Curriculum"]
+    head = "".join(f"<script>window.cms_block_{i} = {json.dumps({'id': i, 'payload': 'x' * 2000})};</script>" for i in range(30))
+    menu = "".join(
+        f"<li><a href='/section-{i}'>Section {i}</a><ul>" + "".join(f"<li><a href='/section-{i}/page-{j}'>Page {j}</a></li>" for j in range(10)) + "</ul></li>"
+        for i in range(40)
+    )
+    body = "".join(
+        f"<section><div class='row'><div class='col'><h2>{headings[i % len(headings)]}</h2>"
+        f"<p>Paragraph {i}: we are improving reading, writing and mathematics for every pupil in our school community.</p>"
+        f"<div>Block {i} describing how staff development supports the wider school strategy.</div>"
+        f"<ul><li>Item {i}: a short list entry about pupils' learning and wellbeing this year.</li></ul></div></div></section>"
+        for i in range(sections)
+    )
+    return (f"<!DOCTYPE html><html><head><title>Oak Park Primary School</title><style>{'.menu a { color: #1a4d8f; } ' * 2000}</style>{head}</head>"
+            f"<body><nav><ul>{menu}</ul></nav><main>{body}</main>"
+            f"<footer><p><a href='/key-information/ofsted'>Ofsted inspection report</a></p></footer></body></html>")
+
+# Priorities used by the large homepage fixtures
+FIXTURE_PRIORITY_TEXTS = [
+    "Improve the teaching of early reading and phonics across EYFS and KS1.",
+    "Develop the use of assessment to close gaps in pupils' mathematical reasoning.",
+    "Strengthen provision for pupils with SEND through adaptive teaching.",
+    "Raise attainment in writing, with a focus on spelling, grammar and punctuation.",
+    "Continue to develop staff expertise through a programme of coaching and CPD.",
+    "Widen pupils' experience of music, sport and the arts beyond the classroom."
+]
+
+# Function to build a school homepage padded to roughly the given size with inline images,
+# with its priorities and Ofsted link either before or after the padding
+def build_fixture_large_homepage(padding_bytes, content_first):
+    content = ("<nav><a href='https://reports.ofsted.gov.uk/provider/21/100000'>Our latest Ofsted report</a></nav>"
+               "<section><h2>School Development Plan Priorities</h2>" + "".join(f"<p>{text}</p>" for text in FIXTURE_PRIORITY_TEXTS) + "</section>")
+    news_item = ("<div class='news'><h3>Sports day photos</h3><p>Photos from the reception class sports day.</p>"
+                 f"<img src='data:image/png;base64,{'iVBORw0KGgo' * 900}'></div>")
+    padding = news_item * (padding_bytes // len(news_item) + 1)
+    main = content + padding if content_first else padding + content
+    return f"<!DOCTYPE html><html><head><title>Oak Park Primary School</title></head><body><main>{main}</main></body></html>"
+
+# Pairs of strategy texts that say the same thing, as they turn up on school websites
+FIXTURE_NEAR_DUPLICATE_STRATEGIES = [
+    ("Improve the teaching of early reading and phonics across EYFS and KS1.",
+     "Improve the teaching of early reading & phonics across EYFS/KS1"),
+    ("Develop the use of assessment to close gaps in pupils' mathematical reasoning.",
+     "Develop the use of assessment to close gaps in pupils’ mathematical reasoning"),
+    ("Strengthen provision for pupils with SEND through adaptive teaching.",
+     "STRENGTHEN PROVISION FOR PUPILS WITH SEND THROUGH ADAPTIVE TEACHING"),
+    ("Raise attainment in writing, with a focus on spelling, grammar and punctuation.",
+     "Priority 4: raise attainment in writing - with a focus on spelling, grammar and punctuation"),
+    ("Continue to develop staff expertise through a programme of coaching and CPD.",
+     "Continue to develop staff expertise through a programme of coaching and CPD."),
+    ("Our vision is for every child to leave us as a confident, curious reader.",
+     "Our vision is for every child to leave us as a confident and curious reader.")
+]
+
+# Paragraphs for a page with no strategy headings, where the keyword scan finds boilerplate before the priorities
+FIXTURE_KEYWORD_SCAN_PARAGRAPHS = [
+    "Please read our privacy notice to see how we plan to use the personal data you share with the school office.",
+    "The development of the new car park will mean the side gate is closed for drop-off until the end of term.",
+    "Our vision is for every child to leave us as a confident, curious reader who loves learning.",
+    "Lunch menus are planned three weeks ahead and follow our values of healthy eating and sharing.",
+    "School Development Plan priority 1: improve the teaching of early reading and phonics across EYFS and KS1.",
+    "School Development Plan priority 2: develop assessment to close gaps in pupils' mathematical reasoning.",
+    "Our strategic priorities for improvement this year focus on provision for pupils with SEND.",
+    "Improvement priority: raise attainment in writing, with a focus on spelling, grammar and punctuation."
+]
+
+# Priorities as inspectors and schools word them, with the solution each one calls for
+FIXTURE_LABELLED_PRIORITIES = [
+    ("Teachers should present information clearly so pupils understand new ideas", "information_presentation"),
+    ("Pupils do not read widely and often enough", "reading_instruction"),
+    ("Ensure pupils with special needs are supported to access the curriculum", "send_support"),
+    ("Improve pupils' fluency with times tables and number facts", "mathematics"),
+    ("Raise standards in spelling and handwriting", "writing"),
+    ("Make sure pupils behave well in lessons and around school", "behavior_management"),
+    ("Strengthen communication with families about their child's learning at home", "parental_engagement"),
+    ("Develop children's communication and language in the Reception class", "early_years"),
+    ("Improve pupils' understanding of how to stay safe online", "digital_technology"),
+    ("Increase the number of practical experiments in science lessons", "science"),
+    ("Help teachers give pupils useful feedback on their work", "assessment"),
+    ("Provide training for support staff", "staff_development"),
+    ("Leaders should ensure that the curriculum in foundation subjects is sequenced so that pupils build knowledge over time.", "curriculum_implementation"),
+    ("Pupils are not always attentive in lessons and lose interest", "engagement"),
+    ("Make better use of video lessons when pupils have to learn from home", "remote_learning")
+]
+
+# Fixture school site whose strategy pages are only listed in its sitemaps, not linked from the homepage
+FIXTURE_SITEMAP_HOMEPAGE = """<!DOCTYPE html>
+<html>
+<body>
+<nav>
+  <a href="/about-us">About us</a>
+  <a href="/governors">Governors</a>
+  <a href="/news">News</a>
+  <a href="/term-dates">Term dates</a>
+  <a href="/contact">Contact</a>
+</nav>
+<h1>Welcome to Oak Park Primary School</h1>
+<p>Term dates and letters home are in the parents section.</p>
+</body>
+</html>
+"""
+
+# Pages of the sitemap fixture site
+FIXTURE_SITEMAP_PAGES = {
+    "/about-us": "<html><body><h1>About us</h1><p>Oak Park is a two-form entry primary school.</p></body></html>",
+    "/governors": "<html><body><h1>Governors</h1><p>The governing body meets twice a term.</p></body></html>",
+    "/news": "<html><body><h1>News</h1><p>Sports day has moved to Friday.</p></body></html>",
+    "/term-dates": "<html><body><h1>Term dates</h1><p>Autumn term starts on 4 September.</p></body></html>",
+    "/contact": "<html><body><h1>Contact</h1><p>Call the school office on 0113 496 0000.</p></body></html>",
+    "/about-us/our-vision-and-values": """<html><body><h1>Our Vision</h1>
+        <p>Every child leaves Oak Park as a confident, curious reader who loves learning.</p></body></html>""",
+    "/key-information/school-development-plan": """<html><body><h2>School Development Plan Priorities</h2>
+        <p>Improve the teaching of early reading and phonics across EYFS and KS1.</p>
+        <p>Develop the use of assessment to close gaps in pupils' mathematical reasoning.</p>
+        <p>Strengthen provision for pupils with SEND through adaptive teaching.</p></body></html>""",
+    "/key-information/ofsted-reports": """<html><body><h1>Ofsted</h1>
+        <p><a href="https://reports.ofsted.gov.uk/provider/21/100000">Read our latest Ofsted inspection report</a></p></body></html>""",
+    "/key-information/policies": "<html><body><h1>Policies</h1><p>Our policies are reviewed every year.</p></body></html>",
+    "/private/strategy-draft": """<html><body><h2>Draft strategy</h2>
+        <p>This draft strategy is for governors only and must not be published.</p></body></html>"""
+}
+
+# Function to build a sitemap (or a sitemap index) listing paths on a fixture site
+def build_fixture_sitemap(root, paths, index=False):
+    namespace = "http://www.sitemaps.org/schemas/sitemap/0.9"
+    tag = "sitemap" if index else "url"
+    entries = "".join(f"<{tag}><loc>{root}{path}</loc></{tag}>" for path in paths)
+    return f'<?xml version="1.0" encoding="UTF-8"?><{"sitemapindex" if index else "urlset"} xmlns="{namespace}">{entries}</{"sitemapindex" if index else "urlset"}>'
+
+# Fixture school development plan, as the lines of text on each page of a PDF
+FIXTURE_PDF_DEVELOPMENT_PLAN = [
+    ["Oak Park Primary School", "School Development Plan 2024-2025", "Approved by the governing body, September 2024"],
+    ["Context", "Oak Park is a two-form entry primary school serving 420 pupils.", "Attendance has returned to pre-pandemic levels and",
+     "the school was judged Good at its last inspection."],
+    ["Key Priorities for 2024-25",
+     "1. Improve the teaching of early reading so that every pupil passes the",
+     "phonics screening check by the end of Year 2.",
+     "2. Develop the use of assessment in mathematics to close gaps in",
+     "pupils' reasoning and problem solving.",
+     "3. Strengthen provision for pupils with SEND through adaptive teaching",
+     "and precise targets reviewed each term.",
+     "4. Embed a consistent approach to behaviour and attendance across all",
+     "year groups, led by the pastoral team."],
+    ["Monitoring and evaluation", "Governors will review progress against each priority every term."],
+    ["Budget", "Costs are met from the school's delegated budget and the pupil premium grant."]
+]
+
+# Fixture Ofsted inspection report, as the lines of text on each page of a PDF
+FIXTURE_PDF_OFSTED_REPORT = [
+    ["Inspection of Oak Park Primary School", "Inspection dates: 5 and 6 March 2024", "Overall effectiveness: Good"],
+    ["What does the school need to do to improve?",
+     "- Leaders should ensure that the curriculum in foundation subjects is",
+     "sequenced so that pupils build knowledge over time.",
+     "- Leaders should make sure that assessment in the wider curriculum",
+     "identifies the gaps in what pupils know."]
+]
+
+# Function to build a minimal PDF with Helvetica text, one list of lines per page
+# compress=True deflates the page contents the way most PDF writers do
+def build_fixture_pdf(pages, compress=False):
+    def escape(line):
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        stream = ("BT /F1 10 Tf 12 TL 40 800 Td " + "".join(f"({escape(line)}) Tj T* " for line in lines) + "ET").encode("latin-1")
+        if compress:
+            stream = zlib.compress(stream, 9)
+        objects.append(b"<< /Length %d%s >>\nstream\n" % (len(stream), b" /Filter /FlateDecode" if compress else b"") + stream + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+    
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1) + b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return data
+
+# Function to send a fixture page, answering 304 when the client already has the current version
+def serve_fixture_page(handler, body, etag=None, content_type="text/html; charset=utf-8"):
+    if etag and handler.headers.get("If-None-Match") == etag:
+        handler.send_response(304)
+        handler.send_header("ETag", etag)
+        handler.end_headers()
+        return
+    
+    data = body.encode("utf-8") if isinstance(body, str) else body
+    handler.send_response(200)
+    handler.send_header("Content-Type", content_type)
+    handler.send_header("Content-Length", str(len(data)))
+    if etag:
+        handler.send_header("ETag", etag)
+    handler.end_headers()
+    handler.wfile.write(data)
+
+# Function to start a local HTTP server on a free port; routes maps a path to a function(handler)
+def start_fixture_server(routes):
+    counts = {}
+    
+    class FixtureHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes, which Nagle would delay on kept-alive connections
+        disable_nagle_algorithm = True
+        
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            counts[path] = counts.get(path, 0) + 1
+            route = routes.get(path)
+            if route is None:
+                self.send_error(404)
+                return
+            route(self)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.daemon_threads = True
+    server.request_counts = counts
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+# Command to exercise the persistent website cache against a local fixture site
+def website_cache_benchmark_command(args):
+    
+    server, base_url = start_fixture_server({
+        "/": lambda handler: serve_fixture_page(handler, FIXTURE_SCHOOL_HOMEPAGE, etag='"oak-park-v1"')
+    })
+    url = base_url + "/"
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        app.website_cache = app.open_website_cache(os.path.join(cache_dir, "website_cache.sqlite3"))
+        
+        def timed_scrape():
+            start = time.perf_counter()
+            result = app.scrape_school_website(url)
+            return result, (time.perf_counter() - start) * 1000
+        
+        result, cold_ms = timed_scrape()
+        print(f"Cold fetch:       {cold_ms:8.2f} ms  ({len(result['strategies'])} strategies, Ofsted link {result['ofsted_url']})")
+        
+        warm = [timed_scrape()[1] for _ in range(args.repeat)]
+        print(f"Cached (fresh):   {np.median(warm):8.2f} ms  median of {args.repeat}")
+        
+        # Expire the entry so the next read revalidates with If-None-Match
+        app.website_cache["ttl_seconds"] = 0
+        revalidated = [timed_scrape()[1] for _ in range(args.repeat)]
+        print(f"Revalidated (304):{np.median(revalidated):8.2f} ms  median of {args.repeat}")
+        
+        print(f"Cache counters:   {app.website_cache['stats']}")
+        print(f"Server requests:  {server.request_counts.get('/', 0)}")
+    
+    server.shutdown()
+    return 0
+
+# Command to compare one-off requests with the pooled, retrying session against a local fixture server
+def http_benchmark_command(args):
+    flaky_counter = {"count": 0}
+    
+    def serve_unavailable(handler):
+        handler.send_response(503)
+        handler.send_header("Content-Length", "0")
+        handler.end_headers()
+    
+    def serve_flaky(handler):
+        # Fail two requests out of every three, like an overloaded school CMS
+        flaky_counter["count"] += 1
+        if flaky_counter["count"] % 3:
+            serve_unavailable(handler)
+        else:
+            serve_fixture_page(handler, FIXTURE_SCHOOL_HOMEPAGE)
+    
+    server, base_url = start_fixture_server({
+        "/": lambda handler: serve_fixture_page(handler, FIXTURE_SCHOOL_HOMEPAGE),
+        "/flaky": serve_flaky
+    })
+    session = app.create_http_session(pool_maxsize=args.threads)
+    
+    def fetch_all(get):
+        timings = []
+        lock = threading.Lock()
+        
+        def fetch(_):
+            start = time.perf_counter()
+            get(base_url + "/", timeout=app.HTTP_TIMEOUT)
+            with lock:
+                timings.append((time.perf_counter() - start) * 1000)
+        
+        with concurrent.futures.ThreadPoolExecutor(args.threads) as executor:
+            list(executor.map(fetch, range(args.requests)))
+        return timings
+    
+    print(f"{args.requests} fetches of the same page over {args.threads} threads")
+    print(f"{'':18}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'max (ms)':>10}")
+    for label, get in [("requests.get", requests.get), ("pooled session", session.get)]:
+        timings = fetch_all(get)
+        print(f"{label:18}" + "".join(f"{np.percentile(timings, q):>10.2f}" for q in (50, 95, 99, 100)))
+    
+    # A transient 503 is retried instead of leaving the school with no strategies
+    successes = {}
+    for label, get in [("requests.get", requests.get), ("pooled session", session.get)]:
+        flaky_counter["count"] = 0
+        successes[label] = sum(get(base_url + "/flaky", timeout=app.HTTP_TIMEOUT).status_code == 200 for _ in range(args.flaky))
+    print("Flaky page (2 of 3 requests fail with 503): " + ", ".join(f"{label} {count}/{args.flaky} succeeded" for label, count in successes.items()))
+    
+    server.shutdown()
+    return 0
+
+# Command to crawl a local fixture site and report what the budgeted crawl fetched and found
+def website_crawl_benchmark_command(args):
+    
+    def serve_slow_page(handler):
+        # Far slower than the crawl budget
+        time.sleep(args.slow_seconds)
+        serve_fixture_page(handler, FIXTURE_CRAWL_PAGES["/school-development-plan"])
+    
+    routes = {path: (lambda body: lambda handler: serve_fixture_page(handler, body))(body) for path, body in FIXTURE_CRAWL_PAGES.items()}
+    routes["/"] = lambda handler: serve_fixture_page(handler, FIXTURE_CRAWL_HOMEPAGE)
+    routes["/strategy-archive"] = serve_slow_page
+    server, base_url = start_fixture_server(routes)
+    app.WEBSITE_CRAWL_TIME_BUDGET_SECONDS = args.budget
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for pages in [0, args.pages]:
+            app.website_cache = app.open_website_cache(os.path.join(cache_dir, f"crawl_{pages}.sqlite3"))
+            app.WEBSITE_CRAWL_PAGES = pages
+            server.request_counts.clear()
+            
+            start = time.perf_counter()
+            result = app.scrape_school_website(base_url + "/")
+            elapsed = time.perf_counter() - start
+            
+            label = "Homepage only" if pages == 0 else f"Crawl ({pages} pages, {args.budget:g}s budget)"
+            print(f"{label}: {elapsed:.2f}s, requested {sorted(server.request_counts)}")
+            print(f"  Ofsted link: {result['ofsted_url']}")
+            for strategy in result["strategies"]:
+                print(f"  - {strategy}")
+    
+    server.shutdown()
+    return 0
+
+# Command to simulate days of scheduled refreshes against fixture schools whose plans change at different rates,
+# comparing the fetches made and how up to date the results stay with refreshing every school every night
+def refresh_benchmark_command(args):
+    rng = np.random.default_rng(args.seed)
+    versions = [0] * args.schools
+    change_rates = np.where(rng.random(args.schools) < args.volatile_share, args.volatile_rate, args.stable_rate)
+    # A few schools get most of the views
+    views = (1000 / (rng.permutation(args.schools) + 1)).astype(int)
+    
+    def school_routes(i):
+        def homepage(handler):
+            serve_fixture_page(handler, f'<html><body><h1>School {i}</h1><a href="/s{i}/school-development-plan">School development plan</a></body></html>')
+        
+        def plan(handler):
+            serve_fixture_page(handler, f"""<html><body><h2>School Development Plan Priorities</h2>
+                <p>Revision {versions[i]}: improve the teaching of early reading across the school.</p>
+                <p>Revision {versions[i]}: develop the use of assessment in mathematics in every year group.</p></body></html>""")
+        return {f"/s{i}/": homepage, f"/s{i}/school-development-plan": plan}
+    
+    servers = []
+    for host in range(args.hosts):
+        routes = {}
+        for i in range(host, args.schools, args.hosts):
+            routes.update(school_routes(i))
+        servers.append(start_fixture_server(routes))
+    schools = [(100000 + i, f"{servers[i % args.hosts][1]}/s{i}/") for i in range(args.schools)]
+    
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = app.open_prefetch_store(os.path.join(store_dir, "refresh.sqlite3"))
+        for i, count in enumerate(views):
+            app.record_school_view(store, 100000 + i, int(count))
+        
+        now = time.time()
+        batch, _ = app.select_refresh_batch(store, schools, now, len(schools))
+        app.run_prefetch(batch, store, args.workers, 0, refresh=True, sections=True, now=now)
+        print(f"{args.schools} schools, {args.volatile_share:.0%} changing {args.volatile_rate:.0%} of days and the rest {args.stable_rate:.0%}, "
+              f"budget {args.budget} schools/day")
+        print(f"{'Day':>3} {'Due':>5} {'Fetched':>8} {'Changed':>8} {'Detected':>9} {'Extracted':>10} {'Out of date':>12} {'Views fresh':>12} {'Age p50/p90 (days)':>19}")
+        
+        fetched = 0
+        for day in range(1, args.days + 1):
+            now += 86400
+            changed = rng.random(args.schools) < change_rates
+            for i in np.flatnonzero(changed):
+                versions[i] += 1
+            
+            started = time.time()
+            batch, due = app.select_refresh_batch(store, schools, now, args.budget)
+            app.run_prefetch(batch, store, args.workers, 0, refresh=True, sections=True, now=now)
+            fetched += len(batch)
+            checked, extracted = app.count_section_extractions(store, started)
+            detected = sum(1 for entry in app.read_refresh_schedule(store).values() if entry[1] == now)
+            
+            out_of_date = []
+            for i in range(args.schools):
+                result = app.read_prefetched_website(store, 100000 + i)
+                if not result or not result["strategies"] or not result["strategies"][0].startswith(f"Revision {versions[i]}:"):
+                    out_of_date.append(i)
+            fresh_views = 1 - views[out_of_date].sum() / views.sum()
+            report = app.get_refresh_report(store, schools, now)
+            print(f"{day:>3} {due:>5} {len(batch):>8} {int(changed.sum()):>8} {detected:>9} {f'{extracted}/{checked}':>10} "
+                  f"{len(out_of_date):>12} {fresh_views:>12.1%} {report['age_p50'] / 86400:>9.1f} / {report['age_p90'] / 86400:.1f}")
+        
+        print(f"Scheduled: {fetched} school fetches over {args.days} days; refreshing every school nightly would take {args.schools * args.days}")
+        app.print_refresh_report(report)
+    
+    for server, _ in servers:
+        server.shutdown()
+    return 0
+
+# Command to start the same school's scrape from many sessions at once, with and without sharing the fetch,
+# counting the requests that reach the school's server
+def single_flight_benchmark_command(args):
+    
+    def homepage(handler):
+        time.sleep(args.latency_ms / 1000)
+        serve_fixture_page(handler, FIXTURE_SCHOOL_HOMEPAGE)
+    
+    server, base_url = start_fixture_server({"/": homepage})
+    # Links to one site written in different ways still share a fetch
+    urls = [base_url + "/", base_url, base_url + "/#welcome"]
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for label, start in [("One fetch per session", lambda url: app.website_fetch_executor.submit(app.scrape_school_website, url)),
+                             ("Shared fetch", app.join_website_fetch)]:
+            app.website_cache = app.open_website_cache(os.path.join(cache_dir, f"{len(label)}.sqlite3"))
+            server.request_counts.clear()
+            barrier = threading.Barrier(args.sessions)
+            
+            def session(i):
+                barrier.wait()
+                return start(urls[i % len(urls)]).result()
+            
+            begin = time.perf_counter()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=args.sessions) as sessions:
+                results = list(sessions.map(session, range(args.sessions)))
+            elapsed = time.perf_counter() - begin
+            print(f"{label}: {args.sessions} sessions, {server.request_counts.get('/', 0)} homepage request(s), "
+                  f"{len({json.dumps(result, sort_keys=True) for result in results})} distinct result(s), {elapsed:.2f}s")
+        
+        # One session giving up mustn't cancel the fetch the others are waiting on
+        app.website_cache = app.open_website_cache(os.path.join(cache_dir, "cancel.sqlite3"))
+        server.request_counts.clear()
+        futures = [app.join_website_fetch(base_url + "/") for _ in range(3)]
+        app.leave_website_fetch(futures[0])
+        results = [future.result() for future in futures[1:]]
+        print(f"One of 3 sessions stopped waiting: {server.request_counts.get('/', 0)} homepage request(s), "
+              f"the other 2 got {[len(result['strategies']) for result in results]} strategies")
+    
+    print(f"Fetches started {app.website_flights['stats']['started']}, joined {app.website_flights['stats']['joined']}")
+    server.shutdown()
+    return 0
+
+# Command to measure prefetch throughput against a local stub site
+def prefetch_benchmark_command(args):
+    app.WEBSITE_CRAWL_PAGES = args.pages
+    
+    def serve_with_latency(body):
+        def serve(handler):
+            # Real school sites take a while to answer
+            time.sleep(args.latency_ms / 1000)
+            serve_fixture_page(handler, body)
+        return serve
+    
+    routes = {path: serve_with_latency(body) for path, body in FIXTURE_CRAWL_PAGES.items()}
+    routes["/"] = serve_with_latency(FIXTURE_CRAWL_HOMEPAGE)
+    # Each stub server is a separate host, so the per-host rate limit applies as it would across real schools
+    servers = [start_fixture_server(routes) for _ in range(args.hosts)]
+    schools = [(100000 + i, f"{servers[i % len(servers)][1]}/?school={i}") for i in range(args.schools)]
+    print(f"{args.schools} schools on {args.hosts} hosts, {args.latency_ms:g} ms per page, {args.pages} crawled pages each, rate limit {args.rate:g} schools/s")
+    
+    with tempfile.TemporaryDirectory() as store_dir:
+        for workers in args.workers:
+            store = app.open_prefetch_store(os.path.join(store_dir, f"prefetch_{workers}.sqlite3"))
+            stats = app.run_prefetch(schools, store, workers, args.rate)
+            print(f"{workers:>3} workers: {stats['ok']} ok, {stats['failed']} failed in {stats['seconds']:6.2f}s "
+                  f"= {len(schools) / stats['seconds'] * 60:8.0f} schools/min")
+        
+        # Stop part way through, then resume from the checkpoint
+        store = app.open_prefetch_store(os.path.join(store_dir, "prefetch_resume.sqlite3"))
+        workers = max(args.workers)
+        first = app.run_prefetch(schools[:len(schools) // 2], store, workers, args.rate)
+        resumed = app.run_prefetch(schools, store, workers, args.rate)
+        print(f"Resume: first run fetched {first['ok']}, second run skipped {resumed['skipped']} and fetched {resumed['ok']}")
+        
+        sample = app.read_prefetched_website(store, schools[0][0])
+        print(f"Stored for URN {schools[0][0]}: {len(sample['strategies'])} strategies, Ofsted link {sample['ofsted_url']}")
+    
+    for server, _ in servers:
+        server.shutdown()
+    return 0
+
+# Command to record fixture schools into an archive, then re-extract them from it with the servers gone,
+# checking the replay matches the live scrape and timing both
+def archive_benchmark_command(args):
+    app.WEBSITE_CRAWL_PAGES = args.pages
+    
+    def serve_with_latency(body):
+        def serve(handler):
+            time.sleep(args.latency_ms / 1000)
+            serve_fixture_page(handler, body)
+        return serve
+    
+    routes = {path: serve_with_latency(body) for path, body in FIXTURE_CRAWL_PAGES.items()}
+    routes["/"] = serve_with_latency(FIXTURE_CRAWL_HOMEPAGE)
+    servers = [start_fixture_server(routes) for _ in range(args.hosts)]
+    schools = [(100000 + i, f"{servers[i % len(servers)][1]}/?school={i}") for i in range(args.schools)]
+    print(f"{args.schools} schools on {args.hosts} hosts, {args.latency_ms:g} ms per page, {args.workers} workers")
+    
+    with tempfile.TemporaryDirectory() as work_dir:
+        archive_dir = os.path.join(work_dir, "archive")
+        
+        def run(name, mode):
+            store = app.open_prefetch_store(os.path.join(work_dir, f"{name}.sqlite3"))
+            stats = app.run_prefetch(schools, store, args.workers, 0, refresh=True, archive=(archive_dir, mode))
+            results = {urn: app.read_prefetched_website(store, urn) for urn, _ in schools}
+            print(f"{name:<28} {stats['ok']:>4} ok {stats['failed']:>4} failed in {stats['seconds']:6.2f}s = {len(schools) / stats['seconds'] * 60:8.0f} schools/min")
+            return results
+        
+        live = run("Live, recording", "record")
+        for server, _ in servers:
+            server.shutdown()
+            server.server_close()
+        
+        stored = sum(os.path.getsize(os.path.join(archive_dir, name)) for name in os.listdir(archive_dir) if name.endswith(".warc.gz"))
+        raw = 0
+        for name in os.listdir(archive_dir):
+            if name.endswith(".warc.gz"):
+                with open(os.path.join(archive_dir, name), "rb") as f:
+                    raw += len(gzip.decompress(f.read()))
+        records = len(app.open_website_archive(archive_dir, "replay")["index"])
+        print(f"Archive: {records} distinct URLs, {raw:,} bytes of records stored in {stored:,} bytes ({raw / max(stored, 1):.1f}x)")
+        
+        replayed = run("Replay (servers stopped)", "replay")
+        again = run("Replay again", "replay")
+        print(f"Replay matches live for {sum(replayed[urn] == live[urn] for urn in live)}/{len(live)} schools, "
+              f"replays match each other for {sum(again[urn] == replayed[urn] for urn in live)}/{len(live)}")
+        
+        # Trying out an extraction rule is a replay away
+        app.STRATEGY_KEYWORDS = [keyword for keyword in app.STRATEGY_KEYWORDS if keyword != "vision"]
+        changed = run("Replay, keyword dropped", "replay")
+        print(f"Dropping the keyword 'vision' changed {sum(changed[urn] != replayed[urn] for urn in live)}/{len(live)} schools")
+    return 0
+
+# Function to read saved HTML pages from files and directories
+def read_html_corpus(paths):
+    pages = {}
+    for path in paths:
+        files = [os.path.join(path, name) for name in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+        for file in files:
+            if file.lower().endswith((".html", ".htm")):
+                with open(file, encoding="utf-8", errors="replace") as handle:
+                    pages[os.path.basename(file)] = handle.read()
+    return pages
+
+# Command to compare the lxml fast parse path with html.parser for speed and identical output
+def parse_benchmark_command(args):
+    if app.lxml is None:
+        print("lxml is not installed - nothing to compare html.parser with")
+        return 1
+    
+    if args.paths:
+        pages = read_html_corpus(args.paths)
+    else:
+        pages = {"fixture-homepage": FIXTURE_SCHOOL_HOMEPAGE, "crawl-homepage": FIXTURE_CRAWL_HOMEPAGE}
+        pages.update({f"crawl{path}": body for path, body in FIXTURE_CRAWL_PAGES.items()})
+        pages.update({f"cms-{sections}-sections": build_fixture_cms_homepage(sections) for sections in (20, 150, 400)})
+    
+    def time_parse(html, parser):
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = app.extract_school_website_data(html, "https://www.example.sch.uk/", parser)
+            timings.append((time.perf_counter() - start) * 1000)
+        return result, min(timings)
+    
+    print(f"{'Page':28}{'KB':>8}{'html.parser ms':>16}{'lxml ms':>10}{'speedup':>9}  output")
+    totals = {"html.parser": 0.0, "lxml": 0.0}
+    differences = []
+    for name, html in pages.items():
+        expected, slow_ms = time_parse(html, "html.parser")
+        actual, fast_ms = time_parse(html, "lxml")
+        totals["html.parser"] += slow_ms
+        totals["lxml"] += fast_ms
+        if actual != expected:
+            differences.append((name, expected, actual))
+        print(f"{name[:27]:28}{len(html) / 1024:>8.1f}{slow_ms:>16.2f}{fast_ms:>10.2f}{slow_ms / fast_ms:>8.1f}x  {'same' if actual == expected else 'DIFFERENT'}")
+    
+    print(f"Mean per page: html.parser {totals['html.parser'] / len(pages):.2f} ms, lxml {totals['lxml'] / len(pages):.2f} ms")
+    for name, expected, actual in differences:
+        print(f"\n{name}:\n  html.parser: {expected}\n  lxml:        {actual}")
+    print(f"{len(pages) - len(differences)}/{len(pages)} pages give identical output")
+    return 1 if differences else 0
+
+# Command to compare buffered and streamed homepage fetches on oversized and slow local fixtures
+def stream_benchmark_command(args):
+    app.WEBSITE_HOMEPAGE_MAX_BYTES = args.max_bytes
+    pages = {
+        "/early": build_fixture_large_homepage(args.page_mb * 1024 * 1024, content_first=True),
+        "/late": build_fixture_large_homepage(args.page_mb * 1024 * 1024, content_first=False),
+        "/drip": build_fixture_large_homepage(args.drip_kb * 1024, content_first=False)
+    }
+    # Encoded up front so the server's copy doesn't count towards the client's memory
+    bodies = {path: html.encode("utf-8") for path, html in pages.items()}
+    
+    def serve_page(handler):
+        body = bodies[handler.path]
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/html; charset=utf-8")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        # Trickle the drip page out over --drip-seconds
+        piece = max(1, len(body) // int(args.drip_seconds * 10)) if handler.path == "/drip" else len(body)
+        try:
+            for offset in range(0, len(body), piece):
+                handler.wfile.write(body[offset:offset + piece])
+                handler.wfile.flush()
+                if handler.path == "/drip":
+                    time.sleep(0.1)
+        except (BrokenPipeError, ConnectionResetError):
+            # The streaming reader hung up once it had enough
+            pass
+    
+    server, base_url = start_fixture_server({path: serve_page for path in pages})
+    
+    def fetch_buffered(url):
+        response = app.http_session.get(url, timeout=app.HTTP_TIMEOUT)
+        return len(response.content), app.extract_school_website_data(response.text, url), False
+    
+    def fetch_streamed(url):
+        with app.http_session.get(url, timeout=app.HTTP_TIMEOUT, stream=True) as response:
+            html, result, complete = app.read_school_homepage(response, url, time.monotonic() + args.budget)
+        return len(html.encode("utf-8")), result, complete
+    
+    print(f"Pages of {args.page_mb} MB, byte cap {args.max_bytes / 1024 / 1024:g} MB, drip page {args.drip_kb} KB over {args.drip_seconds:g}s, budget {args.budget:g}s")
+    print(f"{'Page':8}{'Mode':10}{'Seconds':>9}{'Read (KB)':>11}{'Peak (MB)':>11}{'Strategies':>12}  Ofsted report  Stopped early  Same as full page")
+    for path, html in pages.items():
+        url = base_url + path
+        expected = app.extract_school_website_data(html, url)
+        for label, fetch in [("buffered", fetch_buffered), ("streamed", fetch_streamed)]:
+            tracemalloc.start()
+            start = time.perf_counter()
+            read_bytes, result, complete = fetch(url)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            has_report = bool(result["ofsted_url"] and 'reports.ofsted.gov.uk' in result["ofsted_url"])
+            print(f"{path:8}{label:10}{elapsed:>9.2f}{read_bytes / 1024:>11.0f}{peak / 1024 / 1024:>11.1f}{len(result['strategies']):>12}  "
+                  f"{str(has_report):14} {str(complete):14} {result == expected}")
+    
+    server.shutdown()
+    return 0
+
+# Command to compare the shingle dedup with the pairwise substring check it replaced
+def dedup_benchmark_command(args):
+    # The dedup step as it was: every text against every kept text
+    def legacy_clean_strategies(strategies):
+        cleaned_strategies = []
+        for text in strategies:
+            cleaned = re.sub(r'\s+', ' ', text).strip()
+            if len(cleaned) < 30:
+                continue
+            if not any(cleaned in existing or existing in cleaned for existing in cleaned_strategies):
+                cleaned_strategies.append(cleaned)
+        return cleaned_strategies
+    
+    print("Near-duplicates (1 = the second text is dropped):")
+    print(f"{'pairwise':>9}{'shingles':>10}  second text")
+    for first, second in FIXTURE_NEAR_DUPLICATE_STRATEGIES:
+        legacy = len(legacy_clean_strategies([first, second])) == 1
+        shingles = len(app.clean_strategies([first, second])) == 1
+        print(f"{legacy:>9d}{shingles:>10d}  {second}")
+    
+    # Thousands of distinct paragraphs sharing a school's everyday vocabulary, with every tenth one repeated
+    rng = np.random.default_rng(0)
+    words = ("pupils school reading writing mathematics teaching learning staff curriculum improve develop "
+             "children parents support provision attainment progress phonics assessment year term governors").split()
+    print(f"\n{'Paragraphs':>10}{'pairwise ms':>13}{'shingles ms':>13}{'kept (pairwise / shingles)':>30}")
+    for count in args.paragraphs:
+        texts = [" ".join(rng.choice(words, size=rng.integers(12, 40))) + "." for _ in range(count)]
+        texts += [text.replace(" ", ", ", 1) for text in texts[::10]]
+        
+        start = time.perf_counter()
+        legacy = legacy_clean_strategies(texts)
+        legacy_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        kept = app.clean_strategies(texts)
+        shingle_ms = (time.perf_counter() - start) * 1000
+        print(f"{len(texts):>10}{legacy_ms:>13.1f}{shingle_ms:>13.1f}{f'{len(legacy)} / {len(kept)}':>30}")
+    
+    html = "<html><body>" + "".join(f"<p>{text}</p>" for text in FIXTURE_KEYWORD_SCAN_PARAGRAPHS) + "</body></html>"
+    print("\nKeyword scan, page order:")
+    for text in legacy_clean_strategies(FIXTURE_KEYWORD_SCAN_PARAGRAPHS)[:5]:
+        print(f"  - {text}")
+    print("Keyword scan, ranked:")
+    for text in app.extract_school_website_data(html, "https://www.example.sch.uk/")["strategies"]:
+        print(f"  - {text}")
+    return 0
+
+# Command to show dead and hanging school sites failing fast after the first attempts, and the per-host rate limit
+def dead_host_benchmark_command(args):
+    app.HTTP_TIMEOUT = (app.HTTP_TIMEOUT[0], args.read_timeout)
+    
+    # A server that accepts connections and never answers, like an overloaded school CMS
+    hanging = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    hanging.bind(("127.0.0.1", 0))
+    hanging.listen(256)
+    sites = {
+        "Hanging server": f"http://127.0.0.1:{hanging.getsockname()[1]}/",
+        "Unknown domain": "http://oak-park-primary.invalid/"
+    }
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        app.website_cache = app.open_website_cache(os.path.join(cache_dir, "website_cache.sqlite3"))
+        for label, url in sites.items():
+            # What every profile open paid before: the request with its retries, straight through the session
+            start = time.perf_counter()
+            try:
+                app.http_session.get(url, timeout=app.HTTP_TIMEOUT)
+            except requests.exceptions.RequestException:
+                pass
+            unguarded = time.perf_counter() - start
+            
+            timings = []
+            for _ in range(args.opens):
+                start = time.perf_counter()
+                app.scrape_school_website(url)
+                timings.append(time.perf_counter() - start)
+            print(f"{label}: without the host guard {unguarded:.2f}s per open; with it "
+                  + ", ".join(f"{elapsed * 1000:.1f} ms" if elapsed < 1 else f"{elapsed:.2f}s" for elapsed in timings))
+    print(f"Host counters: {app.host_health['stats']}")
+    
+    # A live host still gets its burst at once, then HOST_RATE_PER_SECOND
+    server, base_url = start_fixture_server({"/": lambda handler: serve_fixture_page(handler, FIXTURE_SCHOOL_HOMEPAGE)})
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        app.guarded_get(app.http_session, base_url + "/", timeout=app.HTTP_TIMEOUT).close()
+    elapsed = time.perf_counter() - start
+    expected = max(0, args.requests - app.HOST_RATE_BURST) / app.HOST_RATE_PER_SECOND
+    print(f"{args.requests} requests to one live host: {elapsed:.2f}s (burst of {app.HOST_RATE_BURST}, then {app.HOST_RATE_PER_SECOND:g}/s = {expected:.2f}s)")
+    
+    server.shutdown()
+    hanging.close()
+    return 0
+
+# Command to compare guessing pages from homepage links with sitemap discovery on a local fixture site
+def sitemap_benchmark_command(args):
+    request_log = []
+    
+    def logged(route):
+        def serve(handler):
+            request_log.append((time.monotonic(), handler.path))
+            route(handler)
+        return serve
+    
+    def root_of(handler):
+        return f"http://{handler.headers['Host']}"
+    
+    news_paths = [f"/news/2024/sports-day-photos-{i}" for i in range(args.news)]
+    routes = {path: (lambda body: lambda handler: serve_fixture_page(handler, body))(body) for path, body in FIXTURE_SITEMAP_PAGES.items()}
+    routes["/"] = lambda handler: serve_fixture_page(handler, FIXTURE_SITEMAP_HOMEPAGE)
+    routes["/robots.txt"] = lambda handler: serve_fixture_page(handler, (
+        f"User-agent: *\nDisallow: /private/\nCrawl-delay: {args.crawl_delay:g}\nSitemap: {root_of(handler)}/sitemap_index.xml\n"
+    ), content_type="text/plain")
+    routes["/sitemap_index.xml"] = lambda handler: serve_fixture_page(handler, build_fixture_sitemap(
+        root_of(handler), ["/sitemaps/pages.xml", "/sitemaps/news.xml.gz", "/sitemaps/more-index.xml"], index=True), content_type="application/xml")
+    routes["/sitemaps/more-index.xml"] = lambda handler: serve_fixture_page(handler, build_fixture_sitemap(
+        root_of(handler), ["/sitemaps/key-information.xml"], index=True), content_type="application/xml")
+    routes["/sitemaps/pages.xml"] = lambda handler: serve_fixture_page(handler, build_fixture_sitemap(
+        root_of(handler), ["/about-us", "/about-us/our-vision-and-values", "/contact", "/term-dates", "/private/strategy-draft"]), content_type="application/xml")
+    routes["/sitemaps/news.xml.gz"] = lambda handler: serve_fixture_page(handler, gzip.compress(build_fixture_sitemap(
+        root_of(handler), news_paths).encode("utf-8")), content_type="application/gzip")
+    routes["/sitemaps/key-information.xml"] = lambda handler: serve_fixture_page(handler, build_fixture_sitemap(
+        root_of(handler), ["/key-information/school-development-plan", "/key-information/ofsted-reports", "/key-information/policies"]), content_type="application/xml")
+    server, base_url = start_fixture_server({path: logged(route) for path, route in routes.items()})
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for label, use_sitemaps in [("Homepage links only", False), ("Sitemaps (first visit)", True), ("Sitemaps (cached)", True)]:
+            app.website_cache = app.open_website_cache(os.path.join(cache_dir, f"{len(request_log)}.sqlite3"))
+            app.WEBSITE_USE_SITEMAPS = use_sitemaps
+            request_log.clear()
+            
+            start = time.perf_counter()
+            result = app.scrape_school_website(base_url + "/")
+            elapsed = time.perf_counter() - start
+            
+            files = [path for _, path in request_log if path == "/robots.txt" or path.startswith("/sitemap")]
+            pages = [path for _, path in request_log if path not in files and path != "/"]
+            page_times = [at for at, path in request_log if path in pages]
+            gaps = np.diff(sorted(page_times)) if len(page_times) > 1 else []
+            print(f"{label}: {elapsed:.2f}s, {len(files)} robots/sitemap requests, {len(pages)} pages fetched"
+                  + (f", smallest gap between pages {min(gaps):.2f}s" if len(gaps) else ""))
+            print(f"  Pages: {', '.join(pages) or '-'}")
+            print(f"  Ofsted link: {result['ofsted_url']}")
+            for strategy in result["strategies"]:
+                print(f"  - {strategy}")
+            if any(path.startswith("/private/") for path in pages):
+                print("  ERROR: fetched a page disallowed by robots.txt")
+    
+    server.shutdown()
+    return 0
+
+# Command to check PDF extraction against local sample PDFs: strategies found, the per-document limits,
+# and how long a thread standing in for the Streamlit server is held up while a PDF is parsed
+def pdf_benchmark_command(args):
+    if app.pypdf is None:
+        print("pypdf is not installed, so PDFs are skipped (pip install pypdf)")
+        return 1
+    
+    sent = {}
+    
+    def stream_without_length(handler, data):
+        # No Content-Length, so only the streaming cap can stop the download
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/pdf")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.close_connection = True
+        sent[handler.path] = 0
+        try:
+            for start in range(0, len(data), 65536):
+                handler.wfile.write(data[start:start + 65536])
+                sent[handler.path] += len(data[start:start + 65536])
+        except OSError:
+            pass
+    
+    heavy_page = [f"Line {i}: leaders will improve the curriculum, assessment and outcomes in every subject." for i in range(args.heavy_lines)]
+    documents = {
+        "/docs/sdp-2024-25.pdf": build_fixture_pdf(FIXTURE_PDF_DEVELOPMENT_PLAN, compress=True),
+        "/docs/ofsted-report.pdf": build_fixture_pdf(FIXTURE_PDF_OFSTED_REPORT),
+        "/docs/lunch-menu.pdf": build_fixture_pdf([["Monday: pasta bake", "Tuesday: roast dinner"]]),
+        "/docs/governors-minutes-archive.pdf": build_fixture_pdf([[f"Minutes of meeting {page}", "Governors noted the head teacher's report."] for page in range(300)]),
+        "/docs/improvement-plan-scanned.pdf": build_fixture_pdf(FIXTURE_PDF_DEVELOPMENT_PLAN) + os.urandom(2 * app.WEBSITE_PDF_MAX_BYTES),
+        "/docs/strategy-heavy.pdf": build_fixture_pdf([heavy_page] * 40, compress=True),
+        "/docs/vision-bomb.pdf": build_fixture_pdf([["Our vision"] + ["(x) Tj " * 40] * args.bomb_lines], compress=True),
+        "/docs/corrupt.pdf": b"%PDF-1.4\n" + os.urandom(4096)
+    }
+    def serve_document(handler, data):
+        try:
+            serve_fixture_page(handler, data, content_type="application/pdf")
+        except OSError:
+            # The scraper hung up on a PDF over the size cap
+            pass
+    
+    routes = {path: (lambda data: lambda handler: serve_document(handler, data))(data) for path, data in documents.items()}
+    routes["/docs/improvement-plan-unsized.pdf"] = lambda handler: stream_without_length(handler, documents["/docs/improvement-plan-scanned.pdf"])
+    routes["/"] = lambda handler: serve_fixture_page(handler, """<html><body><h1>Welcome to Oak Park Primary School</h1>
+        <p><a href="/docs/sdp-2024-25.pdf">School Development Plan 2024-25</a></p>
+        <p><a href="/docs/ofsted-report.pdf">Latest Ofsted inspection report</a></p>
+        <p><a href="/docs/lunch-menu.pdf">Lunch menu</a></p></body></html>""")
+    server, base_url = start_fixture_server(routes)
+    
+    # Start a worker process first, so its start-up isn't timed against the first document
+    start = time.perf_counter()
+    app.extract_pdf_pages(documents["/docs/lunch-menu.pdf"], time.monotonic() + 60)
+    print(f"PDF worker process started in {time.perf_counter() - start:.2f}s")
+    
+    # The school's strategies are only in the development plan PDF
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for label, documents_per_school in [("Without PDFs", 0), ("With PDFs", args.documents)]:
+            app.website_cache = app.open_website_cache(os.path.join(cache_dir, f"{documents_per_school}.sqlite3"))
+            app.WEBSITE_PDF_DOCUMENTS = documents_per_school
+            server.request_counts.clear()
+            start = time.perf_counter()
+            result = app.scrape_school_website(base_url + "/")
+            print(f"{label}: {time.perf_counter() - start:.2f}s, requested {sorted(server.request_counts)}")
+            for strategy in result["strategies"]:
+                print(f"  - {strategy}")
+    
+    # Per-document limits
+    app.WEBSITE_PDF_TIMEOUT_SECONDS = args.timeout
+    app.WEBSITE_PDF_MEMORY_MB = args.memory_mb
+    print(f"\nLimits: {app.WEBSITE_PDF_MAX_BYTES / 1024 / 1024:.0f} MB, {app.WEBSITE_PDF_MAX_PAGES} pages, {app.WEBSITE_PDF_TIMEOUT_SECONDS:g}s, {app.WEBSITE_PDF_MEMORY_MB} MB of memory per document")
+    print(f"{'Document':<38} {'Size':>10} {'Seconds':>8} {'Pages':>6} {'Strategies':>10}  Outcome")
+    for path in [*documents, "/docs/improvement-plan-unsized.pdf"]:
+        before = dict(app.pdf_workers["stats"])
+        # Every sample is on one host, so clear its rate limit to time the document alone
+        app.host_health["hosts"].clear()
+        # and let a worker replacing one stopped by the last document finish starting up
+        for worker in list(app.pdf_workers["idle"]):
+            app.wait_for_pdf_worker(worker, time.monotonic() + 60)
+        start = time.perf_counter()
+        result = app.read_school_pdf(base_url + path)
+        elapsed = time.perf_counter() - start
+        stats = {name: app.pdf_workers["stats"][name] - before[name] for name in before}
+        outcome = ", ".join(f"{name} {count}" for name, count in stats.items() if count and name not in ("documents", "pages")) or "ok"
+        size = len(documents.get(path, documents["/docs/improvement-plan-scanned.pdf"]))
+        print(f"{path:<38} {size:>10,} {elapsed:>8.2f} {stats['pages']:>6} {len(result['strategies']) if result else 0:>10}  {outcome}")
+    print(f"The PDF sent without a Content-Length was dropped after {sent.get('/docs/improvement-plan-unsized.pdf', 0):,} bytes had been sent")
+    
+    # A heartbeat thread stands in for the Streamlit server - the longest gap between its ticks is how long it was held up
+    data = documents["/docs/strategy-heavy.pdf"]
+    for label, extract in [("Parsed in this process", lambda: list(app.read_pdf_pages(data, app.WEBSITE_PDF_MAX_PAGES))),
+                           ("Parsed in a worker process", lambda: app.extract_pdf_pages(data, time.monotonic() + 60))]:
+        ticks = []
+        stop = threading.Event()
+        
+        def heartbeat():
+            while not stop.is_set():
+                ticks.append(time.perf_counter())
+                time.sleep(0.005)
+        
+        thread = threading.Thread(target=heartbeat)
+        thread.start()
+        start = time.perf_counter()
+        pages = extract()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        thread.join()
+        print(f"{label}: {len(pages)} pages in {elapsed:.2f}s, longest heartbeat gap {max(np.diff(ticks)) * 1000:.0f} ms")
+    
+    server.shutdown()
+    return 0
+
+# Command to check the compiled keyword matcher scores exactly as the per-keyword scan did, and time both
+def keyword_benchmark_command(args):
+    # The scoring as it was: every solution, every area, every keyword
+    def legacy_scores(improvement_areas, school_context):
+        school_phase = school_context.get("phase", "").lower()
+        school_type = school_context.get("type", "").lower()
+        solution_scores = {}
+        for key, solution in app.improvement_solutions.items():
+            score = 0
+            for area in improvement_areas:
+                area_lower = area.lower()
+                for keyword in solution["keywords"]:
+                    if keyword.lower() in area_lower:
+                        score += 3
+                title_words = solution["title"].lower().split()
+                for word in title_words:
+                    if len(word) > 3 and word in area_lower:
+                        score += 1
+            if "early_years" in key and ("early" in school_phase or "nursery" in school_phase or "foundation" in school_phase):
+                score += 5
+            if "reading_instruction" in key and ("primary" in school_phase or "elementary" in school_phase):
+                score += 3
+            if "curriculum_implementation" in key and ("secondary" in school_phase or "high" in school_phase or "college" in school_type):
+                score += 3
+            solution_scores[key] = score
+        return solution_scores
+    
+    # The relevant areas as the report and the download each found them, looking the solution up by title
+    def legacy_relevant_areas(improvement_areas, solution):
+        relevant_areas = []
+        for area in improvement_areas:
+            area_lower = area.lower()
+            if any(keyword.lower() in area_lower for keyword in app.improvement_solutions[next(k for k, v in app.improvement_solutions.items() if v["title"] == solution["title"])]["keywords"]):
+                relevant_areas.append(area)
+        return relevant_areas
+    
+    # Areas written the way schools write them: keyword phrases in varied case among everyday words,
+    # with overlapping keywords ("SEN" inside "SEND"), hyphens and title words
+    rng = np.random.default_rng(0)
+    phrases = [keyword for solution in app.improvement_solutions.values() for keyword in solution["keywords"]]
+    phrases += [word for solution in app.improvement_solutions.values() for word in solution["title"].split()]
+    phrases += ["SENDCo", "e-safety", "re-engagement", "mathematical", "readiness", "Years"]
+    filler = ("pupils school improve develop ensure children leaders consistently across all the of and to in "
+              "that with so their further high quality strong secure well younger older").split()
+    
+    def make_area():
+        words = list(rng.choice(filler, size=rng.integers(6, 20)))
+        for _ in range(rng.integers(0, 4)):
+            phrase = str(rng.choice(phrases))
+            phrase = [phrase, phrase.lower(), phrase.upper(), phrase.capitalize()][rng.integers(0, 4)]
+            words.insert(int(rng.integers(0, len(words) + 1)), phrase)
+        return " ".join(words).capitalize() + "."
+    
+    contexts = [{"phase": phase, "type": school_type}
+                for phase in ["Primary", "Secondary", "Nursery", "All-through", "16 plus", "Not applicable"]
+                for school_type in ["Academy converter", "Further education college"]]
+    
+    print(f"Keyword matcher: {app.keyword_matcher['words']} words from {len(app.improvement_solutions)} solutions")
+    mismatches = 0
+    for trial in range(args.trials):
+        areas = [make_area() for _ in range(int(rng.integers(1, 40)))]
+        context = contexts[trial % len(contexts)]
+        scores, relevant = app.score_improvement_solutions(areas, context)
+        if scores != legacy_scores(areas, context):
+            mismatches += 1
+            continue
+        for solution in app.match_improvement_areas_to_solutions(areas, context):
+            if solution["areas"] != legacy_relevant_areas(areas, solution):
+                mismatches += 1
+                break
+    print(f"Parity over {args.trials} area sets: mismatches {mismatches}")
+    
+    print(f"\n{'Areas':>8}{'scan ms':>10}{'matcher ms':>12}{'speed-up':>10}")
+    for count in args.areas:
+        areas = [make_area() for _ in range(count)]
+        context = contexts[0]
+        # A report scored the areas once, then rescanned them for each solution shown in the page and in the download
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            scores = legacy_scores(areas, context)
+            for key, score in sorted(scores.items(), key=lambda x: x[1], reverse=True)[:5]:
+                for _ in range(2):
+                    legacy_relevant_areas(areas, app.improvement_solutions[key])
+        scan_ms = (time.perf_counter() - start) * 1000 / args.repeat
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            app.match_improvement_areas_to_solutions(areas, context)
+        matcher_ms = (time.perf_counter() - start) * 1000 / args.repeat
+        print(f"{count:>8}{scan_ms:>10.2f}{matcher_ms:>12.2f}{scan_ms / matcher_ms:>9.1f}x")
+    
+    example = "Improve the teaching of phonics and early reading so SEND pupils read fluently"
+    print(f"\nMatches in: {example}")
+    for key, found in app.find_keyword_matches(example).items():
+        print(f"  {key:26}" + ", ".join(f"{word}@{position}+{points}" for position, word, points, is_keyword in found))
+    return 0
+
+# Command to compare the keyword and TF-IDF scorers on labelled priorities and time them for one school and in bulk
+def scorer_benchmark_command(args):
+    school_context = {"phase": "Not applicable", "type": ""}
+    print(f"TF-IDF weights: {len(app.solution_vectors['vocabulary'])} words x {len(app.solution_vectors['keys'])} solutions")
+    print(f"\n{'expected':27}{'keywords':34}{'tfidf':34}priority")
+    hits = {"keywords": 0, "tfidf": 0}
+    for area, expected in FIXTURE_LABELLED_PRIORITIES:
+        tops = {}
+        for scorer in hits:
+            top = app.match_improvement_areas_to_solutions([area], school_context, scorer)[0]
+            tops[scorer] = f"{top['key']} ({top['relevance']})"
+            hits[scorer] += top["key"] == expected
+        print(f"{expected:27}{tops['keywords']:34}{tops['tfidf']:34}{area[:50]}")
+    print(f"Top recommendation as expected: keywords {hits['keywords']}/{len(FIXTURE_LABELLED_PRIORITIES)}, "
+          f"tfidf {hits['tfidf']}/{len(FIXTURE_LABELLED_PRIORITIES)}")
+    
+    # Schools with a handful of priorities each, drawn from the fixtures
+    rng = np.random.default_rng(0)
+    texts = [area for area, expected in FIXTURE_LABELLED_PRIORITIES] + FIXTURE_PRIORITY_TEXTS
+    phases = ["Primary", "Secondary", "Nursery", "All-through", "16 plus"]
+    schools = [([texts[i] for i in rng.choice(len(texts), size=rng.integers(3, 12), replace=False)],
+                {"phase": phases[school % len(phases)], "type": "Academy converter"}) for school in range(max(args.schools))]
+    
+    improvement_areas, school_context = schools[0]
+    print(f"\nOne school, {len(improvement_areas)} areas:")
+    for scorer, score in (("keywords", app.score_improvement_solutions), ("tfidf", app.score_improvement_solutions_tfidf)):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            score(improvement_areas, school_context)
+        print(f"  {scorer:10}{(time.perf_counter() - start) / args.repeat * 1e6:>8.0f} us")
+    
+    print(f"\n{'Schools':>8}{'keywords ms':>13}{'tfidf batch ms':>16}{'us per school':>15}")
+    for count in args.schools:
+        start = time.perf_counter()
+        for improvement_areas, school_context in schools[:count]:
+            app.score_improvement_solutions(improvement_areas, school_context)
+        keyword_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        app.score_solution_vectors(schools[:count])
+        vector_ms = (time.perf_counter() - start) * 1000
+        print(f"{count:>8}{keyword_ms:>13.1f}{vector_ms:>16.1f}{vector_ms * 1000 / count:>15.1f}")
+    return 0
+
+# Command to measure report reruns with and without the report cache, its memory bound, hit rate and invalidation
+def report_cache_benchmark_command(args):
+    rng = np.random.default_rng(0)
+    texts = [area for area, expected in FIXTURE_LABELLED_PRIORITIES] + FIXTURE_PRIORITY_TEXTS
+    urns = app.school_data_df["URN"].head(args.schools).tolist()
+    if not urns:
+        print("No school data available. Please ensure the National datasheet CSV is properly loaded.", file=sys.stderr)
+        return 1
+    reports = [(app.get_school_details(urn), [texts[i] for i in rng.choice(len(texts), size=rng.integers(2, 8), replace=False)]) for urn in urns]
+    
+    # A rerun of the report view: building the model every time, against a cache lookup
+    school, areas = reports[0]
+    cache = app.create_report_cache(args.max_mb * 1024 * 1024)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        app.build_report_model(school, areas, [], [])
+    build_us = (time.perf_counter() - start) / args.repeat * 1e6
+    app.get_cached_report(school, areas, [], [], cache=cache)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        app.get_cached_report(school, areas, [], [], cache=cache)
+    hit_us = (time.perf_counter() - start) / args.repeat * 1e6
+    print(f"Report rerun: {build_us:.0f} us building the model, {hit_us:.1f} us from the cache")
+    
+    # Every school's report once, with the cache bounded well below what they need
+    cache = app.create_report_cache(args.max_mb * 1024 * 1024)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for school, areas in reports:
+        app.get_cached_report(school, areas, [], [], cache=cache)
+    measured = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"\n{len(reports)} reports into {args.max_mb} MB: {len(cache['entries'])} kept, {cache['stats']['evictions']} evicted, "
+          f"{cache['bytes'] / 1024 / 1024:.2f} MB counted, {measured / 1024 / 1024:.2f} MB measured")
+    
+    # Sessions opening schools the way people do: a few schools far more often than the rest
+    cache = app.create_report_cache(args.max_mb * 1024 * 1024)
+    weights = 1 / np.arange(1, len(reports) + 1)
+    start = time.perf_counter()
+    for index in rng.choice(len(reports), size=args.requests, p=weights / weights.sum()):
+        school, areas = reports[index]
+        app.get_cached_report(school, areas, [], [], cache=cache)
+    elapsed = time.perf_counter() - start
+    stats = cache["stats"]
+    print(f"{args.requests} report views over {len(reports)} schools: {stats['hits']} hits, {stats['misses']} misses "
+          f"({stats['hits'] / args.requests:.0%}), {stats['evictions']} evicted, {elapsed / args.requests * 1e6:.0f} us per view")
+    
+    # Editing a solution changes the knowledge base version, so the next lookup rebuilds with the new text
+    school, areas = reports[0]
+    before = app.render_report_markdown(app.get_cached_report(school, areas, [], [], cache=cache)["model"])
+    key = app.match_improvement_areas_to_solutions(areas, school)[0]["key"]
+    edited = json.loads(json.dumps(app.improvement_solutions))
+    edited[key]["solutions"][0] = "Edited solution text for the invalidation check"
+    app.improvement_solutions = edited
+    app.knowledge_base_version = app.get_knowledge_base_version(app.improvement_solutions, app.dfe_standards)
+    app.keyword_matcher = app.build_keyword_matcher(app.improvement_solutions)
+    app.solution_vectors = app.build_solution_vectors(app.improvement_solutions)
+    after = app.render_report_markdown(app.get_cached_report(school, areas, [], [], cache=cache)["model"])
+    print(f"After editing {key}: {stats['invalidations']} invalidation, {len(cache['entries'])} report(s) cached, "
+          f"new text in the report: {'Edited solution text' in after and 'Edited solution text' not in before}")
+    return 0
+
+# Function to check a rendered download is a well-formed document of its format, returning a short description
+def check_report_export(export_format, data, school_name):
+    if export_format == "pdf":
+        if app.pypdf is None:
+            return "not checked (pypdf is not installed)"
+        reader = app.pypdf.PdfReader(io.BytesIO(data))
+        found = school_name in reader.pages[0].extract_text()
+        return f"{len(reader.pages)} pages, school name {'found' if found else 'MISSING'} on page 1"
+    if export_format == "docx":
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            document = xml.etree.ElementTree.fromstring(archive.read("word/document.xml"))
+        paragraphs = document.findall(".//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}p")
+        return f"{len(paragraphs)} paragraphs, XML parses"
+    text = data.decode("utf-8")
+    if export_format == "html":
+        return f"{text.count('<li>')} list items, markup escaped: {'&lt;' in text and '<KS2>' not in text}"
+    return f"{text.count(chr(10)) + 1} lines"
+
+# Command to time and check every download format, and measure other sessions' reruns while long PDFs render
+def export_benchmark_command(args):
+    urns = app.school_data_df["URN"].head(2).tolist()
+    if len(urns) < 2:
+        print("No school data available. Please ensure the National datasheet CSV is properly loaded.", file=sys.stderr)
+        return 1
+    school, other_school = app.get_school_details(urns[0]), app.get_school_details(urns[1])
+    texts = [area for area, expected in FIXTURE_LABELLED_PRIORITIES] + FIXTURE_PRIORITY_TEXTS
+    areas = texts[:6] + ["Reading & writing <KS2> outcomes"]
+    heavy_areas = [f"{texts[i % len(texts)]} ({i + 1})" for i in range(args.areas)] + areas[-1:]
+    app.report_cache = app.create_report_cache()
+    
+    # Every format for a typical report and for one with a long list of priorities
+    for name, priorities in (("Typical", areas), ("Long", heavy_areas)):
+        model = app.get_cached_report(school, [], [], priorities)["model"]
+        print(f"{name} report ({len(priorities)} priorities):")
+        for export_format, details in app.REPORT_EXPORT_FORMATS.items():
+            start = time.perf_counter()
+            data = details["render"](model)
+            elapsed = (time.perf_counter() - start) * 1000
+            data = data.encode("utf-8") if isinstance(data, str) else data
+            print(f"  {details['label']:<9}{elapsed:8.1f} ms {len(data) / 1024:8.1f} KB  {check_report_export(export_format, data, school['name'])}")
+    
+    # Another session building its report while long PDFs render, in a thread each and through the PDF worker processes
+    def measure_reruns(render):
+        latencies = []
+        stop = threading.Event()
+        def rerun():
+            # Timed from waking up, as a rerun arriving mid-render first has to wait its turn for the interpreter
+            while not stop.is_set():
+                start = time.perf_counter()
+                time.sleep(0.001)
+                app.build_report_model(other_school, [], [], areas)
+                latencies.append(time.perf_counter() - start - 0.001)
+        watcher = threading.Thread(target=rerun)
+        watcher.start()
+        start = time.perf_counter()
+        render()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        watcher.join()
+        latencies = np.array(latencies) * 1000
+        return (f"builds p50 {np.percentile(latencies, 50):.2f} ms, p99 {np.percentile(latencies, 99):.2f} ms, "
+                f"max {latencies.max():.2f} ms, {len(latencies) / elapsed:.0f} builds/s over {elapsed:.2f} s")
+    
+    reports = [app.get_cached_report(school, [], [], heavy_areas + [f"Variant {i}"]) for i in range(args.exports)]
+    # The workers are started first, as they are once the dashboard has read or exported a PDF
+    for _ in range(args.exports):
+        worker = app.start_pdf_worker()
+        app.wait_for_pdf_worker(worker, time.monotonic() + 60)
+        app.pdf_workers["idle"].append(worker)
+    print(f"\nAnother session's report builds while {args.exports} long PDFs render:")
+    print(f"  Idle:             {measure_reruns(lambda: time.sleep(0.5))}")
+    def render_in_threads():
+        threads = [threading.Thread(target=app.render_report_pdf, args=(report["model"],)) for report in reports]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    print(f"  In threads:       {measure_reruns(render_in_threads)}")
+    def render_in_exports():
+        jobs = [app.start_report_export(report, "pdf") for report in reports]
+        concurrent.futures.wait([job["future"] for job in jobs])
+    print(f"  Worker processes: {measure_reruns(render_in_exports)}")
+    
+    # Sessions asking for the same download at once share one render, and later ones get the stored copy
+    report = app.get_cached_report(school, [], [], heavy_areas + ["Shared"])
+    before = dict(app.report_exports["stats"])
+    jobs = [app.start_report_export(report, "pdf") for _ in range(args.sessions)]
+    jobs[0]["future"].result()
+    stats = app.report_exports["stats"]
+    print(f"\n{args.sessions} sessions asking for one PDF: {stats['started'] - before['started']} render(s), "
+          f"{stats['joined'] - before['joined']} joined, same job for all: {all(job is jobs[0] for job in jobs)}, "
+          f"later request cached: {app.start_report_export(report, 'pdf') is None}, "
+          f"{len(report['artifacts']['pdf']) / 1024:.0f} KB counted in the report cache ({app.report_cache['bytes'] / 1024 / 1024:.2f} MB)")
+    return 0
+
+# Command line entry point for running maintenance tasks outside Streamlit
+def run_command_line(argv):
+    parser = argparse.ArgumentParser(description="School iPad Implementation Dashboard benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    search_parser = subparsers.add_parser("search-benchmark", help="Compare indexed search with the column scan")
+    search_parser.add_argument("queries", nargs="*", default=[
+        "school", "primary", "academy", "st mary", "oak", "a", "sw1", "1000", "100007", "church of england", "zzz", "st. m"
+    ], help="Queries to run")
+    search_parser.add_argument("--repeat", type=int, default=5, help="Runs per query when timing")
+    search_parser.set_defaults(handler=search_benchmark_command)
+    
+    rerun_parser = subparsers.add_parser("rerun-benchmark", help="Time search view reruns for broad queries")
+    rerun_parser.add_argument("queries", nargs="*", default=["primary", "school", "academy", "a"], help="Queries to run")
+    rerun_parser.set_defaults(handler=rerun_benchmark_command)
+    
+    ranked_parser = subparsers.add_parser("ranked-search-benchmark", help="Time the ranked search and show its top matches")
+    ranked_parser.add_argument("queries", nargs="*", default=["st marys", "academy", "primary school", "oak park leeds", "trinty", "sb9 2jj"], help="Queries to run")
+    ranked_parser.add_argument("--top-k", type=int, default=app.RANKED_SEARCH_TOP_K, help="Number of results to rank")
+    ranked_parser.add_argument("--show", type=int, default=5, help="Number of results to print per query")
+    ranked_parser.add_argument("--repeat", type=int, default=5, help="Runs per query when timing")
+    ranked_parser.set_defaults(handler=ranked_search_benchmark_command)
+    
+    live_parser = subparsers.add_parser("live-search-benchmark", help="Time search-as-you-type keystroke by keystroke")
+    live_parser.add_argument("queries", nargs="*", default=["st marys church", "academy", "sw1a 1aa"], help="Queries to type")
+    live_parser.set_defaults(handler=live_search_benchmark_command)
+    
+    nearby_parser = subparsers.add_parser("nearby-benchmark", help="Time nearest-school and radius queries")
+    nearby_parser.add_argument("--queries", type=int, default=1000, help="Number of random query points")
+    nearby_parser.add_argument("-k", type=int, default=10, help="Number of nearest schools")
+    nearby_parser.add_argument("--radius-km", type=float, default=5.0, help="Radius for the radius query")
+    nearby_parser.set_defaults(handler=nearby_benchmark_command)
+    
+    cache_parser = subparsers.add_parser("website-cache-benchmark", help="Exercise the website cache against a local fixture site")
+    cache_parser.add_argument("--repeat", type=int, default=20, help="Cached and revalidated fetches to time")
+    cache_parser.set_defaults(handler=website_cache_benchmark_command)
+    
+    http_parser = subparsers.add_parser("http-benchmark", help="Compare one-off requests with the pooled session")
+    http_parser.add_argument("--requests", type=int, default=500, help="Number of fetches")
+    http_parser.add_argument("--threads", type=int, default=8, help="Concurrent fetches")
+    http_parser.add_argument("--flaky", type=int, default=10, help="Fetches of the page that fails with 503")
+    http_parser.set_defaults(handler=http_benchmark_command)
+    
+    crawl_parser = subparsers.add_parser("website-crawl-benchmark", help="Crawl a local fixture site within the crawl budget")
+    crawl_parser.add_argument("--pages", type=int, default=app.WEBSITE_CRAWL_PAGES or 5, help="Linked pages to crawl")
+    crawl_parser.add_argument("--budget", type=float, default=app.WEBSITE_CRAWL_TIME_BUDGET_SECONDS, help="Wall-clock budget in seconds")
+    crawl_parser.add_argument("--slow-seconds", type=float, default=20, help="How long the fixture's slow page takes")
+    crawl_parser.set_defaults(handler=website_crawl_benchmark_command)
+    
+    prefetch_benchmark_parser = subparsers.add_parser("prefetch-benchmark", help="Measure prefetch throughput against a local stub site")
+    prefetch_benchmark_parser.add_argument("--schools", type=int, default=200, help="Number of stub schools")
+    prefetch_benchmark_parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8], help="Worker counts to compare")
+    prefetch_benchmark_parser.add_argument("--rate", type=float, default=0, help="Maximum schools started per second (0 for no limit)")
+    prefetch_benchmark_parser.add_argument("--pages", type=int, default=0, help="Linked pages to crawl per school")
+    prefetch_benchmark_parser.add_argument("--hosts", type=int, default=20, help="Number of stub servers the schools are spread over")
+    prefetch_benchmark_parser.add_argument("--latency-ms", type=float, default=50, help="Stub response time per page")
+    prefetch_benchmark_parser.set_defaults(handler=prefetch_benchmark_command)
+    
+    parse_parser = subparsers.add_parser("parse-benchmark", help="Compare the lxml fast parse path with html.parser")
+    parse_parser.add_argument("paths", nargs="*", help="Saved homepages (.html files or directories); defaults to the built-in fixtures")
+    parse_parser.add_argument("--repeat", type=int, default=5, help="Runs per page and parser when timing")
+    parse_parser.set_defaults(handler=parse_benchmark_command)
+    
+    stream_parser = subparsers.add_parser("stream-benchmark", help="Compare buffered and streamed homepage fetches on oversized and slow pages")
+    stream_parser.add_argument("--page-mb", type=int, default=8, help="Size of the oversized fixture pages")
+    stream_parser.add_argument("--max-bytes", type=int, default=app.WEBSITE_HOMEPAGE_MAX_BYTES, help="Homepage byte cap")
+    stream_parser.add_argument("--drip-kb", type=int, default=256, help="Size of the slowly served page")
+    stream_parser.add_argument("--drip-seconds", type=float, default=10, help="How long the slow page takes to arrive")
+    stream_parser.add_argument("--budget", type=float, default=app.WEBSITE_CRAWL_TIME_BUDGET_SECONDS, help="Wall-clock budget for a streamed fetch")
+    stream_parser.set_defaults(handler=stream_benchmark_command)
+    
+    dedup_parser = subparsers.add_parser("dedup-benchmark", help="Compare the shingle dedup of strategies with the pairwise check")
+    dedup_parser.add_argument("--paragraphs", type=int, nargs="+", default=[500, 1000, 2000, 5000], help="Paragraph counts to time")
+    dedup_parser.set_defaults(handler=dedup_benchmark_command)
+    
+    dead_host_parser = subparsers.add_parser("dead-host-benchmark", help="Show dead and hanging school sites failing fast")
+    dead_host_parser.add_argument("--opens", type=int, default=5, help="Profile opens per site")
+    dead_host_parser.add_argument("--read-timeout", type=float, default=app.HTTP_TIMEOUT[1], help="Read timeout in seconds")
+    dead_host_parser.add_argument("--requests", type=int, default=12, help="Requests to the live host for the rate limit check")
+    dead_host_parser.set_defaults(handler=dead_host_benchmark_command)
+    
+    sitemap_parser = subparsers.add_parser("sitemap-benchmark", help="Compare homepage links with sitemap discovery on a local fixture site")
+    sitemap_parser.add_argument("--news", type=int, default=500, help="News pages listed in the gzipped sitemap")
+    sitemap_parser.add_argument("--crawl-delay", type=float, default=0.2, help="Crawl-delay in the fixture's robots.txt")
+    sitemap_parser.set_defaults(handler=sitemap_benchmark_command)
+    
+    pdf_parser = subparsers.add_parser("pdf-benchmark", help="Check PDF extraction and its limits against local sample PDFs")
+    pdf_parser.add_argument("--documents", type=int, default=app.WEBSITE_PDF_DOCUMENTS, help="PDF links read per school")
+    pdf_parser.add_argument("--timeout", type=float, default=3.0, help="Per-document time limit for the limits table")
+    pdf_parser.add_argument("--memory-mb", type=int, default=64, help="Per-document memory limit for the limits table")
+    pdf_parser.add_argument("--heavy-lines", type=int, default=1500, help="Lines on each page of the slow sample PDF")
+    pdf_parser.add_argument("--bomb-lines", type=int, default=200000, help="Lines in the decompression-bomb sample PDF")
+    pdf_parser.set_defaults(handler=pdf_benchmark_command)
+    
+    single_flight_parser = subparsers.add_parser("single-flight-benchmark", help="Open one school from many sessions at once and count the requests")
+    single_flight_parser.add_argument("--sessions", type=int, default=20, help="Sessions opening the school at the same moment")
+    single_flight_parser.add_argument("--latency-ms", type=float, default=500, help="Delay before the fixture homepage is sent")
+    single_flight_parser.set_defaults(handler=single_flight_benchmark_command)
+    
+    refresh_benchmark_parser = subparsers.add_parser("refresh-benchmark", help="Simulate scheduled refreshes of fixture schools")
+    refresh_benchmark_parser.add_argument("--schools", type=int, default=200, help="Fixture schools")
+    refresh_benchmark_parser.add_argument("--hosts", type=int, default=20, help="Stub servers the schools are spread over")
+    refresh_benchmark_parser.add_argument("--days", type=int, default=14, help="Days to simulate")
+    refresh_benchmark_parser.add_argument("--budget", type=int, default=40, help="School fetches per day")
+    refresh_benchmark_parser.add_argument("--volatile-share", type=float, default=0.1, help="Share of schools whose plans change often")
+    refresh_benchmark_parser.add_argument("--volatile-rate", type=float, default=0.3, help="Chance a volatile school's plan changes each day")
+    refresh_benchmark_parser.add_argument("--stable-rate", type=float, default=0.01, help="Chance any other school's plan changes each day")
+    refresh_benchmark_parser.add_argument("--workers", type=int, default=4, help="Worker processes")
+    refresh_benchmark_parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    refresh_benchmark_parser.set_defaults(handler=refresh_benchmark_command)
+    
+    archive_parser = subparsers.add_parser("archive-benchmark", help="Record fixture schools to an archive and check replaying them offline")
+    archive_parser.add_argument("--schools", type=int, default=200, help="Fixture schools")
+    archive_parser.add_argument("--hosts", type=int, default=20, help="Stub servers the schools are spread over")
+    archive_parser.add_argument("--workers", type=int, default=4, help="Worker processes")
+    archive_parser.add_argument("--pages", type=int, default=app.WEBSITE_CRAWL_PAGES, help="Linked pages to crawl per school")
+    archive_parser.add_argument("--latency-ms", type=float, default=100, help="Delay before each fixture page is sent")
+    archive_parser.set_defaults(handler=archive_benchmark_command)
+    
+    keyword_parser = subparsers.add_parser("keyword-benchmark", help="Check the compiled keyword matcher against the per-keyword scan")
+    keyword_parser.add_argument("--areas", type=int, nargs="+", default=[50, 500, 2000], help="Area counts to time")
+    keyword_parser.add_argument("--trials", type=int, default=300, help="Random area sets to compare scores on")
+    keyword_parser.add_argument("--repeat", type=int, default=5, help="Timed runs per area count")
+    keyword_parser.set_defaults(handler=keyword_benchmark_command)
+    
+    scorer_parser = subparsers.add_parser("scorer-benchmark", help="Compare the keyword and TF-IDF recommendation scorers")
+    scorer_parser.add_argument("--schools", type=int, nargs="+", default=[100, 1000, 5000], help="School counts to batch-score")
+    scorer_parser.add_argument("--repeat", type=int, default=1000, help="Timed runs for one school")
+    scorer_parser.set_defaults(handler=scorer_benchmark_command)
+    
+    report_cache_parser = subparsers.add_parser("report-cache-benchmark", help="Measure report reruns, eviction and invalidation of the report cache")
+    report_cache_parser.add_argument("--schools", type=int, default=2000, help="Schools to build reports for")
+    report_cache_parser.add_argument("--max-mb", type=float, default=4, help="Report cache size in MB")
+    report_cache_parser.add_argument("--requests", type=int, default=20000, help="Report views in the skewed traffic run")
+    report_cache_parser.add_argument("--repeat", type=int, default=200, help="Timed reruns of one report")
+    report_cache_parser.set_defaults(handler=report_cache_benchmark_command)
+    
+    export_parser = subparsers.add_parser("export-benchmark", help="Time and check the report download formats and rerun latency during PDF exports")
+    export_parser.add_argument("--areas", type=int, default=5000, help="Priorities in the long report")
+    export_parser.add_argument("--exports", type=int, default=2, help="Long PDFs rendered at once")
+    export_parser.add_argument("--sessions", type=int, default=5, help="Sessions asking for the same download at once")
+    export_parser.set_defaults(handler=export_benchmark_command)
+    
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(run_command_line(sys.argv[1:]))
@@ -0,0 +1,127 @@
+# Shared fixtures for the dashboard tests
+# The dashboard is one Streamlit script, so it is loaded as a module here, from a scratch directory
+# so that its website cache and prefetch store are created there rather than in the repository
+import http.server
+import importlib
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app_improved 2.py")
+
+# Schools covering the awkward cases: punctuation, shared words, duplicate URNs and missing postcodes
+SCHOOL_ROWS = [
+    (100000, "St Mary's Church of England Primary School", "1 Church Road", "Leeds", "LS1 4AB", "Voluntary aided school", "Primary", "Open", 210, 12.5, "http://www.stmarys.example", 430000, 433000),
+    (100001, "St Marys Catholic Primary School", "2 High Street", "York", "YO1 7HH", "Voluntary aided school", "Primary", "Open", 180, 8.0, "", 460000, 452000),
+    (100002, "Oak Park High School", "3 Oak Lane", "Leeds", "LS8 2QT", "Community school", "Secondary", "Open", 1100, 25.1, "http://oakpark.example", 431000, 437000),
+    (100007, "Trinity Academy", "4 Trinity Way", "Bristol", "BS1 5TR", "Academy converter", "Secondary", "Open", 950, 30.0, None, 358000, 173000),
+    (100070, "Green Valley Infant School", "5 Valley Road", "Derby", None, "Community school", "Primary", "Closed", 90, None, "", 435000, 336000),
+    (210000, "Saint Peter's Academy", "6 Peter Street", "London", "SW1A 1AA", "Academy converter", "All-through", "Open", 1500, 40.2, "https://stpeters.example", 529000, 179000),
+    (210001, "The Heath School (Primary)", "7 Heath Road", "Wigan", "WN1 2AB", "Foundation school", "Primary", "Open", 300, 18.4, "", 358000, 405000),
+    (100002, "Oak Park High School Annexe", "8 Oak Lane", "Leeds", "LS8 2QU", "Community school", "Secondary", "Open", 0, None, "", 431100, 437100),
+]
+
+# Function to load the dashboard module with its cache files in a scratch directory
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("app")
+    os.environ["WEBSITE_CACHE_PATH"] = str(workdir / "website_cache.sqlite3")
+    os.environ["PREFETCH_STORE_PATH"] = str(workdir / "prefetched_websites.sqlite3")
+    # Linked in as app.py so that PDF worker processes, which import the functions they run, can find it
+    os.symlink(APP_PATH, workdir / "app.py")
+    sys.path.insert(0, str(workdir))
+    previous = os.getcwd()
+    os.chdir(workdir)
+    try:
+        module = importlib.import_module("app")
+    finally:
+        os.chdir(previous)
+    return module
+
+# Function to build a small school dataset in the shape load_school_data returns
+@pytest.fixture
+def schools(app):
+    df = pd.DataFrame(SCHOOL_ROWS, columns=app.SCHOOL_DATA_COLUMNS)
+    df["URN"] = df["URN"].astype("int64")
+    for col in app.SCHOOL_DATA_NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype(np.float64)
+    for col in app.SCHOOL_DATA_CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype("category")
+    return df
+
+# Function to isolate the website scraper: its own cache file, host health and discovery cache, no archive and no crawl
+@pytest.fixture
+def website(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "website_cache", app.open_website_cache(str(tmp_path / "website_cache.sqlite3")))
+    monkeypatch.setattr(app, "host_health", {"hosts": {}, "lock": threading.Lock(), "stats": {"skipped": 0, "failures": 0}})
+    monkeypatch.setattr(app, "site_discovery_cache", {"hosts": {}, "lock": threading.Lock()})
+    monkeypatch.setattr(app, "website_archive", None)
+    monkeypatch.setattr(app, "WEBSITE_CRAWL_PAGES", 0)
+    return app
+
+# Function to let the scraper crawl linked pages (the website fixture turns the crawl off), without sitemaps
+@pytest.fixture
+def crawler(website, monkeypatch):
+    monkeypatch.setattr(website, "WEBSITE_CRAWL_PAGES", 5)
+    monkeypatch.setattr(website, "WEBSITE_USE_SITEMAPS", False)
+    return website
+
+# Function to send a page, answering 304 when the client already has its ETag; delay holds the response back
+def send_page(handler, body, etag=None, status=200, delay=0, content_type="text/html; charset=utf-8"):
+    if delay:
+        time.sleep(delay)
+    if etag and handler.headers.get("If-None-Match") == etag:
+        handler.send_response(304)
+        handler.send_header("ETag", etag)
+        handler.end_headers()
+        return
+    data = body.encode("utf-8") if isinstance(body, str) else body
+    handler.send_response(status)
+    handler.send_header("Content-Type", content_type)
+    handler.send_header("Content-Length", str(len(data)))
+    if etag:
+        handler.send_header("ETag", etag)
+    handler.end_headers()
+    handler.wfile.write(data)
+
+# Function to start local websites for a test; routes map a path to a function(handler)
+# Each server keeps the path and headers of every request it was sent
+@pytest.fixture
+def fixture_site():
+    servers = []
+    
+    def start(routes):
+        received = []
+        
+        class FixtureHandler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+            
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                received.append((path, dict(self.headers)))
+                route = routes.get(path)
+                if route is None:
+                    self.send_error(404)
+                    return
+                route(self)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        server.daemon_threads = True
+        server.received = received
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}"
+    
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
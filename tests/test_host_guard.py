@@ -0,0 +1,85 @@
+import time
+
+import pytest
+import requests
+
+HOST = "school.example"
+URL = f"http://{HOST}/"
+
+# Session stand-in that raises the given error, or answers with a bare response, counting its requests
+class FakeSession:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+    
+    def get(self, url, **kwargs):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return requests.Response()
+    
+    def get_adapter(self, url):
+        return requests.adapters.HTTPAdapter(max_retries=0)
+
+# Function to fail requests to the host until its breaker opens, then let the cooldown run out
+def open_then_cool_down(app):
+    session = FakeSession(requests.exceptions.ConnectTimeout("timed out"))
+    for _ in range(app.HOST_BREAKER_FAILURES):
+        with pytest.raises(requests.exceptions.ConnectTimeout):
+            app.guarded_get(session, URL)
+    app.host_health["hosts"][HOST]["open_until"] = 0.0
+
+def test_breaker_opens_skips_and_closes_after_trial(website):
+    failing = FakeSession(requests.exceptions.ConnectTimeout("timed out"))
+    for _ in range(website.HOST_BREAKER_FAILURES):
+        with pytest.raises(requests.exceptions.ConnectTimeout):
+            website.guarded_get(failing, URL)
+    state = website.host_health["hosts"][HOST]
+    assert state["open_until"] > time.monotonic()
+    
+    # Open - the host isn't contacted at all
+    with pytest.raises(website.HostUnavailableError):
+        website.guarded_get(failing, URL)
+    assert failing.calls == website.HOST_BREAKER_FAILURES
+    
+    # Half-open - one trial request goes through while everyone else keeps failing fast
+    state["open_until"] = 0.0
+    website.acquire_host(HOST)
+    assert state["trial"]
+    with pytest.raises(website.HostUnavailableError):
+        website.acquire_host(HOST)
+    
+    # The trial succeeds and the breaker closes
+    website.record_host_result(HOST)
+    working = FakeSession()
+    website.guarded_get(working, URL)
+    website.guarded_get(working, URL)
+    assert working.calls == 2
+    assert state["failures"] == 0 and not state["trial"]
+
+def test_failed_trial_reopens_breaker(website):
+    open_then_cool_down(website)
+    with pytest.raises(requests.exceptions.ConnectTimeout):
+        website.guarded_get(FakeSession(requests.exceptions.ConnectTimeout("timed out")), URL)
+    state = website.host_health["hosts"][HOST]
+    assert not state["trial"]
+    assert state["open_until"] > time.monotonic()
+
+@pytest.mark.parametrize("error", [
+    requests.exceptions.TooManyRedirects("Exceeded 30 redirects."),
+    requests.exceptions.InvalidURL("Invalid URL"),
+    requests.exceptions.ChunkedEncodingError("Connection broken"),
+])
+def test_other_error_during_trial_ends_it(website, error):
+    open_then_cool_down(website)
+    with pytest.raises(type(error)):
+        website.guarded_get(FakeSession(error), URL)
+    state = website.host_health["hosts"][HOST]
+    assert not state["trial"]
+    
+    # Once the cooldown has passed again the host gets another trial instead of being skipped for good
+    state["open_until"] = 0.0
+    working = FakeSession()
+    website.guarded_get(working, URL)
+    assert working.calls == 1
+    assert state["failures"] == 0
@@ -0,0 +1,18 @@
+import pytest
+
+
+def test_html_parser_is_the_default(app):
+    assert app.WEBSITE_HTML_PARSER == "html.parser"
+
+
+@pytest.mark.parametrize("html", [
+    "<html><head><title>St Marys</title><script>var x = 1;</script></head><body>"
+    "<h2>Pupil Premium</h2><p>We fund small group tutoring for disadvantaged pupils.</p>"
+    "<h2>SEND</h2><ul><li>Speech and language support for pupils with SEND.</li></ul></body></html>",
+    "<h3>Attendance</h3><div><p>Our attendance officer works with families to improve attendance.</p></div>",
+])
+def test_lxml_matches_html_parser(app, html):
+    pytest.importorskip("lxml")
+    url = "https://www.example.sch.uk/"
+    expected = app.extract_school_website_data(html, url, "html.parser")
+    assert app.extract_school_website_data(html, url, "lxml") == expected
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+CONTEXTS = [{"phase": phase, "type": school_type}
+            for phase in ["Primary", "Secondary", "Nursery", "Not applicable"]
+            for school_type in ["Academy converter", "Further education college"]]
+
+# Function to score the solutions the way the per-keyword scan did: every solution, every area, every keyword
+def scan_scores(app, improvement_areas, school_context):
+    school_phase = school_context.get("phase", "").lower()
+    school_type = school_context.get("type", "").lower()
+    solution_scores = {}
+    for key, solution in app.improvement_solutions.items():
+        score = 0
+        for area in improvement_areas:
+            area_lower = area.lower()
+            for keyword in solution["keywords"]:
+                if keyword.lower() in area_lower:
+                    score += 3
+            for word in solution["title"].lower().split():
+                if len(word) > 3 and word in area_lower:
+                    score += 1
+        if "early_years" in key and ("early" in school_phase or "nursery" in school_phase or "foundation" in school_phase):
+            score += 5
+        if "reading_instruction" in key and ("primary" in school_phase or "elementary" in school_phase):
+            score += 3
+        if "curriculum_implementation" in key and ("secondary" in school_phase or "high" in school_phase or "college" in school_type):
+            score += 3
+        solution_scores[key] = score
+    return solution_scores
+
+# Function to find the areas a solution is relevant to the way the per-keyword scan did
+def scan_relevant_areas(app, improvement_areas, key):
+    return [area for area in improvement_areas
+            if any(keyword.lower() in area.lower() for keyword in app.improvement_solutions[key]["keywords"])]
+
+# Function to write areas the way schools do: keyword phrases in varied case among everyday words
+def make_areas(app, seed, count):
+    rng = random.Random(seed)
+    phrases = [keyword for solution in app.improvement_solutions.values() for keyword in solution["keywords"]]
+    phrases += [word for solution in app.improvement_solutions.values() for word in solution["title"].split()]
+    phrases += ["SENDCo", "e-safety", "re-engagement", "mathematical", "readiness", "Years"]
+    filler = "pupils school improve develop ensure children leaders consistently across all the of and to in that with".split()
+    areas = []
+    for _ in range(count):
+        words = rng.choices(filler, k=rng.randint(6, 20))
+        for _ in range(rng.randint(0, 4)):
+            phrase = rng.choice(phrases)
+            words.insert(rng.randint(0, len(words)), rng.choice([phrase, phrase.lower(), phrase.upper(), phrase.capitalize()]))
+        areas.append(" ".join(words).capitalize() + ".")
+    return areas
+
+AREAS = [
+    "Improve the teaching of phonics and early reading so SEND pupils read fluently",
+    "Ensure the SENDCo works with leaders on e-safety and re-engagement",
+    "Raise attainment in mathematics, mathematical reasoning and reading across all Years",
+    "Pupils attend well",
+]
+
+@pytest.mark.parametrize("context", CONTEXTS[:3])
+def test_matcher_scores_like_the_scan_on_known_areas(app, context):
+    scores, _ = app.score_improvement_solutions(AREAS, context)
+    assert scores == scan_scores(app, AREAS, context)
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matcher_scores_like_the_scan_on_generated_areas(app, seed):
+    areas = make_areas(app, seed, 1 + seed * 2)
+    context = CONTEXTS[seed % len(CONTEXTS)]
+    scores, _ = app.score_improvement_solutions(areas, context)
+    assert scores == scan_scores(app, areas, context)
+    
+    for solution in app.match_improvement_areas_to_solutions(areas, context):
+        key = next(key for key, candidate in app.improvement_solutions.items() if candidate["title"] == solution["title"])
+        assert solution["areas"] == scan_relevant_areas(app, areas, key)
+
+# Overlapping words ("sen" inside "send") are all found, each once, where they first appear
+def test_overlapping_and_repeated_words(app):
+    matches = app.find_keyword_matches("SEND support for SEND pupils")
+    words = [word for found in matches.values() for position, word, points, is_keyword in found]
+    assert "send" in words and "sen" in words
+    assert all(position == 0 for found in matches.values() for position, word, points, is_keyword in found if word in ("sen", "send"))
@@ -0,0 +1,41 @@
+import pytest
+
+# Function to get the names of the best matches for a query
+def ranked_names(app, schools, query, top_k=3):
+    index = app.build_ranked_search_index(schools)
+    return [schools["EstablishmentName"].iloc[position] for position in app.ranked_search_positions(index, query, top_k)]
+
+# Typos, aliases, postcodes, URNs and a half-typed last word all find the intended school first
+@pytest.mark.parametrize("query, expected", [
+    ("trinity academy", "Trinity Academy"),
+    ("trinty", "Trinity Academy"),
+    ("st peters", "Saint Peter's Academy"),
+    ("sw1a 1aa", "Saint Peter's Academy"),
+    ("sw1a1aa", "Saint Peter's Academy"),
+    ("100007", "Trinity Academy"),
+    ("green vall", "Green Valley Infant School"),
+    ("heath primary wigan", "The Heath School (Primary)"),
+])
+def test_best_match(app, schools, query, expected):
+    assert ranked_names(app, schools, query)[0] == expected
+
+# Both St Mary's schools come before anything else, the shorter name first
+def test_shared_words_rank_shorter_name_first(app, schools):
+    assert ranked_names(app, schools, "st marys primary", top_k=2) == [
+        "St Marys Catholic Primary School", "St Mary's Church of England Primary School"]
+
+# Queries matching nothing, or nothing searchable, give no results
+@pytest.mark.parametrize("query", ["zzzz", "", "   ", "'"])
+def test_no_matches(app, schools, query):
+    assert ranked_names(app, schools, query) == []
+
+# The edit distance gives up (max_distance + 1) once the words are further apart than allowed
+@pytest.mark.parametrize("a, b, max_distance, expected", [
+    ("trinity", "trinty", 2, 1),
+    ("academy", "acadmey", 2, 2),
+    ("oak", "oaks", 1, 1),
+    ("school", "sch", 1, 2),
+    ("primary", "library", 1, 2),
+])
+def test_bounded_edit_distance(app, a, b, max_distance, expected):
+    assert app.bounded_edit_distance(a, b, max_distance) == expected
@@ -0,0 +1,35 @@
+import pytest
+
+SCHOOL = {"urn": "100000", "name": "Oak Park Primary School", "address": "1 Church Road, Leeds, LS1 4AB", "type": "Community school",
+          "phase": "Primary", "pupils": 210.0, "fsm": 12.5, "website": "", "ofstedUrl": "https://reports.ofsted.gov.uk/provider/21/100000"}
+
+# Word and PDF downloads render in a reused PDF worker process, reporting progress, and are stored with the report
+@pytest.mark.parametrize("export_format", ["docx", "pdf"])
+def test_export_rendered_in_worker(app, export_format):
+    report = app.get_cached_report(SCHOOL, ["Improve the teaching of phonics and early reading"], [], [], cache=app.create_report_cache())
+    exports = app.create_report_exports()
+    job = app.start_report_export(report, export_format, exports=exports)
+    data = job["future"].result(timeout=60)
+    worker = app.pdf_workers["idle"][-1]
+    
+    assert job["progress"] == 1.0
+    assert report["artifacts"][export_format] == data
+    assert data == app.REPORT_EXPORT_FORMATS[export_format]["render"](report["model"])
+    assert data.startswith(b"%PDF-" if export_format == "pdf" else b"PK")
+    assert worker["process"].is_alive() and worker["ready"]
+    assert app.start_report_export(report, export_format, exports=exports) is None
+    exports["executor"].shutdown()
+
+# Where no worker process can start, the export thread renders the download itself
+def test_export_rendered_in_thread_without_worker(app, monkeypatch):
+    def start_pdf_worker():
+        raise OSError("no processes")
+    monkeypatch.setattr(app, "start_pdf_worker", start_pdf_worker)
+    monkeypatch.setattr(app, "pdf_workers", app.create_pdf_workers())
+    report = app.get_cached_report(SCHOOL, ["Improve attendance"], [], [], cache=app.create_report_cache())
+    exports = app.create_report_exports()
+    job = app.start_report_export(report, "pdf", exports=exports)
+    
+    assert job["future"].result(timeout=30).startswith(b"%PDF-")
+    assert job["progress"] == 1.0
+    exports["executor"].shutdown()
@@ -0,0 +1,29 @@
+import os
+
+# Function to write the test schools as a national datasheet CSV, with a column the dashboard doesn't use
+def write_school_csv(schools, path):
+    df = schools.copy()
+    df["LA (code)"] = 383
+    df.to_csv(path, index=False)
+    return str(path)
+
+# The typed snapshot is written on the first read and gives the same frame as reading the CSV
+def test_snapshot_round_trip(app, schools, tmp_path):
+    csv_path = write_school_csv(schools, tmp_path / "schools.csv")
+    first = app.read_school_data(csv_path)
+    snapshot_path, meta_path = app.get_snapshot_paths(csv_path)
+    assert os.path.exists(snapshot_path) and app.snapshot_is_current(csv_path, meta_path)
+    
+    second = app.read_school_data(csv_path)
+    assert list(first.columns) == list(second.columns)
+    assert first.equals(second)
+    assert first["URN"].dtype == "int64"
+    assert str(first["PhaseOfEducation (name)"].dtype) == "category"
+
+# Without a parquet engine the CSV is read directly and no snapshot is attempted
+def test_without_pyarrow_reads_csv(app, schools, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "pyarrow", None)
+    csv_path = write_school_csv(schools, tmp_path / "schools.csv")
+    df = app.read_school_data(csv_path)
+    assert not os.path.exists(app.get_snapshot_paths(csv_path)[0])
+    assert df["URN"].tolist() == schools["URN"].tolist()
@@ -0,0 +1,25 @@
+import sqlite3
+import time
+
+# Views are counted towards the school's refresh priority
+def test_view_counted(app, tmp_path):
+    store = app.open_prefetch_store(str(tmp_path / "store.sqlite3"))
+    app.record_school_view(store, 100000)
+    app.record_school_view(store, 100000, count=2)
+    
+    assert app.read_refresh_schedule(store)[100000][3] == 3
+
+# While a refresh holds the store's write lock a view is dropped quickly instead of waiting
+def test_view_dropped_while_store_locked(app, tmp_path):
+    store = app.open_prefetch_store(str(tmp_path / "store.sqlite3"))
+    writer = sqlite3.connect(store["path"])
+    writer.execute("BEGIN EXCLUSIVE")
+    try:
+        start = time.monotonic()
+        app.record_school_view(store, 100000)
+        assert time.monotonic() - start < app.REFRESH_VIEW_TIMEOUT_SECONDS + 1
+    finally:
+        writer.rollback()
+        writer.close()
+    
+    assert 100000 not in app.read_refresh_schedule(store)
@@ -0,0 +1,29 @@
+import pytest
+
+# Queries a user might type, including ones only the column scan can answer (regex characters, empty)
+SEARCH_QUERIES = ["school", "primary", "st mary", "st mary's", "oak", "a", "ls8", "sw1a 1aa", "1000", "100007", "00", "zzz",
+                  "church of england", "st. m", "", "e"]
+
+# Indexed search must return exactly the rows the original column scan does
+@pytest.mark.parametrize("query", SEARCH_QUERIES)
+def test_index_search_matches_column_scan(app, schools, query):
+    index = app.build_search_index(schools)
+    expected = schools[app.search_mask(schools, query)]
+    assert app.search_school_data(schools, index, query).equals(expected)
+
+# Narrowing the previous results while typing must agree with searching from scratch
+@pytest.mark.parametrize("typed", ["st marys catholic", "oak park high", "ls1 4ab", "100007"])
+def test_narrowing_matches_fresh_search(app, schools, typed):
+    index = app.build_search_index(schools)
+    previous_query, previous_positions = None, None
+    for end in range(1, len(typed) + 1):
+        query = typed[:end]
+        positions = app.search_school_positions(schools, index, query, previous_query, previous_positions)
+        assert list(positions) == list(app.search_school_positions(schools, index, query))
+        previous_query, previous_positions = query, positions
+
+# An empty dataset gives an empty index rather than an error
+def test_empty_dataset(app, schools):
+    empty = schools.iloc[0:0]
+    index = app.build_search_index(empty)
+    assert app.search_school_data(empty, index, "school").empty
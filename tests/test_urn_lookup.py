@@ -0,0 +1,28 @@
+import pytest
+
+# Function to point the dashboard's lookups at the test schools
+@pytest.fixture
+def loaded_schools(app, schools, monkeypatch):
+    monkeypatch.setattr(app, "school_data_df", schools)
+    monkeypatch.setattr(app, "school_urn_index", app.build_urn_index(schools))
+    return schools
+
+# The URN index finds the same row a boolean mask did, including the first of two rows sharing a URN
+@pytest.mark.parametrize("urn", [100000, 100001, 100002, 100007, 100070, 210000, 210001])
+def test_urn_lookup_matches_mask(app, loaded_schools, urn):
+    expected = loaded_schools[loaded_schools["URN"] == urn].iloc[0]
+    assert app.get_school_row(urn).equals(expected)
+
+# An unknown URN gives None, and labels fall back to an empty name
+def test_unknown_urn(app, loaded_schools):
+    assert app.get_school_row(999999) is None
+    assert app.format_school_option(999999) == " (URN: 999999)"
+
+# Selectbox labels come from the index without a row lookup
+def test_option_labels(app, loaded_schools):
+    assert app.format_school_option(100002) == "Oak Park High School (URN: 100002)"
+
+# With no index (the dataset failed to load) the lookup falls back to a scan
+def test_lookup_without_index(app, loaded_schools, monkeypatch):
+    monkeypatch.setattr(app, "school_urn_index", app.build_urn_index(loaded_schools.iloc[0:0]))
+    assert app.get_school_row(100007)["EstablishmentName"] == "Trinity Academy"
@@ -0,0 +1,57 @@
+import gzip
+import time
+
+import pytest
+
+# Function to serve a page in pieces, sleeping between them, until the client hangs up
+def drip_page(data, pieces, delay):
+    def route(handler):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/html; charset=utf-8")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        piece = max(1, len(data) // pieces)
+        try:
+            for offset in range(0, len(data), piece):
+                handler.wfile.write(data[offset:offset + piece])
+                handler.wfile.flush()
+                time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+    return route
+
+# Function to record through the archive into a scratch directory
+@pytest.fixture
+def recorder(website, tmp_path, monkeypatch):
+    monkeypatch.setattr(website, "website_archive", website.open_website_archive(str(tmp_path / "archive"), "record"))
+    return website
+
+# Function to read back the WARC header and body of the only archived record
+def read_record(app):
+    path, offset, length = next(iter(app.website_archive["index"].values()))
+    with open(path, "rb") as f:
+        f.seek(offset)
+        warc_head = gzip.decompress(f.read(length)).partition(b"\r\n\r\n")[0]
+    return warc_head, app.read_archive_record(path, offset, length)[3]
+
+def test_whole_page_archived(recorder, fixture_site):
+    body = b"<html><body>" + b"<p>Reading for pleasure across the school.</p>" * 500 + b"</body></html>"
+    _, root = fixture_site({"/": drip_page(body, 4, 0)})
+    response = recorder.guarded_get(recorder.http_session, root + "/", deadline=time.monotonic() + 10, stream=True)
+    
+    assert response.content == body
+    warc_head, archived = read_record(recorder)
+    assert archived == body
+    assert b"WARC-Truncated" not in warc_head
+
+def test_slow_drip_archived_up_to_deadline(recorder, fixture_site):
+    body = b"<html><body>" + b"<p>Reading for pleasure across the school.</p>" * 2000 + b"</body></html>"
+    _, root = fixture_site({"/": drip_page(body, 100, 0.1)})
+    start = time.monotonic()
+    response = recorder.guarded_get(recorder.http_session, root + "/", deadline=start + 0.5, stream=True)
+    
+    assert time.monotonic() - start < 1.5
+    assert len(response.content) < len(body)
+    warc_head, archived = read_record(recorder)
+    assert archived == response.content
+    assert b"WARC-Truncated: length" in warc_head
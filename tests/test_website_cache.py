@@ -0,0 +1,80 @@
+from conftest import send_page
+
+HOMEPAGE = """<!DOCTYPE html>
+<html>
+<head><title>Oak Park Primary School</title></head>
+<body>
+<a href="https://reports.ofsted.gov.uk/provider/21/100000">Latest Ofsted report</a>
+<h2>School Development Plan Priorities</h2>
+<ul>
+  <li>Improve the teaching of early reading and phonics across EYFS and KS1.</li>
+  <li>Develop the use of assessment to close gaps in pupils' mathematical reasoning.</li>
+  <li>Strengthen provision for pupils with SEND through adaptive teaching.</li>
+</ul>
+</body>
+</html>
+"""
+
+# Function to serve one page whose body, ETag and status the test can change
+def start_homepage(fixture_site, page):
+    return fixture_site({"/": lambda handler: send_page(handler, page["body"], etag=page["etag"], status=page.get("status", 200))})
+
+# A fresh entry is answered from the cache without contacting the site
+def test_fresh_entry_served_from_cache(website, fixture_site):
+    server, root = start_homepage(fixture_site, {"body": HOMEPAGE, "etag": '"v1"'})
+    first = website.scrape_school_website(root + "/")
+    second = website.scrape_school_website(root + "/")
+    
+    assert first["strategies"] and first["ofsted_url"] == "https://reports.ofsted.gov.uk/provider/21/100000"
+    assert second == first
+    assert len(server.received) == 1
+    assert website.website_cache["stats"] == {"hits": 1, "misses": 1, "revalidated": 0, "changed": 0}
+
+# A stale entry is revalidated with its ETag, and a 304 keeps the cached result and restarts its lifetime
+def test_stale_entry_revalidated(website, fixture_site):
+    server, root = start_homepage(fixture_site, {"body": HOMEPAGE, "etag": '"v1"'})
+    first = website.scrape_school_website(root + "/")
+    checked_at = website.read_website_cache(website.website_cache, root + "/")["fetched_at"]
+    website.website_cache["ttl_seconds"] = 0
+    
+    second = website.scrape_school_website(root + "/")
+    assert second == first
+    assert server.received[-1][1].get("If-None-Match") == '"v1"'
+    assert website.website_cache["stats"]["revalidated"] == 1
+    assert website.read_website_cache(website.website_cache, root + "/")["fetched_at"] > checked_at
+
+# A page that changed since it was cached is downloaded again and replaces the entry
+def test_changed_page_replaces_entry(website, fixture_site):
+    page = {"body": HOMEPAGE, "etag": '"v1"'}
+    server, root = start_homepage(fixture_site, page)
+    first = website.scrape_school_website(root + "/")
+    website.website_cache["ttl_seconds"] = 0
+    page["body"] = HOMEPAGE.replace("Strengthen provision for pupils with SEND", "Strengthen provision for disadvantaged pupils")
+    page["etag"] = '"v2"'
+    
+    second = website.scrape_school_website(root + "/")
+    assert second != first and any("disadvantaged pupils" in strategy for strategy in second["strategies"])
+    assert website.website_cache["stats"]["changed"] == 1
+    cached = website.read_website_cache(website.website_cache, root + "/")
+    assert cached["etag"] == '"v2"' and cached["strategies"] == second["strategies"]
+
+# Pages that fail to load are reported by their status and not cached, so the next visit tries again
+def test_errors_not_cached(website, fixture_site):
+    server, root = fixture_site({"/": lambda handler: send_page(handler, "Gone", status=404)})
+    assert website.scrape_school_website(root + "/") == {"strategies": [], "ofsted_url": None,
+                                                         "error": "Could not scrape school website: HTTP 404"}
+    assert website.read_website_cache(website.website_cache, root + "/") is None
+
+# A stale entry is still served when the site answers with an error or can't be reached
+def test_stale_entry_served_when_site_fails(website, fixture_site):
+    page = {"body": HOMEPAGE, "etag": '"v1"'}
+    server, root = start_homepage(fixture_site, page)
+    first = website.scrape_school_website(root + "/")
+    website.website_cache["ttl_seconds"] = 0
+    
+    page["status"] = 500
+    assert website.scrape_school_website(root + "/") == first
+    server.shutdown()
+    server.server_close()
+    assert website.scrape_school_website(root + "/") == first
+    assert first["strategies"] and "error" not in first
@@ -0,0 +1,80 @@
+import time
+
+from conftest import send_page
+
+CRAWL_HOMEPAGE = """<!DOCTYPE html>
+<html>
+<body>
+<nav>
+  <a href="/vision-and-values">Vision and values</a>
+  <a href="/school-development-plan">School development plan</a>
+  <a href="/ofsted">Ofsted</a>
+  <a href="/news">News</a>
+  <a href="https://example.org/vision">Another school's vision</a>
+</nav>
+<h1>Welcome to Oak Park Primary School</h1>
+<p>Term dates and letters home are in the parents section.</p>
+</body>
+</html>
+"""
+
+CRAWL_PAGES = {
+    "/vision-and-values": """<html><body><h1>Our Vision</h1>
+        <p>Every child leaves Oak Park as a confident, curious reader who loves learning.</p></body></html>""",
+    "/school-development-plan": """<html><body><h2>School Development Plan Priorities</h2>
+        <ul>
+          <li>Improve the teaching of early reading and phonics across EYFS and KS1.</li>
+          <li>Strengthen provision for pupils with SEND through adaptive teaching.</li>
+        </ul></body></html>""",
+    "/ofsted": """<html><body><h1>Ofsted</h1>
+        <p><a href="https://reports.ofsted.gov.uk/provider/21/100000">Read our latest Ofsted inspection report</a></p></body></html>""",
+    "/news": """<html><body><h1>News</h1><p>Sports day has moved to Friday.</p></body></html>"""
+}
+
+# Function to serve the crawl site, with some pages held back for a number of seconds and any extra routes
+def start_crawl_site(fixture_site, slow_pages=None, extra_routes=None):
+    slow_pages = slow_pages or {}
+    routes = {"/": lambda handler: send_page(handler, CRAWL_HOMEPAGE), **(extra_routes or {})}
+    for path, body in CRAWL_PAGES.items():
+        routes[path] = lambda handler, body=body, delay=slow_pages.get(path, 0): send_page(handler, body, delay=delay)
+    return fixture_site(routes)
+
+# The most promising internal links are followed and merged; unrelated and external links are not
+def test_crawl_follows_promising_links(crawler, fixture_site):
+    server, root = start_crawl_site(fixture_site)
+    result = crawler.scrape_school_website(root + "/")
+    
+    assert any("pupils with SEND" in strategy for strategy in result["strategies"])
+    assert result["ofsted_url"] == "https://reports.ofsted.gov.uk/provider/21/100000"
+    requested = {path for path, headers in server.received}
+    assert {"/", "/vision-and-values", "/school-development-plan", "/ofsted"} <= requested
+    assert "/news" not in requested
+
+# A page that never arrives can't hold the scrape past its budget, and the other pages still count
+def test_slow_page_stays_within_budget(crawler, fixture_site, monkeypatch):
+    monkeypatch.setattr(crawler, "WEBSITE_CRAWL_TIME_BUDGET_SECONDS", 1.0)
+    server, root = start_crawl_site(fixture_site, slow_pages={"/vision-and-values": 4})
+    start = time.monotonic()
+    result = crawler.scrape_school_website(root + "/")
+    
+    assert time.monotonic() - start < 1.5
+    assert any("pupils with SEND" in strategy for strategy in result["strategies"])
+    assert not any("curious reader" in strategy for strategy in result["strategies"])
+
+# A corrupt gzipped sitemap is skipped without dropping the robots.txt rules read before it
+def test_corrupt_sitemap_keeps_robots_rules(crawler, fixture_site, monkeypatch):
+    monkeypatch.setattr(crawler, "WEBSITE_USE_SITEMAPS", True)
+    def send_robots(handler):
+        send_page(handler, f"User-agent: *\nDisallow: /school-development-plan\nSitemap: http://{handler.headers['Host']}/sitemap.xml.gz\n",
+                  content_type="text/plain")
+    server, root = start_crawl_site(fixture_site, extra_routes={
+        "/robots.txt": send_robots,
+        "/sitemap.xml.gz": lambda handler: send_page(handler, b"\x1f\x8bnot gzip at all", content_type="application/gzip")
+    })
+    result = crawler.scrape_school_website(root + "/")
+    
+    requested = {path for path, headers in server.received}
+    assert "/sitemap.xml.gz" in requested and "/vision-and-values" in requested
+    assert "/school-development-plan" not in requested
+    assert not any("pupils with SEND" in strategy for strategy in result["strategies"])
+    assert crawler.site_discovery_cache["hosts"][root.split("//")[1]]["robots"] is not None
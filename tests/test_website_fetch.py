@@ -0,0 +1,17 @@
+import socket
+
+# Function to get a local port with nothing listening on it
+def get_closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+# A failed scrape says why in its result: it runs on a background thread, where a Streamlit warning is dropped
+def test_scrape_failure_returned_as_error(website, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(website.st, "warning", warnings.append)
+    result = website.scrape_school_website(f"http://127.0.0.1:{get_closed_port()}/")
+    
+    assert result["strategies"] == [] and result["ofsted_url"] is None
+    assert result["error"].startswith("Could not scrape school website:")
+    assert warnings == []
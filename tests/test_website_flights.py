@@ -0,0 +1,64 @@
+import concurrent.futures
+import threading
+
+import pytest
+
+# Function to give the single-flight code its own flights and a one-thread executor, with a scraper
+# that blocks until released and counts the URLs it was asked for
+@pytest.fixture
+def flights(app, monkeypatch):
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    scraped = []
+    
+    def scrape(url):
+        scraped.append(url)
+        release.wait(10)
+        return {"strategies": [f"Strategies from {url}"], "ofsted_url": None}
+    
+    monkeypatch.setattr(app, "website_flights", {"flights": {}, "lock": threading.RLock(), "stats": {"started": 0, "joined": 0}})
+    monkeypatch.setattr(app, "website_fetch_executor", executor)
+    monkeypatch.setattr(app, "scrape_school_website", scrape)
+    yield app, release, scraped
+    release.set()
+    executor.shutdown(wait=True)
+
+# Sessions asking for the same site, however its URL is written, share one fetch
+def test_same_site_shares_one_fetch(flights):
+    app, release, scraped = flights
+    first = app.join_website_fetch("http://www.Oakpark.example/")
+    second = app.join_website_fetch("http://www.oakpark.example")
+    
+    assert second is first
+    release.set()
+    assert first.result(timeout=5)["strategies"] == ["Strategies from http://www.Oakpark.example/"]
+    assert scraped == ["http://www.Oakpark.example/"]
+    assert app.website_flights["stats"] == {"started": 1, "joined": 1}
+
+# Once a fetch has finished, the next request starts a new one
+def test_finished_fetch_not_joined(flights):
+    app, release, scraped = flights
+    release.set()
+    app.join_website_fetch("http://oakpark.example/").result(timeout=5)
+    app.join_website_fetch("http://oakpark.example/").result(timeout=5)
+    
+    assert len(scraped) == 2
+    assert app.website_flights["flights"] == {}
+
+# A queued fetch is cancelled only when the last session waiting on it leaves
+def test_leave_cancels_once_nobody_waits(flights):
+    app, release, scraped = flights
+    # Keeps the one executor thread busy so the next fetch stays queued
+    running = app.join_website_fetch("http://busy.example/")
+    queued = app.join_website_fetch("http://oakpark.example/")
+    app.join_website_fetch("http://oakpark.example/")
+    
+    app.leave_website_fetch(queued)
+    assert not queued.cancelled()
+    app.leave_website_fetch(queued)
+    assert queued.cancelled()
+    assert "http://oakpark.example" not in str(app.website_flights["flights"])
+    
+    release.set()
+    running.result(timeout=5)
+    assert scraped == ["http://busy.example/"]
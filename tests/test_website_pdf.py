@@ -0,0 +1,93 @@
+import os
+import time
+
+import pytest
+
+from conftest import send_page
+
+pytest.importorskip("pypdf")
+
+DEVELOPMENT_PLAN = [["School Development Plan 2024-25", "Our priorities",
+                     "Improve the teaching of early reading and phonics across EYFS and KS1.",
+                     "Strengthen provision for pupils with SEND through adaptive teaching."]]
+
+# Function to build an uncompressed PDF with one text line per entry on each page
+def build_pdf(pages):
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        stream = ("BT /F1 10 Tf 12 TL 40 800 Td " + "".join(f"({line}) Tj T* " for line in lines) + "ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+    
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1) + b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return data
+
+HOMEPAGE = """<html><body><h1>Welcome to Oak Park Primary School</h1>
+<h2>School Development Plan Priorities</h2>
+<p>Strengthen provision for pupils with SEND through adaptive teaching.</p>
+<p><a href="/docs/sdp-2024-25.pdf">School Development Plan 2024-25</a></p></body></html>"""
+
+# Function to serve a homepage linking to a development plan PDF that takes delay seconds to arrive
+def start_pdf_site(fixture_site, delay=0):
+    return fixture_site({
+        "/": lambda handler: send_page(handler, HOMEPAGE),
+        "/docs/sdp-2024-25.pdf": lambda handler: send_page(handler, build_pdf(DEVELOPMENT_PLAN), delay=delay, content_type="application/pdf")
+    })
+
+# Pages are parsed in a worker process that is kept for the next document
+def test_pdf_extracted_in_reused_worker(app):
+    pages = app.extract_pdf_pages(build_pdf(DEVELOPMENT_PLAN), time.monotonic() + 30)
+    assert "early reading and phonics" in pages[0]
+    worker = app.pdf_workers["idle"][-1]
+    assert worker["process"].pid != os.getpid()
+    
+    app.extract_pdf_pages(build_pdf(DEVELOPMENT_PLAN), time.monotonic() + 30)
+    assert app.pdf_workers["idle"][-1] is worker
+
+# A worker still busy at the deadline is stopped, and a new one started in its place
+def test_overrunning_worker_is_replaced(app):
+    app.extract_pdf_pages(build_pdf(DEVELOPMENT_PLAN), time.monotonic() + 30)
+    worker = app.pdf_workers["idle"][-1]
+    timeouts = app.pdf_workers["stats"]["timeouts"]
+    heavy = build_pdf([[f"Line {i}: leaders will improve the curriculum in every subject." for i in range(60)]] * 200)
+    
+    app.extract_pdf_pages(heavy, time.monotonic() + 0.05, max_pages=200)
+    assert app.pdf_workers["stats"]["timeouts"] == timeouts + 1
+    assert not worker["process"].is_alive()
+    assert worker not in app.pdf_workers["idle"]
+    assert app.pdf_workers["idle"][-1]["process"].is_alive()
+
+# A PDF that is slow to arrive can't hold the scrape past its budget
+def test_slow_pdf_stays_within_crawl_budget(crawler, fixture_site, monkeypatch):
+    monkeypatch.setattr(crawler, "WEBSITE_CRAWL_TIME_BUDGET_SECONDS", 1.0)
+    _, root = start_pdf_site(fixture_site, delay=4)
+    start = time.monotonic()
+    result = crawler.scrape_school_website(root + "/")
+    
+    assert time.monotonic() - start < 1.5
+    assert any("pupils with SEND" in strategy for strategy in result["strategies"])
+    assert not any("phonics" in strategy for strategy in result["strategies"])
+
+# Within the budget the PDF's strategies are merged in
+def test_pdf_read_within_crawl_budget(crawler, fixture_site):
+    _, root = start_pdf_site(fixture_site)
+    result = crawler.scrape_school_website(root + "/")
+    
+    assert any("phonics" in strategy for strategy in result["strategies"])
+
+# No PDF is requested once the scrape's deadline has passed
+def test_pdfs_skipped_once_budget_spent(crawler, fixture_site):
+    server, root = start_pdf_site(fixture_site)
+    assert crawler.crawl_school_pdfs([(root + "/", HOMEPAGE)], deadline=time.monotonic()) == []
+    assert crawler.read_school_pdf(root + "/docs/sdp-2024-25.pdf", deadline=time.monotonic() - 1) is None
+    assert server.received == []
@@ -0,0 +1,100 @@
+import time
+
+import pytest
+
+# Priorities a school development plan section lists, more than the five a homepage result keeps
+PRIORITY_TEXTS = [
+    "Improve the teaching of early reading and phonics across EYFS and KS1.",
+    "Develop the use of assessment to close gaps in pupils' mathematical reasoning.",
+    "Strengthen provision for pupils with SEND through adaptive teaching.",
+    "Raise attainment in writing, with a focus on spelling, grammar and punctuation.",
+    "Continue to develop staff expertise through a programme of coaching and CPD.",
+    "Widen pupils' experience of music, sport and the arts beyond the classroom."
+]
+
+CONTENT = ("<nav><a href='https://reports.ofsted.gov.uk/provider/21/100000'>Our latest Ofsted report</a></nav>"
+           "<section><h2>School Development Plan Priorities</h2>" + "".join(f"<p>{text}</p>" for text in PRIORITY_TEXTS) + "</section>")
+
+NEWS_ITEM = "<div class='news'><h3>Sports day photos</h3><p>Photos from the reception class sports day.</p></div>"
+
+# Function to build a homepage padded with news items, with the priorities before or after the padding
+def build_homepage(padding_bytes, content_first):
+    padding = NEWS_ITEM * (padding_bytes // len(NEWS_ITEM) + 1)
+    main = CONTENT + padding if content_first else padding + CONTENT
+    return f"<!DOCTYPE html><html><head><title>Oak Park Primary School</title></head><body><main>{main}</main></body></html>"
+
+# Function to serve a page in pieces, sleeping between them, until the client hangs up
+def drip_page(body, pieces, delay):
+    data = body.encode("utf-8")
+    
+    def route(handler):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/html; charset=utf-8")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        piece = max(1, len(data) // pieces)
+        try:
+            for offset in range(0, len(data), piece):
+                handler.wfile.write(data[offset:offset + piece])
+                handler.wfile.flush()
+                time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+    return route
+
+# Function to stream a page through read_school_homepage, timing it
+def read_homepage(app, url, budget):
+    start = time.monotonic()
+    with app.http_session.get(url, timeout=app.HTTP_TIMEOUT, stream=True) as response:
+        html, result, complete = app.read_school_homepage(response, url, start + budget)
+    return html, result, complete, time.monotonic() - start
+
+def test_stops_at_byte_cap(website, fixture_site, monkeypatch):
+    monkeypatch.setattr(website, "WEBSITE_HOMEPAGE_MAX_BYTES", 64 * 1024)
+    body = build_homepage(1024 * 1024, content_first=False)
+    _, base_url = fixture_site({"/": drip_page(body, 1, 0)})
+    html, result, complete, _ = read_homepage(website, base_url + "/", 10)
+    
+    assert len(html.encode("utf-8")) <= 64 * 1024
+    assert not complete
+    # The priorities come after the cap, so they were never read
+    assert result["strategies"] == []
+
+def test_stops_early_once_result_is_complete(website, fixture_site):
+    body = build_homepage(512 * 1024, content_first=True)
+    # The rest of the page would take 40 s to arrive
+    _, base_url = fixture_site({"/": drip_page(body, 200, 0.2)})
+    html, result, complete, elapsed = read_homepage(website, base_url + "/", 30)
+    
+    assert complete
+    assert elapsed < 5
+    assert len(html) < len(body)
+    assert result == website.extract_school_website_data(body, base_url + "/")
+    assert len(result["strategies"]) == 5
+
+def test_slow_drip_stops_at_deadline(website, fixture_site):
+    body = build_homepage(256 * 1024, content_first=False)
+    _, base_url = fixture_site({"/": drip_page(body, 100, 0.2)})
+    html, _, complete, elapsed = read_homepage(website, base_url + "/", 1.0)
+    
+    assert not complete
+    assert elapsed < 2.0
+    assert len(html) < len(body)
+
+@pytest.mark.parametrize("complete", [True, False])
+def test_unchanged_homepage_not_extracted_again(website, fixture_site, monkeypatch, tmp_path, complete):
+    monkeypatch.setattr(website, "section_cache", website.open_section_cache(website.open_prefetch_store(str(tmp_path / "sections.sqlite3"))["path"]))
+    extractions = []
+    extract_school_website_data = website.extract_school_website_data
+    monkeypatch.setattr(website, "extract_school_website_data", lambda html, url: extractions.append(url) or extract_school_website_data(html, url))
+    # Without the direct Ofsted report link the whole page is read and extracted at the end
+    body = build_homepage(0, content_first=True)
+    if not complete:
+        body = body.replace("https://reports.ofsted.gov.uk/provider/21/100000", "/about-us/ofsted")
+    _, base_url = fixture_site({"/": drip_page(body, 1, 0)})
+    first = read_homepage(website, base_url + "/", 10)
+    second = read_homepage(website, base_url + "/", 10)
+    
+    assert first[1:3] == second[1:3] and first[2] == complete
+    assert len(first[1]["strategies"]) == 5
+    assert len(extractions) == 1